@@ -10,6 +10,9 @@ import logging
 import os
 from datetime import datetime, timedelta
 
+from model_router import ModelRouter
+from training_jobs import TrainingJobManager
+
 
 class PredictionRequest(BaseModel):
     symbol: str
@@ -38,6 +41,7 @@ class PredictionResponse(BaseModel):
     direction: str
     confidence: float
     timestamp: str
+    data_source: Optional[str] = None
 
 
 class TradeRequest(BaseModel):
@@ -78,10 +82,21 @@ class JobRequest(BaseModel):
 class TrainModelRequest(BaseModel):
     symbol: str
     data_points: int = Field(default=2000, ge=100, le=10000, description="Anzahl der Datenpunkte (Stunden) für Training")
+    symbols: List[str] = Field(default=[], description="Weitere Symbole, die parallel trainiert werden")
+    timeframe: str = Field(default="1h", description="Timeframe der Trainingsdaten")
+    n_jobs: Optional[int] = Field(default=None, description="Threads für das Training des Random Forest")
+    mode: Optional[str] = Field(default=None, description="'full' oder 'incremental', Standard aus training_mode der Modellkonfiguration")
+
+    @validator('mode')
+    def validate_mode(cls, v):
+        if v is not None and v not in ['full', 'incremental']:
+            raise ValueError("Mode muss 'full' oder 'incremental' sein")
+        return v
 
 
 class TradeBotAPI:
-    def __init__(self, model, data_collector, trader, scheduler, parent_app=None):
+    def __init__(self, model, data_collector, trader, scheduler, parent_app=None, model_router=None,
+                 training_jobs=None):
         self.app = FastAPI(title="TradeBot API",
                            description="API für den prädiktiven Handelsbot",
                            version="1.0.0")
@@ -89,6 +104,10 @@ class TradeBotAPI:
 
         self.app.parent_app = parent_app
         self.model = model
+        # Symbol-specific models, symbols without one are served by self.model
+        self.model_router = model_router or ModelRouter(model)
+        # Training runs in background processes, see /api/train
+        self.training_jobs = training_jobs or TrainingJobManager(self.model_router, data_collector)
         self.data_collector = data_collector
         self.trader = trader
         self.scheduler = scheduler
@@ -172,7 +191,7 @@ class TradeBotAPI:
                         features['close'] = np.linspace(start_price, start_price * 1.01, len(features))
 
                 try:
-                    prediction = self.model.predict(features)
+                    prediction = self.model_router.predict(request.symbol, features)
                 except Exception as model_error:
                     self.logger.error(f"Fehler im Modell: {str(model_error)}")
                     current_price = features['close'].iloc[-1]
@@ -195,6 +214,7 @@ class TradeBotAPI:
                     raise HTTPException(status_code=500, detail=prediction['error'])
 
                 prediction['symbol'] = request.symbol
+                prediction['data_source'] = features.attrs.get('source')
 
                 return prediction
 
@@ -208,11 +228,10 @@ class TradeBotAPI:
         async def execute_trade(request: TradeRequest):
             """manual trade"""
             try:
-                features = self.data_collector.prepare_features(request.symbol)
-                if features is None or features.empty:
+                current_price = self.data_collector.get_prices([request.symbol]).get(request.symbol)
+                if current_price is None:
                     raise HTTPException(status_code=400, detail=f"Keine Daten für {request.symbol} verfügbar")
 
-                current_price = features['close'].iloc[-1]
                 prediction = {
                     'current': current_price,
                     'prediction': current_price * (1.02 if request.action == 'buy' else 0.98),
@@ -325,7 +344,12 @@ class TradeBotAPI:
                             self.logger.error(f"Keine Daten für {symbol} verfügbar")
                             return
 
-                        prediction = self.model.predict(features)
+                        prediction = self.model_router.predict(symbol, features)
+
+                        # Stop-Loss/Take-Profit der offenen Trades mit aktuellen Preisen prüfen
+                        if self.trader.open_trades:
+                            open_symbols = list({trade['symbol'] for trade in self.trader.open_trades})
+                            self.trader.update_open_trades(self.data_collector.get_prices(open_symbols))
 
                         if 'error' in prediction:
                             self.logger.error(f"Fehler bei Vorhersage: {prediction['error']}")
@@ -335,6 +359,11 @@ class TradeBotAPI:
 
                         self.logger.info(f"Vorhersagejob für {symbol} abgeschlossen: {trade_result['action']}")
 
+                        # Inkrementelles Training: das Modell des Symbols mit den neuen Kerzen aktualisieren
+                        if self.model.config.get('training_mode') == 'incremental' and \
+                                not self.training_jobs.is_active(symbol):
+                            self.training_jobs.submit(symbol, mode='incremental')
+
                     except Exception as e:
                         self.logger.error(f"Fehler im Vorhersagejob: {str(e)}")
 
@@ -372,73 +401,45 @@ class TradeBotAPI:
 
         @self.app.post("/api/train")
         async def train_model(request: TrainModelRequest):
+            """Startet das Training als Hintergrundjob, ein Job pro Symbol"""
             try:
-                self.logger.info(f"Starte Modelltraining für {request.symbol}")
-
-                features = self.data_collector.get_market_data(request.symbol, limit=request.data_points)
-
-                self.logger.info(
-                    f"Erhaltene Daten: Shape: {features.shape if hasattr(features, 'shape') else 'Kein DataFrame'}")
-                self.logger.info(f"Datentyp: {type(features)}")
-
-                if hasattr(features, 'empty') and features.empty:
-                    raise HTTPException(status_code=400, detail=f"Keine Trainingsdaten für {request.symbol} verfügbar")
-
-                self.logger.info(
-                    f"Spalten im DataFrame: {features.columns.tolist() if hasattr(features, 'columns') else 'Keine Spalten'}")
-
-                if 'close' not in features.columns and 'Close' in features.columns:
-                    self.logger.info("Konvertiere 'Close' zu 'close'")
-                    features['close'] = features['Close']
-
-                if 'close' not in features.columns:
-                    available_cols = features.columns.tolist() if hasattr(features, 'columns') else "keine Spalten"
-                    raise HTTPException(status_code=400,
-                                        detail=f"Spalte 'close' fehlt in den Daten. Verfügbare Spalten: {available_cols}")
-
-                try:
-                    features['rsi'] = self.data_collector._calculate_rsi(features['close'])
-                    features['macd'], features['macd_signal'] = self.data_collector._calculate_macd(features['close'])
-                    features['ema_short'] = features['close'].ewm(span=12).mean()
-                    features['ema_medium'] = features['close'].ewm(span=26).mean()
-                    features['ema_long'] = features['close'].ewm(span=50).mean()
-                    features['volatility'] = features['close'].rolling(window=24).std()
-
-                    import numpy as np
-                    features['sentiment'] = np.random.uniform(-0.5, 0.5, size=len(features))
-                except Exception as e:
-                    self.logger.error(f"Fehler beim Berechnen der technischen Indikatoren: {str(e)}")
-                    raise HTTPException(status_code=500,
-                                        detail=f"Fehler beim Berechnen der technischen Indikatoren: {str(e)}")
-
-                features_clean = features.dropna()
-                if features_clean.empty:
-                    raise HTTPException(status_code=400,
-                                        detail="Nach Entfernen von Null-Werten sind keine Daten mehr übrig")
-
-                try:
-                    self.model.train(features_clean)
-                except Exception as e:
-                    self.logger.error(f"Fehler beim Training des Modells: {str(e)}")
-                    import traceback
-                    self.logger.error(traceback.format_exc())
-                    raise HTTPException(status_code=500, detail=f"Fehler beim Training des Modells: {str(e)}")
+                symbols = [request.symbol] + [s for s in request.symbols if s != request.symbol]
+                job_ids = [self.training_jobs.submit(symbol, data_points=request.data_points,
+                                                     timeframe=request.timeframe, n_jobs=request.n_jobs,
+                                                     mode=request.mode)
+                           for symbol in symbols]
 
                 return {
-                    "message": f"Modell erfolgreich mit {len(features_clean)} Datenpunkten für {request.symbol} trainiert",
-                    "data_points": len(features_clean),
-                    "symbol": request.symbol,
+                    "message": f"Training für {', '.join(symbols)} gestartet",
+                    "job_id": job_ids[0],
+                    "job_ids": job_ids,
+                    "status": "queued",
                     "model_type": self.model.config.get('model_type', 'unknown')
                 }
-
-            except HTTPException as he:
-                raise he
             except Exception as e:
-                self.logger.error(f"Unbehandelte Ausnahme: {str(e)}")
-                import traceback
-                self.logger.error(traceback.format_exc())
+                self.logger.error(f"Fehler beim Starten des Trainings: {str(e)}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.get("/api/train/jobs")
+        async def get_training_jobs():
+            return {"jobs": self.training_jobs.list_jobs()}
+
+        @self.app.get("/api/train/{job_id}")
+        async def get_training_job(job_id: str):
+            job = self.training_jobs.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail=f"Trainingsjob {job_id} nicht gefunden")
+            return job
+
+        @self.app.delete("/api/train/{job_id}")
+        async def cancel_training_job(job_id: str):
+            if self.training_jobs.get(job_id) is None:
+                raise HTTPException(status_code=404, detail=f"Trainingsjob {job_id} nicht gefunden")
+            if not self.training_jobs.cancel(job_id):
+                raise HTTPException(status_code=409,
+                                    detail=f"Trainingsjob {job_id} ist bereits beendet oder speichert sein Modell")
+            return {"message": f"Trainingsjob {job_id} abgebrochen"}
+
     def run(self, host="0.0.0.0", port=8000):
         """Start API-Server"""
         log_config = {
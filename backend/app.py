@@ -7,6 +7,8 @@ from typing import Dict, Any
 
 # Lokale Module importieren
 from model import PredictionModel
+from model_router import ModelRouter
+from training_jobs import TrainingJobManager
 from data_collector import DataCollector
 from trader import Trader
 from scheduler import Scheduler
@@ -19,13 +21,19 @@ class TradeBotApp:
         self.config = self._load_config(config_file)
 
 
-        self.data_collector = DataCollector(api_keys=self.config.get('api_keys', {}))
+        data_config = self.config.get('data', {})
+        self.data_collector = DataCollector(api_keys=self.config.get('api_keys', {}),
+                                            base_timeframe=data_config.get('base_timeframe'),
+                                            max_base_candles=data_config.get('max_base_candles', 5000))
         self.model = PredictionModel(config=self.config.get('model', {}))
-        self.trader = Trader(config=self.config.get('trader', {}))
+        self.model_router = ModelRouter(self.model)
+        self.training_jobs = TrainingJobManager(self.model_router, self.data_collector)
+        self.trader = Trader(config=self.config.get('trader', {}), client_pool=self.data_collector.client_pool)
         self.scheduler = Scheduler()
 
 
-        self.api = TradeBotAPI(self.model, self.data_collector, self.trader, self.scheduler, parent_app=self)
+        self.api = TradeBotAPI(self.model, self.data_collector, self.trader, self.scheduler, parent_app=self,
+                               model_router=self.model_router, training_jobs=self.training_jobs)
 
     def _setup_logging(self):
         """Richtet das Logging ein"""
@@ -43,11 +51,16 @@ class TradeBotApp:
         """Lädt die Konfiguration aus einer Datei"""
         default_config = {
             'api_keys': {},
+            'data': {
+                'base_timeframe': None,  # z.B. '15m': höhere Timeframes werden aus diesen Kerzen gebildet
+                'max_base_candles': 5000
+            },
             'model': {
                 'model_type': 'random_forest',
                 'features': ['close', 'volume', 'rsi', 'macd', 'sentiment'],
                 'target': 'close',
-                'prediction_horizon': 1
+                'prediction_horizon': 1,
+                'training_mode': 'full'
             },
             'trader': {
                 'trading_enabled': False,
@@ -93,6 +106,10 @@ class TradeBotApp:
         """saves current config in a file"""
         config_to_save = {
             'api_keys': self.data_collector.api_keys,
+            'data': {
+                'base_timeframe': self.data_collector.base_timeframe,
+                'max_base_candles': self.data_collector.max_base_candles
+            },
             'model': self.model.config,
             'trader': self.trader.config,
             'api': {
@@ -130,4 +147,7 @@ class TradeBotApp:
     def stop(self):
         self.logger.info("TradeBot wird gestoppt...")
         self.scheduler.stop()
+        self.training_jobs.shutdown()
+        self.data_collector.client_pool.close_all()
+        self.data_collector.source_chain.shutdown()
         self.logger.info("TradeBot gestoppt")
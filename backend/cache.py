@@ -0,0 +1,123 @@
+# cache.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _InflightCall:
+    """A load that is currently running, shared by all callers of the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe cache with time-to-live and LRU eviction
+
+    get_or_load() coalesces concurrent loads of the same key: only the first
+    caller runs the loader, the others wait for its result (single-flight).
+    """
+
+    def __init__(self, ttl: float = 300.0, maxsize: int = 256):
+        """
+        Initializes the cache
+
+        Args:
+            ttl: Time in seconds an entry stays valid, None for no expiry
+            maxsize: Maximum number of entries, the least recently used ones are evicted
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, _InflightCall] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key, count=False)[0]
+
+    def _lookup(self, key: Hashable, count: bool = True):
+        """Returns (found, value) and drops the entry if it has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return True, value
+                del self._entries[key]
+            if count:
+                self.misses += 1
+            return False, None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value or default if it is missing or expired"""
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value, optionally with its own time-to-live"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Returns the cached value or loads it once for all concurrent callers
+
+        Exceptions of the loader are raised to every waiting caller and are not cached.
+        Values for which cacheable returns False are returned to the waiting callers
+        but not stored.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+            if cacheable is None or cacheable(call.value):
+                self.set(key, call.value)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Removes one entry or clears the cache"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
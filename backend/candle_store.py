@@ -0,0 +1,198 @@
+# candle_store.py
+import os
+import json
+import threading
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Candle length in ms per timeframe ('1M' is approximated with 31 days)
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000, '8h': 28_800_000,
+    '12h': 43_200_000, '1d': 86_400_000, '3d': 259_200_000, '1w': 604_800_000, '1M': 2_678_400_000
+}
+
+
+class CandleStore:
+    """
+    On-disk columnar store for OHLCV candles
+
+    Every (symbol, timeframe) pair gets its own directory with one .npy file per
+    column. Columns are memory-mapped when read, so only the pages that are
+    actually sliced (usually the newest candles) are loaded from disk.
+
+    Every write creates a new generation of column files and then replaces the
+    manifest (meta.json) with their names and row count, so readers always see
+    the columns of one complete write. Files of older generations are removed
+    afterwards.
+    """
+
+    COLUMNS = {
+        'timestamp': np.int64,  # open time in ms
+        'open': np.float64,
+        'high': np.float64,
+        'low': np.float64,
+        'close': np.float64,
+        'volume': np.float64,
+        'close_time': np.int64  # close time in ms
+    }
+
+    def __init__(self, base_dir: str = 'data/candles', max_candles: int = 20000):
+        """
+        Initializes the candle store
+
+        Args:
+            base_dir: Directory in which the candle files are stored
+            max_candles: Maximum number of candles kept per symbol and timeframe
+        """
+        self.base_dir = base_dir
+        self.max_candles = max_candles
+        self.logger = logging.getLogger('CandleStore')
+        self._lock = threading.Lock()
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _key_dir(self, symbol: str, timeframe: str) -> str:
+        """Returns the directory for a symbol and timeframe"""
+        return os.path.join(self.base_dir, f"{symbol.replace('/', '_')}_{timeframe}")
+
+    def _read_manifest(self, key_dir: str) -> Optional[Dict]:
+        """Returns the manifest of a directory, None if there is none"""
+        try:
+            with open(os.path.join(key_dir, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_columns(self, symbol: str, timeframe: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Memory-maps all columns of a symbol and timeframe
+
+        Returns None if nothing is stored, if the directory has no manifest (stores
+        written before manifests are refetched) or if a column does not have the row
+        count of the manifest.
+        """
+        key_dir = self._key_dir(symbol, timeframe)
+        if not os.path.isdir(key_dir):
+            return None
+
+        # A writer may replace the manifest and remove the files it named in between, read it again then
+        for _ in range(3):
+            manifest = self._read_manifest(key_dir)
+            if manifest is None or 'columns' not in manifest:
+                return None
+
+            try:
+                columns = {col: np.load(os.path.join(key_dir, manifest['columns'][col]), mmap_mode='r')
+                           for col in self.COLUMNS}
+            except FileNotFoundError:
+                continue
+
+            rows = manifest['rows']
+            if rows == 0:
+                return None
+            if any(len(values) != rows for values in columns.values()):
+                self.logger.warning(f"Candle files of {symbol} {timeframe} do not match the manifest, ignoring them")
+                return None
+            return columns
+        return None
+
+    def read(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Reads stored candles
+
+        Args:
+            symbol: Trading symbol (as used by the exchange)
+            timeframe: Candle timeframe (e.g. '1h')
+            limit: Number of newest candles to return, None for all
+
+        Returns:
+            DataFrame with the stored candles or None if nothing is stored
+        """
+        try:
+            columns = self._read_columns(symbol, timeframe)
+            if columns is None:
+                return None
+
+            if limit is not None:
+                columns = {col: values[-limit:] for col, values in columns.items()}
+
+            df = pd.DataFrame({col: np.array(values) for col, values in columns.items()})
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            return df
+        except Exception as e:
+            self.logger.warning(f"Error reading candles for {symbol} {timeframe}: {str(e)}")
+            return None
+
+    def last_close_time(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Returns the close time (ms) of the newest stored candle or None"""
+        columns = self._read_columns(symbol, timeframe)
+        if columns is None:
+            return None
+        return int(columns['close_time'][-1])
+
+    def append(self, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        """
+        Merges candles into the store
+
+        Candles with an already stored timestamp replace the stored values.
+
+        Args:
+            symbol: Trading symbol (as used by the exchange)
+            timeframe: Candle timeframe
+            df: DataFrame with the columns from COLUMNS ('timestamp' as datetime or ms)
+
+        Returns:
+            Number of candles stored after the merge
+        """
+        if df is None or df.empty:
+            return 0
+
+        new = {}
+        for col, dtype in self.COLUMNS.items():
+            values = df[col]
+            if col == 'timestamp' and pd.api.types.is_datetime64_any_dtype(values):
+                values = values.astype('datetime64[ms]').astype(np.int64)
+            new[col] = np.asarray(values, dtype=dtype)
+
+        with self._lock:
+            existing = self._read_columns(symbol, timeframe)
+            if existing is not None:
+                # Drop stored candles that are overwritten by the new ones
+                keep = ~np.isin(existing['timestamp'], new['timestamp'])
+                merged = {col: np.concatenate([existing[col][keep], new[col]]) for col in self.COLUMNS}
+            else:
+                merged = new
+
+            order = np.argsort(merged['timestamp'], kind='stable')
+            merged = {col: values[order][-self.max_candles:] for col, values in merged.items()}
+
+            key_dir = self._key_dir(symbol, timeframe)
+            os.makedirs(key_dir, exist_ok=True)
+            previous = self._read_manifest(key_dir) or {}
+            generation = previous.get('generation', 0) + 1
+
+            # New files first, the manifest switches readers over to them in one replace
+            files = {}
+            for col, values in merged.items():
+                files[col] = f"{col}.{generation}.npy"
+                with open(os.path.join(key_dir, files[col]), 'wb') as f:
+                    np.save(f, values)
+
+            manifest_path = os.path.join(key_dir, 'meta.json')
+            with open(f"{manifest_path}.tmp", 'w') as f:
+                json.dump({'symbol': symbol, 'timeframe': timeframe, 'rows': len(merged['timestamp']),
+                           'generation': generation, 'columns': files}, f)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+
+            # Files of older generations (and of the layout before manifests)
+            for filename in os.listdir(key_dir):
+                if filename.endswith('.npy') and filename not in files.values():
+                    try:
+                        os.remove(os.path.join(key_dir, filename))
+                    except OSError:
+                        pass  # still memory-mapped on platforms that lock open files
+
+        return len(merged['timestamp'])
@@ -0,0 +1,94 @@
+# client_pool.py
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+class BinanceClientPool:
+    """
+    Pool of reusable Binance clients keyed by credentials
+
+    Each client keeps its own requests session, so HTTP keep-alive and TLS sessions
+    are reused across kline, ticker and order calls. The least recently used client
+    is closed when more than max_clients different credentials are in use.
+    """
+
+    def __init__(self, max_clients: int = 4, pool_maxsize: int = 10, timeout: float = 10.0):
+        """
+        Initializes the client pool
+
+        Args:
+            max_clients: Maximum number of clients (credential sets) kept open
+            pool_maxsize: Maximum number of keep-alive connections per client
+            timeout: Timeout in seconds for every request of a pooled client
+        """
+        self.max_clients = max_clients
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.logger = logging.getLogger('BinanceClientPool')
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key: str, api_secret: str = '') -> Any:
+        """
+        Returns the pooled client for the credentials, creating it if necessary
+
+        Args:
+            api_key: Binance API key
+            api_secret: Binance API secret
+
+        Returns:
+            binance.client.Client instance
+        """
+        key = (api_key, api_secret)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = self._create_client(api_key, api_secret)
+            self._clients[key] = client
+
+            while len(self._clients) > self.max_clients:
+                _, evicted = self._clients.popitem(last=False)
+                self._close_client(evicted)
+
+            return client
+
+    def _create_client(self, api_key: str, api_secret: str) -> Any:
+        """Creates a client with a keep-alive session and without the startup ping"""
+        from binance.client import Client
+        from requests.adapters import HTTPAdapter
+
+        client = Client(api_key, api_secret, requests_params={'timeout': self.timeout}, ping=False)
+
+        # Keep enough connections alive for concurrent requests on the same client
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        client.session.mount('https://', adapter)
+
+        self.logger.info(f"Created Binance client ({len(self._clients) + 1}/{self.max_clients} in pool)")
+        return client
+
+    def _close_client(self, client: Any) -> None:
+        """Closes the HTTP session of a client"""
+        try:
+            client.close_connection()
+        except Exception as e:
+            self.logger.warning(f"Error closing Binance client: {str(e)}")
+
+    def close_all(self) -> None:
+        """Closes all pooled clients"""
+        with self._lock:
+            for client in self._clients.values():
+                self._close_client(client)
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of pooled clients and the size limit"""
+        return {
+            'clients': len(self._clients),
+            'max_clients': self.max_clients
+        }
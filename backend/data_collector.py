@@ -18,6 +18,21 @@ import numpy as np
 import time
 from datetime import datetime, timedelta
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from candle_store import CandleStore, INTERVAL_MS
+from simulator import MarketSimulator
+from kline_parser import klines_to_frame
+from resample import Resampler, can_resample, resample_ohlcv
+from source_chain import SourceChain, DataSource, SourceChainError
+from rate_limiter import (RequestScheduler, ENDPOINT_WEIGHTS, PRIORITY_TRADE, PRIORITY_LIVE,
+                          PRIORITY_BACKFILL)
+from client_pool import BinanceClientPool
+from kline_stream import KlineStream
+from features import FeaturePipeline, calculate_rsi, calculate_macd
+from cache import TTLCache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,17 +43,126 @@ logging.basicConfig(
     ]
 )
 
+# Maximum number of klines Binance returns per request
+KLINES_PAGE_SIZE = 1000
+
+# Quote assets stripped from Binance symbols for the news ticker (e.g. BTCUSDT -> CRYPTO:BTC)
+NEWS_QUOTE_ASSETS = ('USDT', 'BUSD', 'USDC', 'USD', 'EUR')
+
+# Yahoo Finance bar intervals and how far back they are served
+YAHOO_INTERVALS = {'1m': '1m', '5m': '5m', '15m': '15m', '30m': '30m', '1h': '1h', '1d': '1d', '1w': '1wk'}
+YAHOO_MAX_HISTORY_MS = {
+    '1m': 7 * 86_400_000, '5m': 59 * 86_400_000, '15m': 59 * 86_400_000, '30m': 59 * 86_400_000,
+    '1h': 729 * 86_400_000, '1d': 10 * 365 * 86_400_000, '1w': 20 * 365 * 86_400_000
+}
+
 
 class DataCollector:
-    def __init__(self, api_keys=None):
+    def __init__(self, api_keys=None, data_dir='data', sentiment_ttl=900, news_timeout=10,
+                 backfill_workers=4, float_dtype=np.float64, price_max_age=5.0, base_timeframe=None,
+                 request_queue_timeout=30.0, source_deadlines=None, overall_deadline=20.0, hedge=False,
+                 hedge_percentile=95.0, max_base_candles=5000):
         self.api_keys = api_keys or {}
         self.logger = logging.getLogger('DataCollector')
 
+        # dtype of parsed OHLCV values, np.float32 halves the memory of large backfills
+        self.float_dtype = float_dtype
+
+        # News sentiment changes slowly and the API is heavily rate-limited
+        self.sentiment_cache = TTLCache(ttl=sentiment_ttl, maxsize=256)
+        self.news_timeout = news_timeout
+
+        # Local candle store, read before the exchange is asked for data
+        try:
+            self.candle_store = CandleStore(os.path.join(data_dir, 'candles'))
+        except Exception as e:
+            self.logger.warning(f"Candle store not available: {str(e)}")
+            self.candle_store = None
+
+        # Market data source deadlines (seconds), also the HTTP timeout of their requests
+        self.source_deadlines = {'binance': 8.0, 'yahoo': 8.0}
+        self.source_deadlines.update(source_deadlines or {})
+
+        # Shared Binance clients, reused by kline, ticker and order calls
+        self.client_pool = BinanceClientPool(timeout=self.source_deadlines['binance'])
+
+        # Optional websocket kline stream, see start_stream()
+        self.kline_stream = None
+        self.stream_max_age = 60.0
+
+        # Shared feature definitions with running indicator state and memoized results
+        self.feature_pipeline = FeaturePipeline()
+        self.indicator_engine = self.feature_pipeline.indicator_engine
+
+        # Synthetic data if no real data source is available
+        self.simulator = MarketSimulator()
+
+        # Higher timeframes are built locally from base_timeframe candles (e.g. '15m' or '1h') if set,
+        # as long as at most max_base_candles base candles are needed
+        self.base_timeframe = base_timeframe
+        self.max_base_candles = max_base_candles
+        self.resampler = Resampler()
+
+        # Last prices for trades and stop-loss checks, see get_prices()
+        self.price_max_age = price_max_age
+        self._prices = {}  # binance symbol -> (time.monotonic(), price)
+        self._price_lock = threading.Lock()
+
+        # Parallel backfill of windows larger than one klines page
+        self.backfill_workers = backfill_workers
+
+        # All Binance requests go through one weight-aware scheduler
+        self.request_scheduler = RequestScheduler()
+        self.request_queue_timeout = request_queue_timeout
+
+        # Market data sources in order of preference, each bounded by its deadline
+        self.source_chain = SourceChain([
+            DataSource('binance', self._fetch_binance_market_data, deadline=self.source_deadlines['binance']),
+            DataSource('yahoo', self._fetch_yahoo_market_data, deadline=self.source_deadlines['yahoo'])
+        ], overall_deadline=overall_deadline, hedge=hedge, hedge_percentile=hedge_percentile)
+
     def get_market_data(self, symbol, timeframe='1h', limit=100):
         """Collects historical market data for a specific symbol"""
         self.logger.info(f"Starting market data retrieval for {symbol} with limit {limit}")
 
-        # ATTEMPT 1: Binance API with Python-Binance library
+        # ATTEMPT 0: In-memory buffer of the kline stream (no network I/O)
+        df = self._get_streamed_market_data(symbol, timeframe, limit)
+        if df is not None:
+            df.attrs['source'] = 'stream'
+            return df
+
+        # Higher timeframes are aggregated from the base candle feed instead of downloaded separately
+        if self.base_timeframe and can_resample(self.base_timeframe, timeframe):
+            try:
+                df = self._get_resampled_market_data(symbol, timeframe, limit)
+                if df is not None:
+                    df.attrs['source'] = 'resampled'
+                    return df
+            except Exception as e:
+                self.logger.warning(f"Error resampling {self.base_timeframe} candles to {timeframe}: {str(e)}")
+
+        # ATTEMPT 1/2: Binance API, then Yahoo Finance, each within its deadline
+        try:
+            # Multi-page downloads get proportionally longer deadlines
+            deadline_scale = max(1.0, limit / KLINES_PAGE_SIZE)
+            df, source = self.source_chain.run((symbol, timeframe, limit), deadline_scale=deadline_scale)
+            df.attrs['source'] = source
+            return df
+        except SourceChainError as e:
+            self.logger.warning(f"No market data source delivered data for {symbol}: {str(e)}")
+
+        # FALLBACK: Synthetic data (if everything else fails)
+        self.logger.warning(f"No real data available for {symbol}, creating synthetic data")
+
+        # Unaligned end time, so the synthetic series never continues real candles
+        df = self.simulator.generate(symbol, limit, timeframe, end=pd.Timestamp.now())[symbol]
+        df.attrs['source'] = 'synthetic'
+
+        self.logger.info(f"Synthetic data created: {len(df)} data points with columns {df.columns.tolist()}")
+        return df
+
+    def _fetch_binance_market_data(self, symbol, timeframe, limit):
+        """Fetches candles from the Binance API (candle store top-up, backfill, klines, historical klines)"""
         try:
             from binance.client import Client
 
@@ -47,7 +171,7 @@ class DataCollector:
                 api_secret = self.api_keys['binance'].get('api_secret', '')
 
                 self.logger.info(f"Using Binance API for {symbol}")
-                client = Client(api_key, api_secret)
+                client = self.client_pool.get(api_key, api_secret)
 
                 # Adjust symbol for Binance (remove hyphen)
                 binance_symbol = symbol.replace('-', '')
@@ -73,26 +197,35 @@ class DataCollector:
 
                 binance_interval = interval_map.get(timeframe, Client.KLINE_INTERVAL_1HOUR)
 
+                # Serve from the local candle store and only fetch the candles after the last stored one
+                try:
+                    df = self._get_stored_market_data(client, binance_symbol, binance_interval, timeframe, limit)
+                    if df is not None:
+                        return df
+                except Exception as e:
+                    self.logger.warning(f"Error with candle store top-up: {str(e)}, fetching full window")
+
+                # Windows larger than one page are fetched as parallel time chunks
+                if limit > KLINES_PAGE_SIZE and timeframe in INTERVAL_MS:
+                    try:
+                        df = self._backfill_klines(client, binance_symbol, binance_interval, timeframe, limit)
+                        if df is not None and not df.empty:
+                            self._store_candles(binance_symbol, timeframe, df)
+                            return df
+                    except Exception as e:
+                        self.logger.warning(f"Error with Binance backfill: {str(e)}, trying single request")
+
                 # use get_klines or get_historical_klines
                 try:
                     self.logger.info(
                         f"Binance Klines request for {binance_symbol}, interval {binance_interval}, limit {limit}")
-                    klines = client.get_klines(symbol=binance_symbol, interval=binance_interval, limit=limit)
+                    priority = PRIORITY_BACKFILL if limit > KLINES_PAGE_SIZE else PRIORITY_LIVE
+                    klines = self._binance_call(client, client.get_klines, 'klines', priority,
+                                                symbol=binance_symbol, interval=binance_interval, limit=limit)
 
                     if klines and len(klines) > 0:
-                        # Convert to DataFrame
-                        df = pd.DataFrame(klines, columns=[
-                            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                            'close_time', 'quote_asset_volume', 'number_of_trades',
-                            'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-                        ])
-
-                        # Convert columns to numeric values
-                        for col in ['open', 'high', 'low', 'close', 'volume']:
-                            df[col] = pd.to_numeric(df[col])
-
-                        # Convert timestamp to datetime
-                        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                        df = self._klines_to_frame(klines)
+                        self._store_candles(binance_symbol, timeframe, df)
 
                         self.logger.info(
                             f"Binance data successfully retrieved: {len(df)} data points with columns {df.columns.tolist()}")
@@ -113,23 +246,16 @@ class DataCollector:
 
                         self.logger.info(
                             f"Binance Historical Klines request for {binance_symbol}, interval {binance_interval}, Start {start_str}")
-                        klines = client.get_historical_klines(symbol=binance_symbol, interval=binance_interval,
-                                                              start_str=start_str, end_str=end_str)
+                        # Pages through the range internally, so reserve the weight of all pages
+                        pages = limit // KLINES_PAGE_SIZE + 1
+                        klines = self.request_scheduler.call(
+                            client, client.get_historical_klines, weight=pages * ENDPOINT_WEIGHTS['klines'],
+                            priority=PRIORITY_BACKFILL, timeout=self.request_queue_timeout,
+                            symbol=binance_symbol, interval=binance_interval, start_str=start_str, end_str=end_str)
 
                         if klines and len(klines) > 0:
-                            # Convert to DataFrame
-                            df = pd.DataFrame(klines, columns=[
-                                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                                'close_time', 'quote_asset_volume', 'number_of_trades',
-                                'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-                            ])
-
-                            # Convert columns to numeric values
-                            for col in ['open', 'high', 'low', 'close', 'volume']:
-                                df[col] = pd.to_numeric(df[col])
-
-                            # Convert timestamp to datetime
-                            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                            df = self._klines_to_frame(klines)
+                            self._store_candles(binance_symbol, timeframe, df)
 
                             self.logger.info(f"Binance Historical data successfully retrieved: {len(df)} data points")
                             return df
@@ -143,9 +269,17 @@ class DataCollector:
         except Exception as e:
             self.logger.warning(f"Unexpected error with Binance API: {str(e)}")
 
-        # ATTEMPT 2: Yahoo Finance (if Binance is not available)
+        return None
+
+    def _fetch_yahoo_market_data(self, symbol, timeframe, limit):
+        """
+        Fetches candles from Yahoo Finance
+
+        Only the window after the newest stored candle (or the requested window if
+        nothing usable is stored) is downloaded. Yahoo has no 2h/4h bars, those are
+        built from 1h bars.
+        """
         try:
-            self.logger.info(f"Trying Yahoo Finance for {symbol}")
             import yfinance as yf
 
             # Adjust symbol for Yahoo Finance
@@ -153,186 +287,604 @@ class DataCollector:
             if "-USDT" in symbol:
                 yahoo_symbol = symbol.replace("-USDT", "-USD")
 
-            self.logger.info(f"Querying Yahoo Finance with symbol: {yahoo_symbol}")
-            ticker = yf.Ticker(yahoo_symbol)
-
-            # Adjust timeframe
-            interval_map = {'1m': '1m', '5m': '5m', '15m': '15m', '30m': '30m',
-                            '1h': '1h', '2h': '2h', '4h': '4h', '1d': '1d', '1w': '1wk'}
-            yahoo_interval = interval_map.get(timeframe, '1h')
-
-            # Set period
-            period_map = {'1m': '7d', '5m': '7d', '15m': '7d', '30m': '7d',
-                          '1h': '60d', '2h': '60d', '4h': '60d', '1d': '730d', '1w': '5y'}
-            period = period_map.get(timeframe, '60d')
-
-            self.logger.info(f"Yahoo Finance query: period={period}, interval={yahoo_interval}")
-            df = ticker.history(period=period, interval=yahoo_interval)
-
-            if not df.empty:
-                self.logger.info(
-                    f"Yahoo Finance data successfully retrieved: {len(df)} data points with columns {df.columns.tolist()}")
-
-                # IMPORTANT: Make sure the 'close' column is present
-                if 'Close' in df.columns:
-                    df['close'] = df['Close']
-                if 'Open' in df.columns:
-                    df['open'] = df['Open']
-                if 'High' in df.columns:
-                    df['high'] = df['High']
-                if 'Low' in df.columns:
-                    df['low'] = df['Low']
-                if 'Volume' in df.columns:
-                    df['volume'] = df['Volume']
-
-                return df
+            if timeframe not in YAHOO_INTERVALS and not can_resample('1h', timeframe):
+                timeframe = '1h'
+            fetch_timeframe = timeframe if timeframe in YAHOO_INTERVALS else '1h'
+            store_symbol = f"yahoo_{yahoo_symbol}"
+
+            now_ms = int(time.time() * 1000)
+            window_start = self._window_start(timeframe, limit)
+
+            # Top up the stored candles if they cover the requested window; candles that ended
+            # before the window are of no use, only the window itself is downloaded then
+            stored = self.candle_store.read(store_symbol, timeframe, limit=limit) if self.candle_store else None
+            if stored is not None and (len(stored) < limit or int(stored['close_time'].iloc[-1]) < window_start):
+                stored = None
+            start_ms = int(stored['close_time'].iloc[-1]) + 1 if stored is not None else window_start
+
+            # Yahoo only serves a limited history for intraday bars
+            earliest_ms = now_ms - YAHOO_MAX_HISTORY_MS[fetch_timeframe]
+            if stored is not None and start_ms < earliest_ms:
+                stored, start_ms = None, window_start
+            start_ms = max(start_ms, earliest_ms)
+
+            def download(start):
+                self.logger.info(f"Yahoo Finance query for {yahoo_symbol}: "
+                                 f"interval={YAHOO_INTERVALS[fetch_timeframe]}, start={pd.Timestamp(start, unit='ms')}")
+                raw = yf.Ticker(yahoo_symbol).history(start=pd.Timestamp(start, unit='ms', tz='UTC').to_pydatetime(),
+                                                      end=pd.Timestamp(now_ms, unit='ms', tz='UTC').to_pydatetime(),
+                                                      interval=YAHOO_INTERVALS[fetch_timeframe],
+                                                      timeout=self.source_deadlines['yahoo'])
+                candles = self._normalize_yahoo_frame(raw, fetch_timeframe)
+                if candles is not None and fetch_timeframe != timeframe:
+                    candles = resample_ohlcv(candles, timeframe, fetch_timeframe)
+                if candles is not None and not candles.empty:
+                    self._store_candles(store_symbol, timeframe, candles)
+                return candles
+
+            fresh = download(start_ms)
+            if stored is None:
+                df = fresh
+            elif fresh is None or fresh.empty:
+                df = stored
             else:
+                df = pd.concat([stored, fresh], ignore_index=True)
+                df = df.drop_duplicates(subset='timestamp', keep='last')
+
+            if stored is not None and not self._is_continuous_window(df.iloc[-limit:], timeframe, window_start):
+                # The stored candles leave a gap in the window, only Yahoo's own candles are served
+                self.logger.info(f"Stored Yahoo candles of {yahoo_symbol} leave a gap, downloading the window")
+                df = fresh = download(max(window_start, earliest_ms))
+
+            if df is None or df.empty:
                 self.logger.warning(f"Yahoo Finance returned empty data for {yahoo_symbol}")
+                return None
+
+            df = df.iloc[-limit:].reset_index(drop=True)
+            self.logger.info(f"Yahoo Finance data retrieved: {len(df)} data points, "
+                             f"{0 if fresh is None else len(fresh)} new from Yahoo")
+            return df
         except Exception as e:
             self.logger.warning(f"Error retrieving Yahoo Finance data: {str(e)}")
 
-        # FALLBACK: Synthetic data (if everything else fails)
-        self.logger.warning(f"No real data available for {symbol}, creating synthetic data")
+        return None
 
-        # Generate timestamps for the last 'limit' hours
-        timestamps = [datetime.now() - timedelta(hours=i) for i in range(limit)]
-        timestamps.reverse()  # Chronological order
+    def _normalize_yahoo_frame(self, raw, timeframe):
+        """Converts a yfinance history frame to the candle format of the Binance path"""
+        if raw is None or raw.empty:
+            return None
 
-        # Initial price based on symbol
-        if 'BTC' in symbol:
-            base_price = 30000.0
-        elif 'ETH' in symbol:
-            base_price = 2000.0
-        else:
-            base_price = 100.0  # Generic value for other symbols
-
-        # Simulate price movement
-        prices = []
-        price = base_price
-        for i in range(limit):
-            # Random price change with slight trend
-            change = np.random.normal(0, base_price * 0.01)  # 1% volatility
-            if i % 10 < 5:  # Slight upward trend for the first 5 periods of 10
-                change += base_price * 0.002
+        # yfinance returns capitalized columns and a timezone-aware DatetimeIndex
+        df = raw.rename(columns=str.lower)[['open', 'high', 'low', 'close', 'volume']]
+        index = pd.DatetimeIndex(raw.index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        timestamps = index.as_unit('ms').asi8
+
+        df = df.astype(self.float_dtype).reset_index(drop=True)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='ms'))
+        df['close_time'] = timestamps + INTERVAL_MS[timeframe] - 1
+        return df
+
+    def start_stream(self, symbols, timeframes='1h', buffer_size=1000, url=None, max_age=60.0):
+        """
+        Starts streaming kline updates into per-symbol ring buffers
+
+        The buffers are seeded via REST first, afterwards get_market_data and
+        prepare_features are served from memory for the subscribed pairs while the
+        websocket is connected and the buffer received an update within max_age.
+
+        Args:
+            symbols: List of trading symbols (e.g. ['BTC-USDT'])
+            timeframes: Timeframe or list of timeframes
+            buffer_size: Number of candles kept per symbol and timeframe
+            url: Websocket endpoint, defaults to the Binance combined stream
+            max_age: Seconds without an update after which a buffer is not served anymore
+        """
+        self.stop_stream()
+        self.stream_max_age = max_age
+
+        timeframe_list = [timeframes] if isinstance(timeframes, str) else list(timeframes)
+        pairs = [(symbol.replace('-', ''), timeframe) for symbol in symbols for timeframe in timeframe_list]
+        stream = KlineStream(pairs, buffer_size=buffer_size, **({'url': url} if url else {}))
+
+        # Seed the buffers with the current history, only Binance candles continue the Binance stream
+        for symbol in symbols:
+            for timeframe in timeframe_list:
+                df = self.get_market_data(symbol, timeframe, limit=buffer_size)
+                if df is not None and df.attrs.get('source') == 'binance':
+                    stream.get_buffer(symbol.replace('-', ''), timeframe).seed(df)
+                else:
+                    self.logger.warning(f"No Binance history to seed the kline stream buffer of {symbol} {timeframe}")
+
+        stream.start()
+        self.kline_stream = stream
+        return stream
+
+    def stop_stream(self):
+        """Stops the kline stream if it is running"""
+        if self.kline_stream is not None:
+            self.kline_stream.stop()
+            self.kline_stream = None
+
+    def _get_streamed_market_data(self, symbol, timeframe, limit):
+        """Returns market data from the kline stream buffer or None if it cannot serve the request"""
+        stream = self.kline_stream
+        if stream is None or not stream.running or not stream.connected.is_set():
+            return None
+
+        buffer = stream.get_buffer(symbol.replace('-', ''), timeframe)
+        if buffer is None or len(buffer) < limit:
+            return None
+
+        # Binance pushes kline updates every few seconds, a silent buffer is stale
+        if buffer.updated_at is None or time.monotonic() - buffer.updated_at > self.stream_max_age:
+            return None
+
+        df = buffer.to_frame(limit)
+
+        # Candles missed while the websocket was reconnecting leave gaps (months vary in length)
+        if timeframe in INTERVAL_MS and timeframe != '1M' and len(df) > 1:
+            steps = np.diff(df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64))
+            if (steps != INTERVAL_MS[timeframe]).any():
+                self.logger.info(f"Kline stream buffer for {symbol} {timeframe} has gaps, not served")
+                return None
+
+        self.logger.info(f"Market data for {symbol} served from kline stream buffer: {len(df)} data points")
+        return df
+
+    def _get_resampled_market_data(self, symbol, timeframe, limit):
+        """
+        Returns `timeframe` candles aggregated from base_timeframe candles or None
+
+        None if the window would need more than max_base_candles base candles (e.g. a
+        week of 1d candles from 15m needs 768, half a year needs 17k), the timeframe
+        is then downloaded directly. Synthetic base candles are not resampled either.
+        """
+        factor = -(-INTERVAL_MS[timeframe] // INTERVAL_MS[self.base_timeframe])
+        # One extra bucket, since the oldest one may be incomplete and is dropped
+        base_limit = (limit + 1) * factor
+        if base_limit > self.max_base_candles:
+            self.logger.info(f"{limit} {timeframe} candles need {base_limit} {self.base_timeframe} candles, "
+                             f"more than {self.max_base_candles}, fetching {timeframe} directly")
+            return None
+
+        base_df = self.get_market_data(symbol, self.base_timeframe, limit=base_limit)
+        if base_df is None or base_df.empty or 'timestamp' not in base_df.columns:
+            return None
+        if base_df.attrs.get('source') == 'synthetic':
+            return None
+
+        df = self.resampler.resample(symbol, self.base_timeframe, timeframe, base_df, limit=limit)
+        self.logger.info(
+            f"Market data for {symbol} {timeframe} resampled from {len(base_df)} {self.base_timeframe} candles: "
+            f"{len(df)} data points")
+        return df
+
+    def get_prices(self, symbols, max_age=None):
+        """
+        Returns the last prices of several symbols
+
+        Prices come from the kline stream if it is fresh enough, otherwise from one bulk
+        ticker request for all symbols, cached for max_age seconds. Symbols without a
+        price are left out of the result.
+
+        Args:
+            symbols: List of trading symbols (e.g. ['BTC-USDT'])
+            max_age: Maximum age of a price in seconds, defaults to price_max_age
+
+        Returns:
+            Dictionary with the price per symbol
+        """
+        max_age = self.price_max_age if max_age is None else max_age
+        prices = {}
+        missing = []
+
+        for symbol in symbols:
+            price = self._get_cached_price(symbol.replace('-', ''), max_age)
+            if price is None:
+                missing.append(symbol)
             else:
-                change -= base_price * 0.001
+                prices[symbol] = price
+
+        if missing:
+            with self._price_lock:
+                # Another thread may have refreshed the prices while we waited
+                still_missing = [symbol for symbol in missing
+                                 if self._get_cached_price(symbol.replace('-', ''), max_age) is None]
+                if still_missing:
+                    self._refresh_prices()
+
+            for symbol in missing:
+                price = self._get_cached_price(symbol.replace('-', ''), max_age)
+                if price is None:
+                    price = self._get_fallback_price(symbol)
+                if price is not None:
+                    prices[symbol] = price
+
+        return prices
+
+    def _get_cached_price(self, binance_symbol, max_age):
+        """Returns a price from the kline stream or the ticker cache if it is younger than max_age"""
+        now = time.monotonic()
+
+        stream = self.kline_stream
+        if stream is not None and stream.running and stream.connected.is_set():
+            for (symbol, _), buffer in stream.buffers.items():
+                if symbol == binance_symbol and buffer.updated_at is not None and now - buffer.updated_at <= max_age:
+                    return buffer.last_price()
+
+        cached = self._prices.get(binance_symbol)
+        if cached is not None and now - cached[0] <= max_age:
+            return cached[1]
+        return None
+
+    def _refresh_prices(self):
+        """Loads the prices of all symbols with one ticker request"""
+        binance_keys = self.api_keys.get('binance', {})
+        if not binance_keys.get('api_key'):
+            return
 
-            price += change
-            prices.append(price)
+        try:
+            client = self.client_pool.get(binance_keys['api_key'], binance_keys.get('api_secret', ''))
+            tickers = self._binance_call(client, client.get_symbol_ticker, 'ticker_price_all', PRIORITY_TRADE)
+            fetched_at = time.monotonic()
+            self._prices.update({ticker['symbol']: (fetched_at, float(ticker['price'])) for ticker in tickers})
+            self.logger.info(f"Ticker prices refreshed for {len(tickers)} symbols")
+        except Exception as e:
+            self.logger.warning(f"Error retrieving ticker prices: {str(e)}")
 
-        # Create dataframe
-        df = pd.DataFrame({
-            'timestamp': timestamps,
-            'open': [p * (1 + np.random.normal(0, 0.002)) for p in prices],
-            'high': [p * (1 + abs(np.random.normal(0, 0.005))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.005))) for p in prices],
-            'close': prices,
-            'volume': [np.random.uniform(100, 1000) * (base_price / 100) for _ in range(limit)]
-        })
+    def _get_fallback_price(self, symbol):
+        """
+        Returns the last close of the cached features or market data if no ticker price is available
 
-        self.logger.info(f"Synthetic data created: {len(df)} data points with columns {df.columns.tolist()}")
+        Synthetic candles are no price: they would trigger stop-loss and take-profit at
+        made-up levels, so None is returned and the trade waits for a real price.
+        """
+        try:
+            features = self.feature_pipeline.cache.get(self.feature_pipeline.cache_key(symbol, '1h'))
+            if features is None:
+                features = self.get_market_data(symbol, limit=1)
+            if features is None or features.attrs.get('source') == 'synthetic':
+                return None
+            if not features.empty and 'close' in features.columns:
+                return float(features['close'].iloc[-1])
+        except Exception as e:
+            self.logger.warning(f"Error retrieving fallback price for {symbol}: {str(e)}")
+        return None
+
+    def get_market_data_many(self, symbols, timeframes='1h', limit=100, max_workers=8, stacked=False):
+        """
+        Collects market data for several symbols (and timeframes) concurrently
+
+        Args:
+            symbols: List of trading symbols
+            timeframes: Timeframe or list of timeframes
+            limit: Number of candles per symbol and timeframe
+            max_workers: Maximum number of parallel requests
+            stacked: Return one DataFrame with 'symbol' and 'timeframe' columns instead of a dict
+
+        Returns:
+            Dict of DataFrames keyed by symbol (single timeframe) or by (symbol, timeframe),
+            or a single stacked DataFrame
+        """
+        single_timeframe = isinstance(timeframes, str)
+        timeframe_list = [timeframes] if single_timeframe else list(timeframes)
+        tasks = [(symbol, timeframe) for symbol in symbols for timeframe in timeframe_list]
+        if not tasks:
+            return pd.DataFrame() if stacked else {}
+
+        self.logger.info(f"Starting concurrent market data retrieval for {len(tasks)} symbol/timeframe pairs")
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+            futures = {task: executor.submit(self.get_market_data, task[0], task[1], limit) for task in tasks}
+            for (symbol, timeframe), future in futures.items():
+                try:
+                    df = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error retrieving market data for {symbol} {timeframe}: {str(e)}")
+                    df = pd.DataFrame()
+                results[symbol if single_timeframe else (symbol, timeframe)] = df
+
+        if not stacked:
+            return results
+
+        frames = []
+        for (symbol, timeframe) in tasks:
+            df = results[symbol if single_timeframe else (symbol, timeframe)]
+            if df is not None and not df.empty:
+                frames.append(df.assign(symbol=symbol, timeframe=timeframe))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _backfill_klines(self, client, binance_symbol, binance_interval, timeframe, limit):
+        """
+        Fetches a window of more than one klines page as concurrent time chunks
+
+        The window is split into page-sized time ranges that are requested in parallel
+        (at backfill priority of the request scheduler), then stitched and deduplicated.
+        Candles missing inside the series are requested once more; candles before the
+        first one returned are taken as not listed yet.
+
+        Returns:
+            DataFrame with up to `limit` candles, oldest first
+
+        Raises:
+            ValueError: If the series still has gaps after refetching them
+        """
+        interval_ms = INTERVAL_MS[timeframe]
+        now_ms = int(time.time() * 1000)
+        end_time = now_ms - now_ms % interval_ms + interval_ms - 1  # close time of the current candle
+        start_time = end_time + 1 - limit * interval_ms
+        ranges = self._kline_ranges(start_time, end_time, interval_ms)
+
+        self.logger.info(
+            f"Binance backfill for {binance_symbol}, interval {binance_interval}, {limit} candles in {len(ranges)} chunks")
+
+        def fetch_chunks(time_ranges):
+            def fetch_chunk(time_range):
+                return self._binance_call(client, client.get_klines, 'klines', PRIORITY_BACKFILL,
+                                          symbol=binance_symbol, interval=binance_interval,
+                                          startTime=time_range[0], endTime=time_range[1], limit=KLINES_PAGE_SIZE)
+
+            with ThreadPoolExecutor(max_workers=max(1, min(self.backfill_workers, len(time_ranges)))) as executor:
+                return [kline for page in executor.map(fetch_chunk, time_ranges) if page for kline in page]
+
+        def stitch(klines):
+            df = self._klines_to_frame(klines)
+            df = df.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+            return df.iloc[-limit:].reset_index(drop=True)
+
+        klines = fetch_chunks(ranges)
+        if not klines:
+            return None
+        df = stitch(klines)
+
+        # '1M' candles have different lengths and are not checked
+        gaps = self._kline_gaps(df, interval_ms) if timeframe != '1M' else []
+        if gaps:
+            self.logger.info(f"Binance backfill for {binance_symbol} has {len(gaps)} gaps, refetching them")
+            klines += fetch_chunks([chunk for gap in gaps for chunk in self._kline_ranges(*gap, interval_ms)])
+            df = stitch(klines)
+            gaps = self._kline_gaps(df, interval_ms)
+            if gaps:
+                raise ValueError(f"Binance backfill for {binance_symbol} still has {len(gaps)} gaps "
+                                 f"after refetching them")
+
+        self.logger.info(f"Binance backfill successfully retrieved: {len(df)} data points")
+        return df
+
+    def _kline_ranges(self, start_time, end_time, interval_ms):
+        """Splits [start_time, end_time] (ms) into time ranges of at most one klines page"""
+        chunk_ms = KLINES_PAGE_SIZE * interval_ms
+        return [(chunk_start, min(chunk_start + chunk_ms - 1, end_time))
+                for chunk_start in range(start_time, end_time + 1, chunk_ms)]
+
+    def _kline_gaps(self, df, interval_ms):
+        """Returns (first open time, last close time) of every run of missing candles inside df"""
+        open_times = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+        return [(int(open_times[i]) + interval_ms, int(open_times[i + 1]) - 1)
+                for i in np.flatnonzero(np.diff(open_times) > interval_ms)]
+
+    def _binance_call(self, client, func, endpoint, priority, **params):
+        """Executes a Binance client call through the request scheduler"""
+        return self.request_scheduler.call(client, func, weight=ENDPOINT_WEIGHTS[endpoint], priority=priority,
+                                           timeout=self.request_queue_timeout, **params)
+
+    def _klines_to_frame(self, klines):
+        """Converts a Binance klines payload to a DataFrame with the columns the pipeline uses"""
+        return klines_to_frame(klines, float_dtype=self.float_dtype)
+
+    def _store_candles(self, store_symbol, timeframe, df):
+        """Persists the closed candles of a candle DataFrame in the candle store"""
+        if self.candle_store is None or df is None or df.empty:
+            return
+
+        try:
+            # The newest candle is usually still open and must not be persisted
+            now_ms = int(time.time() * 1000)
+            closed = df[df['close_time'] < now_ms]
+            if not closed.empty:
+                self.candle_store.append(store_symbol, timeframe, closed[list(CandleStore.COLUMNS)])
+        except Exception as e:
+            self.logger.warning(f"Error storing candles for {store_symbol}: {str(e)}")
+
+    def _window_start(self, timeframe, limit):
+        """Open time (ms) of the oldest candle of a window of `limit` closed candles plus the open one"""
+        now_ms = int(time.time() * 1000)
+        interval_ms = INTERVAL_MS[timeframe]
+        return now_ms - now_ms % interval_ms - limit * interval_ms
+
+    def _is_continuous_window(self, df, timeframe, window_start):
+        """
+        True if the candles start inside the window and none is missing
+
+        Stored candles are combined with freshly fetched ones; a store that holds an old
+        block would otherwise fill the window with candles from long before it.
+        '1M' candles vary in length and are not checked.
+        """
+        if df is None or df.empty:
+            return False
+        if timeframe == '1M' or timeframe not in INTERVAL_MS:
+            return True
+
+        timestamps = df['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.DatetimeIndex(timestamps).as_unit('ms').asi8
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if timestamps[0] < window_start:
+            return False
+        return bool((np.diff(timestamps) == INTERVAL_MS[timeframe]).all())
+
+    def _get_stored_market_data(self, client, binance_symbol, binance_interval, timeframe, limit):
+        """
+        Returns market data from the candle store, topped up with the candles after the last stored close time
+
+        Returns None if the store cannot serve the requested window without gaps, so the
+        caller fetches it in full.
+        """
+        if self.candle_store is None or timeframe not in INTERVAL_MS:
+            return None
+
+        stored = self.candle_store.read(binance_symbol, timeframe, limit=limit)
+        if stored is None:
+            return None
+
+        # Never ask for candles before the requested window, even if the store is much older
+        start_time = int(stored['close_time'].iloc[-1]) + 1
+        window_start = self._window_start(timeframe, limit)
+        if start_time < window_start:
+            # The stored candles ended before the window, they would leave a gap
+            stored, start_time = stored.iloc[0:0], window_start
+        self.logger.info(f"Binance Klines top-up for {binance_symbol}, interval {binance_interval}, start {start_time}")
+        klines = self._binance_call(client, client.get_klines, 'klines', PRIORITY_LIVE,
+                                    symbol=binance_symbol, interval=binance_interval, startTime=start_time,
+                                    limit=KLINES_PAGE_SIZE)
+
+        # A full page means the gap may be larger than one request, fetch the whole window instead
+        if len(klines) >= 1000:
+            return None
+
+        fresh = self._klines_to_frame(klines) if klines else None
+        if fresh is not None and not fresh.empty:
+            self._store_candles(binance_symbol, timeframe, fresh)
+            df = pd.concat([stored, fresh[list(CandleStore.COLUMNS)]], ignore_index=True)
+            df = df.drop_duplicates(subset='timestamp', keep='last').iloc[-limit:].reset_index(drop=True)
+        else:
+            df = stored
+
+        # Not enough history stored yet for the requested window
+        if len(df) < limit:
+            return None
+
+        # The store may hold an older block before a gap, e.g. after the bot was offline for a while
+        if not self._is_continuous_window(df, timeframe, window_start):
+            self.logger.info(f"Stored candles of {binance_symbol} {timeframe} leave a gap in the window, "
+                             f"fetching it in full")
+            return None
+
+        self.logger.info(
+            f"Binance data served from candle store: {len(df)} data points, {len(klines)} new from the exchange")
         return df
 
     def get_news_sentiment(self, symbol):
         """Retrieves news sentiment for a symbol"""
         if 'news_api' in self.api_keys and self.api_keys['news_api']:
             try:
-                # Alpha Vantage News API
-                endpoint = f"https://www.alphavantage.co/query"
-                params = {
-                    'function': 'NEWS_SENTIMENT',
-                    'tickers': symbol,
-                    'apikey': self.api_keys['news_api']
-                }
-                response = requests.get(endpoint, params=params)
-                data = response.json()
-
-                sentiment_score = 0
-                if 'feed' in data:
-                    sentiments = [item.get('overall_sentiment_score', 0) for item in data['feed']]
-                    if sentiments:
-                        sentiment_score = sum(sentiments) / len(sentiments)
-
+                # Cached per news ticker for sentiment_ttl seconds, concurrent callers share one request
+                ticker = self._news_ticker(symbol)
+                sentiment_score = self.sentiment_cache.get_or_load(
+                    ticker, lambda: self._fetch_news_sentiment(ticker))
                 self.logger.info(f"Sentiment score for {symbol}: {sentiment_score}")
                 return sentiment_score
             except Exception as e:
                 self.logger.error(f"Error retrieving news sentiment: {str(e)}")
                 # Fallback to dummy value
 
-        # Return dummy value if no API key is available or an error occurred
+        return self._dummy_sentiment(symbol)
+
+    def get_news_sentiment_many(self, symbols, max_workers=4):
+        """
+        Retrieves news sentiment for several symbols
+
+        Alpha Vantage only returns articles that mention all tickers of a tickers=
+        query, so every uncached ticker is requested on its own, up to max_workers
+        at a time. Symbols with the same base asset share one request.
+
+        Returns:
+            Dictionary with the sentiment score per symbol
+        """
+        if not ('news_api' in self.api_keys and self.api_keys['news_api']) or len(symbols) <= 1:
+            return {symbol: self.get_news_sentiment(symbol) for symbol in symbols}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as executor:
+            scores = dict(zip(symbols, executor.map(self.get_news_sentiment, symbols)))
+        return scores
+
+    def _news_ticker(self, symbol):
+        """Alpha Vantage ticker of a trading symbol, e.g. 'BTC-USDT' -> 'CRYPTO:BTC'"""
+        if '-' in symbol:
+            return f"CRYPTO:{symbol.split('-')[0].upper()}"
+        for quote in NEWS_QUOTE_ASSETS:
+            if symbol.upper().endswith(quote) and len(symbol) > len(quote):
+                return f"CRYPTO:{symbol[:-len(quote)].upper()}"
+        return symbol.upper()
+
+    def _fetch_news_sentiment(self, ticker):
+        """
+        Requests the news sentiment of one Alpha Vantage ticker
+
+        The score is the average ticker_sentiment_score of the ticker over the returned
+        articles (overall_sentiment_score rates the whole article, which often covers
+        other assets), 0 without articles.
+        """
+        # Alpha Vantage News API
+        endpoint = "https://www.alphavantage.co/query"
+        params = {
+            'function': 'NEWS_SENTIMENT',
+            'tickers': ticker,
+            'apikey': self.api_keys['news_api']
+        }
+        response = requests.get(endpoint, params=params, timeout=self.news_timeout)
+        data = response.json()
+
+        sentiments = [float(entry.get('ticker_sentiment_score', 0))
+                      for item in data.get('feed', [])
+                      for entry in item.get('ticker_sentiment', [])
+                      if entry.get('ticker') == ticker]
+        return sum(sentiments) / len(sentiments) if sentiments else 0
+
+    def _dummy_sentiment(self, symbol):
+        """Returns a dummy sentiment if no API key is available or an error occurred"""
         import random
         dummy_score = random.uniform(-0.1, 0.1)  # Small random values, close to neutral
         self.logger.info(f"Using dummy sentiment for {symbol}: {dummy_score}")
         return dummy_score
 
-    def prepare_features(self, symbol, prediction_hours=1):
-        """Prepares features for the model"""
-        # Retrieve market data
-        market_data = self.get_market_data(symbol, limit=168)  # 1 week of hourly data
+    def prepare_features_many(self, symbols, prediction_hours=1, max_workers=8, timeframe='1h'):
+        """Prepares features for several symbols, fetching their market data concurrently"""
+        # Symbols with features for the current candle are served from the cache
+        pending = [symbol for symbol in symbols
+                   if self.feature_pipeline.cache_key(symbol, timeframe) not in self.feature_pipeline.cache]
+
+        market_data = {}
+        if pending:
+            market_data = self.get_market_data_many(pending, timeframe, limit=168, max_workers=max_workers)
+            self.get_news_sentiment_many(pending)  # Warms the sentiment cache concurrently
 
-        if market_data.empty:
+        return {symbol: self.prepare_features(symbol, prediction_hours, market_data=market_data.get(symbol),
+                                              timeframe=timeframe)
+                for symbol in symbols}
+
+    def prepare_features(self, symbol, prediction_hours=1, market_data=None, timeframe='1h'):
+        """Prepares features for the model"""
+        # Served from the cache until the next candle closes. Frames built from synthetic
+        # candles (all sources failed) are not cached, the next call tries the sources again
+        cache_key = self.feature_pipeline.cache_key(symbol, timeframe)
+        try:
+            features = self.feature_pipeline.cache.get_or_load(
+                cache_key, lambda: self._build_features(symbol, timeframe, market_data),
+                cacheable=lambda df: df.attrs.get('source') != 'synthetic')
+        except ValueError:
             return None
 
-        # Debug output of columns
-        self.logger.info(f"Original columns in market_data: {market_data.columns.tolist()}")
+        return features.copy()
 
-        # With yfinance the columns are capitalized, with Binance they are lowercase
-        # Ensure consistency
-        column_mapping = {
-            'Open': 'open',
-            'High': 'high',
-            'Low': 'low',
-            'Close': 'close',
-            'Volume': 'volume'
-        }
+    def _build_features(self, symbol, timeframe, market_data=None):
+        """Builds the feature frame of a symbol, raises ValueError if no market data is available"""
+        # Retrieve market data
+        if market_data is None:
+            market_data = self.get_market_data(symbol, timeframe, limit=168)  # 1 week of hourly data
 
-        for old_col, new_col in column_mapping.items():
-            if old_col in market_data.columns and new_col not in market_data.columns:
-                market_data[new_col] = market_data[old_col]
+        if market_data is None or market_data.empty:
+            raise ValueError(f"No market data available for {symbol}")
 
-        # Make sure all required columns are present
-        required_columns = ['open', 'high', 'low', 'close', 'volume']
-        for col in required_columns:
-            if col not in market_data.columns:
-                if col == 'close' and 'Close' in market_data.columns:
-                    market_data[col] = market_data['Close']
-                else:
-                    # Generate synthetic data for missing columns
-                    self.logger.warning(f"Column {col} is missing, generating synthetic data")
-
-                    # Set base for values
-                    if col in ['open', 'high', 'low', 'close']:
-                        if 'close' in market_data.columns:
-                            base = market_data['close'].mean()
-                        elif 'Close' in market_data.columns:
-                            base = market_data['Close'].mean()
-                        else:
-                            base = 100.0  # Fallback
-
-                        if col == 'high':
-                            market_data[col] = base * (1 + np.random.uniform(0.001, 0.01, size=len(market_data)))
-                        elif col == 'low':
-                            market_data[col] = base * (1 - np.random.uniform(0.001, 0.01, size=len(market_data)))
-                        else:  # open or close
-                            market_data[col] = base * (1 + np.random.normal(0, 0.005, size=len(market_data)))
-                    elif col == 'volume':
-                        market_data[col] = np.random.uniform(100, 1000, size=len(market_data))
-
-        # Calculate technical indicators
-        try:
-            market_data['rsi'] = self._calculate_rsi(market_data['close'])
-            market_data['macd'], market_data['macd_signal'] = self._calculate_macd(market_data['close'])
-            market_data['ema_short'] = market_data['close'].ewm(span=12).mean()
-            market_data['ema_medium'] = market_data['close'].ewm(span=26).mean()
-            market_data['ema_long'] = market_data['close'].ewm(span=50).mean()
-            market_data['volatility'] = market_data['close'].rolling(window=24).std()
-        except Exception as e:
-            self.logger.error(f"Error calculating technical indicators: {str(e)}")
-            # Simply continue, missing values will be replaced by NaN
+        # Debug output of columns
+        self.logger.info(f"Original columns in market_data: {market_data.columns.tolist()}")
 
-        # Add sentiment data
+        # Calculate technical indicators and add sentiment data
         sentiment = self.get_news_sentiment(symbol)
-        market_data['sentiment'] = sentiment
+        market_data = self.feature_pipeline.compute(market_data, symbol, timeframe, sentiment=sentiment)
 
         # Handle NaN values
         market_data = market_data.fillna(method='ffill').fillna(method='bfill').fillna(0)
@@ -343,17 +895,7 @@ class DataCollector:
     def _calculate_rsi(self, prices, period=14):
         """Calculates the Relative Strength Index"""
         try:
-            delta = prices.diff()
-            # Prevent division by zero
-            gain = (delta.where(delta > 0, 0)).fillna(0).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).fillna(0).rolling(window=period).mean()
-
-            # Prevent division by zero
-            loss = loss.replace(0, 0.00001)
-
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi
+            return calculate_rsi(prices, period)
         except Exception as e:
             self.logger.error(f"Error calculating RSI: {e}")
             # Return a column with 50 (neutral) in case of error
@@ -361,11 +903,7 @@ class DataCollector:
 
     def _calculate_macd(self, prices, fast=12, slow=26, signal=9):
         """Calculates the MACD (Moving Average Convergence Divergence)"""
-        ema_fast = prices.ewm(span=fast).mean()
-        ema_slow = prices.ewm(span=slow).mean()
-        macd = ema_fast - ema_slow
-        macd_signal = macd.ewm(span=signal).mean()
-        return macd, macd_signal
+        return calculate_macd(prices, fast, slow, signal)
 
     # Optional: This method can be implemented later when advanced functionality is needed
     def get_economic_indicators(self):
@@ -0,0 +1,397 @@
+# indicators.py
+import math
+import threading
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Column order of the indicator values; periods and spans as in features.py
+INDICATOR_COLUMNS = ['rsi', 'macd', 'macd_signal', 'ema_short', 'ema_medium', 'ema_long', 'volatility']
+EMA_SPANS = {'ema_short': 12, 'ema_medium': 26, 'ema_long': 50}  # the MACD is ema_short - ema_medium
+MACD_SIGNAL_SPAN = 9
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 24
+
+
+def _rsi(gain_sum: float, loss_sum: float, period: int) -> float:
+    """RSI from the gain and loss sums of a window, as calculate_rsi"""
+    avg_loss = loss_sum / period
+    if avg_loss == 0:
+        avg_loss = 0.00001  # Prevent division by zero
+    return 100 - (100 / (1 + (gain_sum / period) / avg_loss))
+
+
+@lru_cache(maxsize=8)
+def _ewm_weights(n: int, span: int) -> np.ndarray:
+    """Lower triangular matrix of ewm() weights, row i weights the values 0..i"""
+    decay = 1 - 2 / (span + 1)
+    lags = np.arange(n)[:, None] - np.arange(n)[None, :]
+    weights = np.where(lags >= 0, decay ** np.maximum(lags, 0), 0.0)
+    weights.flags.writeable = False
+    return weights
+
+
+def _ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """pandas' ewm(span).mean() of a short series as one matrix product"""
+    weights = _ewm_weights(len(values), span)
+    observed = ~np.isnan(values)
+    numerator = weights @ np.where(observed, values, 0.0)
+    denominator = weights @ observed
+    result = np.full(len(values), np.nan)
+    np.divide(numerator, denominator, out=result, where=np.cumsum(observed) > 0)
+    return result
+
+
+class RunningWindowSum:
+    """Sum over the last `window` values, NaN until the window is full"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.nonzero = 0  # number of non-zero values, keeps an all-zero window exactly at 0
+
+    def update(self, value: float) -> float:
+        self.values.append(value)
+        self.total += value
+        self.nonzero += value != 0
+        if len(self.values) > self.window:
+            removed = self.values.popleft()
+            self.total -= removed
+            self.nonzero -= removed != 0
+
+        if len(self.values) < self.window:
+            return math.nan
+        return self.total if self.nonzero else 0.0
+
+    def clone(self) -> 'RunningWindowSum':
+        other = RunningWindowSum.__new__(RunningWindowSum)
+        other.window, other.values, other.total, other.nonzero = self.window, deque(self.values), self.total, self.nonzero
+        return other
+
+
+class RunningWindowStd:
+    """
+    Rolling sample standard deviation (ddof=1) using Welford's add/remove updates
+
+    Like pandas rolling(window).std(), the result is NaN while the window holds
+    fewer than `window` valid values; NaN inputs are kept out of the statistics.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.count = 0  # valid (non-NaN) values in the window
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+
+    def _add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float) -> None:
+        self.count -= 1
+        if self.count == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def update(self, value: float) -> float:
+        self.values.append(value)
+        if not math.isnan(value):
+            self._add(value)
+        if len(self.values) > self.window:
+            removed = self.values.popleft()
+            if not math.isnan(removed):
+                self._remove(removed)
+
+        # Re-sync from the window once per window length to stop rounding drift (amortized O(1))
+        self.updates += 1
+        if self.updates % self.window == 0 and self.count:
+            valid = [x for x in self.values if not math.isnan(x)]
+            self.mean = math.fsum(valid) / self.count
+            self.m2 = math.fsum((x - self.mean) ** 2 for x in valid)
+
+        if self.count < self.window:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+    def clone(self) -> 'RunningWindowStd':
+        other = RunningWindowStd.__new__(RunningWindowStd)
+        other.window, other.values, other.count, other.mean, other.m2, other.updates = (
+            self.window, deque(self.values), self.count, self.mean, self.m2, self.updates)
+        return other
+
+
+class RunningEMA:
+    """
+    Weighted sums behind pandas' ewm(span).mean() (adjust=True)
+
+    The mean is numerator / denominator. A NaN value decays both sums without
+    adding to them, as with ewm's default ignore_na=False.
+    """
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.count = 0  # valid values seen
+
+    def update(self, value: float) -> float:
+        self.numerator *= self.decay
+        self.denominator *= self.decay
+        if not math.isnan(value):
+            self.numerator += value
+            self.denominator += 1.0
+            self.count += 1
+        return self.numerator / self.denominator if self.count else math.nan
+
+    def clone(self) -> 'RunningEMA':
+        other = RunningEMA.__new__(RunningEMA)
+        other.decay, other.numerator, other.denominator, other.count = (
+            self.decay, self.numerator, self.denominator, self.count)
+        return other
+
+
+class IndicatorState:
+    """
+    Running indicator state of one symbol and timeframe
+
+    Mirrors calculate_rsi, calculate_macd, the EMAs and the 24-period rolling
+    volatility of features.py, but updates in constant time per candle. The EMAs
+    and the MACD cover all candles since the state was created. A NaN close counts
+    as no price change for the RSI (as the fillna(0) of calculate_rsi) and is left
+    out of the volatility and the EMAs.
+    """
+
+    def __init__(self, rsi_period: int = RSI_PERIOD, volatility_window: int = VOLATILITY_WINDOW):
+        self.last_close = None
+        self.gains = RunningWindowSum(rsi_period)
+        self.losses = RunningWindowSum(rsi_period)
+        self.rsi_period = rsi_period
+        self.volatility = RunningWindowStd(volatility_window)
+        self.emas = {name: RunningEMA(span) for name, span in EMA_SPANS.items()}
+        self.macd_signal = RunningEMA(MACD_SIGNAL_SPAN)
+
+    def update(self, close: float) -> Tuple[float, ...]:
+        """Applies a new close price and returns the indicator values in INDICATOR_COLUMNS order"""
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        self.last_close = close
+
+        gain = self.gains.update(delta if delta > 0 else 0.0)
+        loss = self.losses.update(-delta if delta < 0 else 0.0)
+        rsi = math.nan if math.isnan(gain) or math.isnan(loss) else _rsi(gain, loss, self.rsi_period)
+
+        ema_short, ema_medium, ema_long = (ema.update(close) for ema in self.emas.values())
+        macd = ema_short - ema_medium
+        macd_signal = self.macd_signal.update(macd)
+
+        volatility = self.volatility.update(close)
+
+        return rsi, macd, macd_signal, ema_short, ema_medium, ema_long, volatility
+
+    def ema_sums(self) -> Tuple[float, ...]:
+        """Numerator, denominator and count of each EMA, in EMA_SPANS order"""
+        return tuple(value for ema in self.emas.values() for value in (ema.numerator, ema.denominator, ema.count))
+
+    def clone(self) -> 'IndicatorState':
+        """Returns an independent copy of the state"""
+        other = IndicatorState.__new__(IndicatorState)
+        other.last_close = self.last_close
+        other.rsi_period = self.rsi_period
+        for name in ('gains', 'losses', 'volatility', 'macd_signal'):
+            setattr(other, name, getattr(self, name).clone())
+        other.emas = {name: ema.clone() for name, ema in self.emas.items()}
+        return other
+
+
+# A buffered row holds the indicator values followed by the sums of each EMA
+_COLUMN = {name: i for i, name in enumerate(INDICATOR_COLUMNS)}
+_ROW_WIDTH = len(INDICATOR_COLUMNS) + 3 * len(EMA_SPANS)
+
+
+class IndicatorEngine:
+    """
+    Keeps running indicator state per (symbol, timeframe)
+
+    Each candle updates the state in constant time, and each call only processes the
+    candles that are newer than the last processed one. The newest candle may still be
+    open: when it comes in again with the same timestamp, the state is rolled back and
+    the candle is re-applied.
+
+    pandas computes the indicators of a frame as if there were no candle before it.
+    The windowed indicators (RSI, volatility) only differ in the first window, which
+    apply() rebuilds from the frame. An EMA over the frame is the running EMA sums
+    minus the sums from before the frame, decayed to each row.
+    """
+
+    def __init__(self, history: int = 500):
+        """
+        Initializes the engine
+
+        Args:
+            history: Number of candles kept per symbol and timeframe; longer frames are
+                left to the pandas path
+        """
+        self.history = history
+        self.logger = logging.getLogger('IndicatorEngine')
+        self._states: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+
+    def reset(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+        """Drops the state of one symbol/timeframe or of everything"""
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop((symbol, timeframe), None)
+
+    def _new_entry(self) -> Dict:
+        return {
+            'state': IndicatorState(),
+            'previous': None,  # state before the newest candle was applied
+            'last_timestamp': None,
+            # Row buffer with room for twice the history, compacted when full
+            'timestamps': np.empty(2 * self.history, dtype=np.int64),
+            'rows': np.empty((2 * self.history, _ROW_WIDTH)),
+            'size': 0
+        }
+
+    def _apply_candle(self, entry: Dict, timestamp: int, close: float, snapshot: bool = True) -> Tuple[float, ...]:
+        if entry['last_timestamp'] == timestamp:
+            # Newest candle changed (still open): roll back and re-apply
+            entry['state'] = entry['previous'].clone()
+            entry['size'] -= 1
+
+        # Only the newest candle can be re-applied, so older ones need no snapshot
+        entry['previous'] = entry['state'].clone() if snapshot else None
+        values = entry['state'].update(close)
+
+        size = entry['size']
+        if size == len(entry['timestamps']):
+            # Keep the newest `history` rows, amortized constant time per candle
+            entry['timestamps'][:self.history] = entry['timestamps'][size - self.history:size]
+            entry['rows'][:self.history] = entry['rows'][size - self.history:size]
+            size = self.history
+
+        entry['timestamps'][size] = timestamp
+        entry['rows'][size, :len(INDICATOR_COLUMNS)] = values
+        entry['rows'][size, len(INDICATOR_COLUMNS):] = entry['state'].ema_sums()
+        entry['size'] = size + 1
+        entry['last_timestamp'] = timestamp
+        return values
+
+    def _apply_candles(self, entry: Dict, timestamps: np.ndarray, closes: np.ndarray, start: int) -> None:
+        last = len(timestamps) - 1
+        for i, (timestamp, close) in enumerate(zip(timestamps[start:].tolist(), closes[start:].tolist()), start):
+            self._apply_candle(entry, timestamp, close, snapshot=i == last)
+
+    def update(self, symbol: str, timeframe: str, timestamp: int, close: float) -> Dict[str, float]:
+        """
+        Applies a single candle
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Candle timeframe
+            timestamp: Candle open time (ms)
+            close: Close price
+
+        Returns:
+            Dictionary with the indicator values after the candle, the EMAs and the
+            MACD over all candles since the state was created
+        """
+        with self._lock:
+            entry = self._states.setdefault((symbol, timeframe), self._new_entry())
+            if entry['last_timestamp'] is not None and timestamp < entry['last_timestamp']:
+                raise ValueError(f"Candle {timestamp} is older than the last processed candle")
+            return dict(zip(INDICATOR_COLUMNS, self._apply_candle(entry, timestamp, float(close))))
+
+    def apply(self, symbol: str, timeframe: str, timestamps: np.ndarray,
+              closes: np.ndarray) -> Optional[pd.DataFrame]:
+        """
+        Brings the state up to date with a candle series and returns its indicators
+
+        If the series does not continue the processed candles (gap, other data source,
+        synthetic data), the state is rebuilt from the series.
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Candle timeframe
+            timestamps: Candle open times (ms), ascending
+            closes: Close prices
+
+        Returns:
+            DataFrame with INDICATOR_COLUMNS, aligned with the input series and equal to
+            the pandas indicators computed on the series, or None if the series is empty
+            or longer than the history
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float64)
+        n = len(timestamps)
+        if n == 0 or n > self.history:
+            return None
+
+        with self._lock:
+            entry = self._states.get((symbol, timeframe))
+            start = None
+            if entry is not None and entry['last_timestamp'] is not None:
+                matches = np.flatnonzero(timestamps == entry['last_timestamp'])
+                if len(matches) > 0:
+                    start = int(matches[0])
+                    self._apply_candles(entry, timestamps, closes, start)
+
+            size = entry['size'] if start is not None else 0
+            if size < n or not np.array_equal(entry['timestamps'][size - n:size], timestamps):
+                entry = self._new_entry()
+                self._states[(symbol, timeframe)] = entry
+                self._apply_candles(entry, timestamps, closes, 0)
+                size = n
+
+            rows = entry['rows'][size - n:size].copy()
+
+        return pd.DataFrame(self._frame_values(rows, closes), columns=INDICATOR_COLUMNS)
+
+    def _frame_values(self, rows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+        """Turns the buffered rows of a frame into the indicators pandas computes on the frame alone"""
+        n = len(rows)
+        result = rows[:, :len(INDICATOR_COLUMNS)]
+
+        # The first window of the windowed indicators sees no candle before the frame
+        rsi = result[:, _COLUMN['rsi']]
+        rsi[:RSI_PERIOD - 1] = np.nan
+        if n >= RSI_PERIOD:
+            deltas = np.diff(closes[:RSI_PERIOD])  # the first candle has no change within the frame
+            rsi[RSI_PERIOD - 1] = _rsi(np.where(deltas > 0, deltas, 0.0).sum(),
+                                       np.where(deltas < 0, -deltas, 0.0).sum(), RSI_PERIOD)
+        result[:VOLATILITY_WINDOW - 1, _COLUMN['volatility']] = np.nan
+
+        # EMAs over the frame: the sums from before the frame, decayed to each row, are removed
+        first_valid = not math.isnan(closes[0])
+        first_close = closes[0] if first_valid else 0.0
+        offsets = np.arange(n)
+        for k, (name, span) in enumerate(EMA_SPANS.items()):
+            sums = rows[:, len(INDICATOR_COLUMNS) + 3 * k:len(INDICATOR_COLUMNS) + 3 * k + 3]
+            numerator, denominator, count = sums[:, 0], sums[:, 1], sums[:, 2]
+            weights = (1 - 2 / (span + 1)) ** offsets
+            numerator = numerator - weights * (numerator[0] - first_close)
+            denominator = denominator - weights * (denominator[0] - first_valid)
+            observed = count - count[0] + first_valid
+
+            ema = result[:, _COLUMN[name]]
+            ema[:] = np.nan
+            np.divide(numerator, denominator, out=ema, where=observed > 0)
+
+        # The signal line is an EMA of the frame's MACD, which itself depends on the frame start
+        macd = result[:, _COLUMN['ema_short']] - result[:, _COLUMN['ema_medium']]
+        result[:, _COLUMN['macd']] = macd
+        result[:, _COLUMN['macd_signal']] = _ewm_mean(macd, MACD_SIGNAL_SPAN)
+        return result
@@ -0,0 +1,78 @@
+# kline_parser.py
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Positions of the used fields in a Binance kline row
+KLINE_OPEN_TIME = 0
+KLINE_OHLCV = (1, 2, 3, 4, 5)
+KLINE_CLOSE_TIME = 6
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+KLINE_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64)
+])
+
+
+def parse_klines(klines: Sequence[Sequence], float_dtype=np.float64) -> Dict[str, np.ndarray]:
+    """
+    Decodes a Binance klines payload into typed NumPy columns
+
+    Only the fields used by the pipeline are decoded: the price strings go straight
+    into one float array, without an intermediate DataFrame of Python strings.
+
+    Args:
+        klines: List of kline rows as returned by the Binance API
+        float_dtype: Dtype of the OHLCV values (np.float32 halves their memory)
+
+    Returns:
+        Dictionary with 'timestamp' and 'close_time' (int64 ms) and an 'ohlcv' array of shape (n, 5)
+    """
+    n = len(klines)
+    ohlcv = np.fromiter(chain.from_iterable(map(itemgetter(*KLINE_OHLCV), klines)),
+                        dtype=np.float64, count=5 * n).reshape(n, 5)
+    if float_dtype != np.float64:
+        ohlcv = ohlcv.astype(float_dtype)
+
+    return {
+        'timestamp': np.fromiter(map(itemgetter(KLINE_OPEN_TIME), klines), dtype=np.int64, count=n),
+        'close_time': np.fromiter(map(itemgetter(KLINE_CLOSE_TIME), klines), dtype=np.int64, count=n),
+        'ohlcv': ohlcv
+    }
+
+
+def parse_klines_structured(klines: Sequence[Sequence]) -> np.ndarray:
+    """Decodes a Binance klines payload into a structured array with KLINE_DTYPE"""
+    columns = parse_klines(klines)
+    out = np.empty(len(klines), dtype=KLINE_DTYPE)
+    out['timestamp'] = columns['timestamp']
+    out['close_time'] = columns['close_time']
+    for i, col in enumerate(OHLCV_COLUMNS):
+        out[col] = columns['ohlcv'][:, i]
+    return out
+
+
+def klines_to_frame(klines: List[Sequence], float_dtype=np.float64) -> pd.DataFrame:
+    """
+    Converts a Binance klines payload to a DataFrame
+
+    Returns:
+        DataFrame with timestamp (datetime), open, high, low, close, volume and close_time (ms)
+    """
+    columns = parse_klines(klines, float_dtype=float_dtype)
+
+    # The OHLCV block is handed to pandas as one 2D array
+    df = pd.DataFrame(columns['ohlcv'], columns=OHLCV_COLUMNS, copy=False)
+    df.insert(0, 'timestamp', pd.to_datetime(columns['timestamp'], unit='ms'))
+    df['close_time'] = columns['close_time']
+    return df
@@ -0,0 +1,221 @@
+# kline_stream.py
+import json
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BINANCE_STREAM_URL = 'wss://stream.binance.com:9443/stream'
+
+
+class KlineRingBuffer:
+    """
+    Fixed-size ring buffer of OHLCV candles backed by NumPy arrays
+
+    An update for the newest candle (same open time) overwrites it in place, a newer
+    open time appends a candle and overwrites the oldest one once the buffer is full.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)  # open time in ms
+        self.close_times = np.zeros(capacity, dtype=np.int64)  # close time in ms
+        self.values = np.zeros((capacity, 5), dtype=np.float64)  # open, high, low, close, volume
+        self.size = 0
+        self.head = 0  # index of the next slot to write
+        self.updated_at = None  # time.monotonic() of the last update
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def last_timestamp(self) -> Optional[int]:
+        """Returns the open time (ms) of the newest candle or None"""
+        if self.size == 0:
+            return None
+        return int(self.timestamps[(self.head - 1) % self.capacity])
+
+    def update(self, timestamp: int, open_: float, high: float, low: float, close: float,
+               volume: float, close_time: int) -> None:
+        """Inserts or updates a candle"""
+        with self._lock:
+            last = self.last_timestamp()
+            if last is not None and timestamp < last:
+                return  # Out-of-order update for an older candle
+
+            if last is not None and timestamp == last:
+                idx = (self.head - 1) % self.capacity
+            else:
+                idx = self.head
+                self.head = (self.head + 1) % self.capacity
+                self.size = min(self.size + 1, self.capacity)
+
+            self.timestamps[idx] = timestamp
+            self.close_times[idx] = close_time
+            self.values[idx] = (open_, high, low, close, volume)
+            self.updated_at = time.monotonic()
+
+    def last_price(self) -> Optional[float]:
+        """Returns the close of the newest candle (the last traded price while it is open) or None"""
+        with self._lock:
+            if self.size == 0:
+                return None
+            return float(self.values[(self.head - 1) % self.capacity, 3])
+
+    def seed(self, df: pd.DataFrame) -> None:
+        """Fills the buffer from a DataFrame with timestamp, OHLCV and close_time columns"""
+        timestamps = df['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = timestamps.astype('datetime64[ms]').astype(np.int64)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+        close_times = np.asarray(df['close_time'], dtype=np.int64)
+
+        for i in range(len(timestamps)):
+            self.update(timestamps[i], *values[i], close_times[i])
+
+    def to_frame(self, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Returns the newest candles in chronological order
+
+        Args:
+            limit: Number of candles, None for all buffered candles
+
+        Returns:
+            DataFrame with timestamp, open, high, low, close, volume and close_time
+        """
+        with self._lock:
+            n = self.size if limit is None else min(limit, self.size)
+            idx = (np.arange(self.head - n, self.head)) % self.capacity
+            timestamps = self.timestamps[idx]
+            close_times = self.close_times[idx]
+            values = self.values[idx]
+
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(timestamps, unit='ms'),
+            'open': values[:, 0],
+            'high': values[:, 1],
+            'low': values[:, 2],
+            'close': values[:, 3],
+            'volume': values[:, 4],
+            'close_time': close_times
+        })
+
+
+class KlineStream:
+    """
+    Subscribes to Binance kline streams over a websocket and keeps one ring buffer
+    per symbol and timeframe
+
+    The websocket runs in its own thread with its own event loop and reconnects
+    with exponential backoff when the connection drops.
+    """
+
+    def __init__(self, pairs: List[Tuple[str, str]], buffer_size: int = 1000, url: str = BINANCE_STREAM_URL):
+        """
+        Initializes the stream
+
+        Args:
+            pairs: List of (binance_symbol, timeframe) tuples, e.g. [('BTCUSDT', '1h')]
+            buffer_size: Number of candles kept per symbol and timeframe
+            url: Combined stream endpoint
+        """
+        self.url = url
+        self.buffers: Dict[Tuple[str, str], KlineRingBuffer] = {
+            (symbol.upper(), timeframe): KlineRingBuffer(buffer_size) for symbol, timeframe in pairs
+        }
+        self.logger = logging.getLogger('KlineStream')
+        self.running = False
+        self.connected = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._task = None
+
+    def stream_url(self) -> str:
+        """Returns the combined stream URL for all subscribed pairs"""
+        streams = '/'.join(f"{symbol.lower()}@kline_{timeframe}" for symbol, timeframe in self.buffers)
+        return f"{self.url}?streams={streams}"
+
+    def get_buffer(self, symbol: str, timeframe: str) -> Optional[KlineRingBuffer]:
+        """Returns the ring buffer for a symbol and timeframe or None if it is not subscribed"""
+        return self.buffers.get((symbol.upper(), timeframe))
+
+    def handle_message(self, message: str) -> None:
+        """Applies a kline event (raw or combined stream format) to its ring buffer"""
+        data = json.loads(message)
+        data = data.get('data', data)
+        if data.get('e') != 'kline':
+            return
+
+        kline = data['k']
+        buffer = self.get_buffer(data['s'], kline['i'])
+        if buffer is None:
+            return
+
+        buffer.update(int(kline['t']), float(kline['o']), float(kline['h']), float(kline['l']),
+                      float(kline['c']), float(kline['v']), int(kline['T']))
+
+    def start(self) -> None:
+        """Starts the websocket thread"""
+        if self.running:
+            self.logger.warning("Kline stream is already running")
+            return
+
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Kline stream started for {len(self.buffers)} symbol/timeframe pairs")
+
+    def stop(self) -> None:
+        """Stops the websocket thread"""
+        if not self.running:
+            return
+
+        self.running = False
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5.0)
+        self.connected.clear()
+        self.logger.info("Kline stream stopped")
+
+    def _run(self) -> None:
+        """Thread function running the event loop of the stream"""
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self._listen())
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _listen(self) -> None:
+        """Receives kline events until the stream is stopped"""
+        import websockets
+
+        backoff = 1.0
+        while self.running:
+            try:
+                async with websockets.connect(self.stream_url()) as ws:
+                    self.connected.set()
+                    backoff = 1.0
+                    async for message in ws:
+                        try:
+                            self.handle_message(message)
+                        except Exception as e:
+                            self.logger.warning(f"Invalid kline message: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Kline stream connection error: {str(e)}, reconnecting in {backoff:.0f}s")
+
+            self.connected.clear()
+            if self.running:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
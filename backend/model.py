@@ -3,25 +3,61 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import LinearRegression
+from sklearn.linear_model import LinearRegression, SGDRegressor
 import joblib
 import os
+import copy
+import threading
 import logging
 from typing import Dict, Any, Optional, Tuple, Union
 
+from tree_compiler import CompiledEnsemble, compile_ensemble
+from model_registry import ModelRegistry
+
 logging.basicConfig(level=logging.INFO)
 
+# Up to this batch size the compiled trees are faster than sklearn's predict
+COMPILED_MAX_ROWS = 64
+
+# Keys older saved configs used for the fitted metadata
+LEGACY_FITTED_KEYS = {'fitted_features': 'features', 'fitted_lookback': 'lookback', 'fitted_until': 'until'}
+
+
+def window_features(X: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    Stacks the last `lookback` rows of X into one input vector per time step
+
+    Built on a strided sliding-window view, so the lags are materialized once in
+    the output instead of one shifted copy of X per lag.
+
+    Args:
+        X: Array of shape (rows, features)
+        lookback: Number of time steps per input vector
+
+    Returns:
+        Array of shape (rows - lookback + 1, lookback * features), oldest step first
+    """
+    if lookback <= 1:
+        return X
+    if len(X) < lookback:
+        raise ValueError(f"At least {lookback} rows are required for the lookback window, got {len(X)}")
+
+    windows = np.lib.stride_tricks.sliding_window_view(X, lookback, axis=0)  # (steps, features, lookback)
+    return windows.transpose(0, 2, 1).reshape(len(windows), lookback * X.shape[1])
+
 
 class PredictionModel:
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, registry: Optional[ModelRegistry] = None):
         """
         Initializes the prediction model
 
         Args:
             config: Configuration parameters for the model
+            registry: Model registry shared with other models, created for models_dir if None
         """
         self.config = config or {
-            'model_type': 'random_forest',  # 'random_forest', 'gradient_boosting', 'linear'
+            'model_type': 'random_forest',  # 'random_forest', 'gradient_boosting', 'linear', 'sgd'
+            'training_mode': 'full',  # 'full' refit or 'incremental' update() for scheduled retraining
             'features': ['close', 'volume', 'rsi', 'macd', 'sentiment', 'ema_short', 'ema_medium', 'volatility'],
             'target': 'close',
             'prediction_horizon': 1,  # in hours
@@ -30,19 +66,49 @@ class PredictionModel:
             'model_params': {
                 'random_forest': {
                     'n_estimators': 100,
-                    'max_depth': 10
+                    'max_depth': 10,
+                    'n_jobs': None  # threads for fitting, prediction and the confidence computation
                 },
                 'gradient_boosting': {
                     'n_estimators': 100,
                     'learning_rate': 0.1
+                },
+                'sgd': {
+                    'alpha': 0.0001,
+                    'eta0': 0.01
                 }
+            },
+            # update(): 'sgd' is updated with partial_fit, the ensembles get new trees via warm_start
+            'incremental': {
+                'trees_per_update': 10,
+                'min_rows_per_update': 24,  # new candles collected before trees are added
+                'fit_window': 1000,  # recent rows the new trees are fitted on
+                'max_estimators': 300,  # beyond this forests drop their oldest trees, boosting is refit
+                'refit_every': 10  # tree updates before the ensemble is refit on the whole frame
             }
         }
         self.model = None
         self.scaler = StandardScaler()
+        # What the model was fitted on: 'features', 'lookback', 'until' and the number of
+        # 'updates' since the last full fit (kept out of the config, which is shared with
+        # the app config and saved by it)
+        self.fitted: Dict[str, Any] = {}
+        self._leaf_values = None  # (model, padded leaf value matrix) for the forest confidence
+        self._compiled = None  # (model, CompiledEnsemble) for fast small-batch inference
         self.logger = logging.getLogger('PredictionModel')
         self.models_dir = 'models'
-        os.makedirs(self.models_dir, exist_ok=True)
+        self._registry = registry
+        self.model_name = None
+
+        # Held while predicting and while a loaded model is swapped in
+        self._swap_lock = threading.RLock()
+
+    @property
+    def registry(self) -> ModelRegistry:
+        """Model registry, created on first use (training worker processes never need one)"""
+        if self._registry is None:
+            self._registry = ModelRegistry(self.models_dir)
+        return self._registry
 
     def _create_model(self) -> Any:
         """Creates a new model based on the configuration"""
@@ -53,6 +119,7 @@ class PredictionModel:
             return RandomForestRegressor(
                 n_estimators=params.get('n_estimators', 100),
                 max_depth=params.get('max_depth', 10),
+                n_jobs=params.get('n_jobs'),
                 random_state=42
             )
         elif model_type == 'gradient_boosting':
@@ -64,71 +131,335 @@ class PredictionModel:
             )
         elif model_type == 'linear':
             return LinearRegression()
+        elif model_type == 'sgd':
+            params = self.config.get('model_params', {}).get('sgd', {})
+            return SGDRegressor(
+                alpha=params.get('alpha', 0.0001),
+                eta0=params.get('eta0', 0.01),
+                random_state=42
+            )
         else:
             raise ValueError(f"Unknown model type: {model_type}")
 
-    def prepare_data(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    def prepare_data(self, df: pd.DataFrame, fit: bool = False,
+                     last_row_only: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray]]:
         """
         Prepares data for training or prediction
 
         Args:
             df: DataFrame with market data
+            fit: Fit a new scaler on df (training), otherwise the fitted scaler is only applied
+            last_row_only: Only scale the last row (prediction), no target values are returned
 
         Returns:
             X: Features for the model
             y: Target values (only if available)
         """
-        # Check if all required features are present
+        if fit:
+            X, y, scaler, features = self._prepare_training_data(df)
+            self.scaler = scaler
+            self.fitted = {'features': features, 'lookback': self.config.get('lookback_window', 1), 'until': None,
+                           'updates': 0}
+            return X, y
+
+        if not hasattr(self.scaler, 'n_features_in_'):
+            # Models saved without a fitted scaler
+            self.logger.warning("Scaler is not fitted, fitting it on the prediction data")
+            return self.prepare_data(df, fit=True, last_row_only=last_row_only)
+
+        # The columns the scaler and model were fitted on
+        features = self.fitted.get('features') or self._select_features(df)
+        missing = [f for f in features if f not in df.columns]
+        if missing:
+            raise ValueError(f"Features missing in the DataFrame: {missing}")
+
+        # Models saved before the lookback window was used see one row
+        lookback = self.fitted.get('lookback', 1)
+        rows = df.iloc[-lookback:] if last_row_only else df
+        X = window_features(self._scale(rows[features].to_numpy(dtype=np.float64)), lookback)
+
+        y = None
+        if not last_row_only:
+            y = self._target_values(df)
+            if y is not None:
+                y = y[lookback - 1:]
+                if len(y) < len(X):
+                    X = X[:len(y)]
+
+        return X, y
+
+    def _select_features(self, df: pd.DataFrame) -> list:
+        """Returns the configured features that are present in df"""
         selected_features = [f for f in self.config['features'] if f in df.columns]
 
         if not selected_features:
             raise ValueError("None of the specified features are present in the DataFrame")
+        return selected_features
 
-        # Extract features and target values
-        X = df[selected_features].values
-
-        # Scale the features
-        X = self.scaler.fit_transform(X)
-
-        # Extract target values, if available
+    def _target_values(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Returns the target values shifted by prediction_horizon, None if the target column is missing"""
         target = self.config.get('target', 'close')
-        y = None
-        if target in df.columns:
-            # Shift target values by prediction_horizon
-            horizon = self.config.get('prediction_horizon', 1)
-            y = df[target].shift(-horizon).dropna().values
-            # Truncate X accordingly if y is smaller
+        if target not in df.columns:
+            return None
+        horizon = self.config.get('prediction_horizon', 1)
+        return df[target].shift(-horizon).dropna().values
+
+    def _prepare_training_data(self, df: pd.DataFrame) -> Tuple[np.ndarray, Optional[np.ndarray], StandardScaler, list]:
+        """Fits a new scaler on df without touching the serving one, returns X, y, scaler and feature names"""
+        features = self._select_features(df)
+        scaler = StandardScaler()
+        X = scaler.fit_transform(df[features].values)
+
+        # The window ending at row t is the input for the target of row t
+        lookback = self.config.get('lookback_window', 1)
+        X = window_features(X, lookback)
+
+        # Truncate X accordingly if y is smaller
+        y = self._target_values(df)
+        if y is not None:
+            y = y[lookback - 1:]
             if len(y) < len(X):
                 X = X[:len(y)]
 
-        return X, y
+        return X, y, scaler, features
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """Applies the fitted scaler, same result as scaler.transform without its validation overhead"""
+        scaler = self.scaler
+        if not isinstance(scaler, StandardScaler) or scaler.mean_ is None or scaler.scale_ is None:
+            return scaler.transform(X)
+
+        out = np.empty(X.shape, dtype=np.float64)
+        np.subtract(X, scaler.mean_, out=out)
+        np.divide(out, scaler.scale_, out=out)
+        return out
 
-    def train(self, df: pd.DataFrame) -> None:
+    def train(self, df: pd.DataFrame, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> None:
         """
-        Trains the model with the provided data
+        Trains the model with the provided data in the calling thread
+
+        For scripts and notebooks; the API trains through TrainingJobManager, which
+        fits in a worker process.
 
         Args:
             df: DataFrame with market data
+            symbol: Symbol of the data, recorded in the model registry
+            timeframe: Timeframe of the data, recorded in the model registry
         """
         try:
-            X, y = self.prepare_data(df)
+            self.install(self.fit(df), symbol=symbol, timeframe=timeframe)
+        except Exception as e:
+            self.logger.error(f"Error training the model: {str(e)}")
 
-            if y is None or len(y) == 0:
-                raise ValueError("No target values (y) available for training")
+    def fit(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Fits a new estimator and scaler without changing the serving model
 
-            # Create model
-            self.model = self._create_model()
+        Args:
+            df: DataFrame with market data
 
-            # Train model
-            self.model.fit(X, y)
+        Returns:
+            Dictionary with model, scaler, features, lookback and metrics, see install()
+        """
+        X, y, scaler, features = self._prepare_training_data(df)
+
+        if y is None or len(y) == 0:
+            raise ValueError("No target values (y) available for training")
+
+        model = self._create_model()
+        model.fit(X, y)
+
+        # In-sample metrics for the registry index
+        pred = model.predict(X)
+        metrics = {
+            'rows': int(len(y)),
+            'r2': float(model.score(X, y)),
+            'mae': float(np.mean(np.abs(pred - y)))
+        }
+
+        # Time of the last row whose target was known, update() continues from there
+        lookback = self.config.get('lookback_window', 1)
+        timestamps = self._row_timestamps(df)
+        fitted_until = int(timestamps[lookback - 1 + len(y) - 1]) if timestamps is not None else None
+
+        return {
+            'model': model,
+            'scaler': scaler,
+            'features': features,
+            'lookback': lookback,
+            'fitted_until': fitted_until,
+            'updates': 0,
+            'metrics': metrics
+        }
+
+    def install(self, fitted: Dict[str, Any], symbol: Optional[str] = None,
+                timeframe: Optional[str] = None, save: bool = True) -> Optional[str]:
+        """
+        Swaps in a fitted model (output of fit()) and saves it in the registry
+
+        Args:
+            fitted: Output of fit()
+            symbol: Symbol of the training data, recorded in the model registry
+            timeframe: Timeframe of the training data, recorded in the model registry
+            save: Save the model in the registry (False e.g. for backtests)
+
+        Returns:
+            Name of the saved model, None if saving failed or was skipped
+        """
+        with self._swap_lock:
+            self.model = fitted['model']
+            self.scaler = fitted['scaler']
+            self.fitted = {'features': fitted['features'], 'lookback': fitted['lookback'],
+                           'until': fitted.get('fitted_until'), 'updates': fitted.get('updates', 0)}
+
+        self.logger.info(f"Model successfully trained: {self.config['model_type']}")
+        if not save:
+            return None
+
+        # Save model
+        return self.save_model(symbol=symbol, timeframe=timeframe, metrics=fitted['metrics'])
 
-            self.logger.info(f"Model successfully trained: {self.config['model_type']}")
+    def update(self, df: pd.DataFrame, symbol: Optional[str] = None,
+               timeframe: Optional[str] = None, save: bool = True) -> Optional[str]:
+        """
+        Updates the model with the candles that arrived since the last training
+
+        Models with partial_fit ('sgd') are updated with the new rows. Their scaler
+        statistics are updated with partial_fit as well, and the coefficients are
+        rescaled to the new statistics first. Random forest and
+        gradient boosting wait until min_rows_per_update new rows have arrived, then
+        get trees_per_update new trees (warm_start) fitted on the last fit_window
+        rows, which include the new ones. Their scaler stays fixed, because the
+        existing trees depend on its scale. Beyond max_estimators trees a forest
+        drops its oldest trees and gradient boosting is refit on df; both are refit
+        on df every refit_every tree updates, because trees fitted on older windows
+        cannot follow a trending price. Other models
+        ('linear') are refit on df, and without a fitted model one is trained on df.
+
+        Args:
+            df: Feature frame ending with the new candles. With a timestamp column (or
+                DatetimeIndex) only rows after the last trained one count as new. For
+                tree ensembles it should cover fit_window rows (and the full training
+                window, for the gradient boosting refit).
+            symbol: Symbol of the data, recorded in the model registry
+            timeframe: Timeframe of the data, recorded in the model registry
+            save: Save the updated model in the registry
 
-            # Save model
-            self.save_model()
+        Returns:
+            Name of the saved model, None if nothing was updated or saved
+        """
+        try:
+            with self._swap_lock:
+                model, scaler, config = self.model, self.scaler, copy.deepcopy(self.config)
+                fitted_meta = dict(self.fitted)
+            if model is None or not hasattr(scaler, 'n_features_in_'):
+                return self.install(self.fit(df), symbol=symbol, timeframe=timeframe, save=save)
+
+            timestamps = self._row_timestamps(df)
+            new_rows = np.ones(len(df), dtype=bool)
+            if timestamps is not None and fitted_meta.get('until') is not None:
+                new_rows = timestamps > fitted_meta['until']
+            # Rows within prediction_horizon of the end have no target yet
+            if not new_rows[:len(df) - config.get('prediction_horizon', 1)].any():
+                self.logger.info("No new candles for the model update")
+                return None
+
+            if not hasattr(model, 'partial_fit') and not isinstance(
+                    model, (RandomForestRegressor, GradientBoostingRegressor)):
+                return self.install(self.fit(df), symbol=symbol, timeframe=timeframe, save=save)
+
+            # The serving model keeps answering while a copy is updated
+            # (this also turns memory-mapped arrays of a loaded model into writable ones)
+            model, scaler = copy.deepcopy(model), copy.deepcopy(scaler)
+            features, lookback = fitted_meta['features'], fitted_meta.get('lookback', 1)
+
+            if hasattr(model, 'partial_fit') and new_rows.any():
+                previous_scaler = copy.deepcopy(scaler)
+                scaler.partial_fit(df.loc[new_rows, features].to_numpy(dtype=np.float64))
+                self._rescale_linear(model, previous_scaler, scaler, lookback)
+
+            # Windows whose target is known, rows marks the ones ending at a new candle
+            raw = df[features].to_numpy(dtype=np.float64)
+            X = window_features(scaler.transform(raw), lookback)
+            y = self._target_values(df)[lookback - 1:]
+            X = X[:len(y)]
+            rows = np.flatnonzero(new_rows[lookback - 1:lookback - 1 + len(y)])
+            if len(rows) == 0:
+                self.logger.info("No new candles for the model update")
+                return None
+
+            params = config.get('incremental', {})
+            if hasattr(model, 'partial_fit'):
+                X, y = X[rows], y[rows]
+                model.partial_fit(X, y)
+            else:
+                # Trees fitted on a handful of rows are stumps, so new rows are collected first
+                if len(rows) < params.get('min_rows_per_update', 24):
+                    self.logger.info(f"{len(rows)} new candles, waiting for more before adding trees")
+                    return None
+
+                n_estimators = model.n_estimators + params.get('trees_per_update', 10)
+                max_estimators = params.get('max_estimators')
+                if isinstance(model, GradientBoostingRegressor) and max_estimators and n_estimators > max_estimators:
+                    # Boosting stages build on each other and cannot be dropped, start over instead
+                    self.logger.info(f"Gradient boosting reached {max_estimators} stages, refitting")
+                    return self.install(self.fit(df), symbol=symbol, timeframe=timeframe, save=save)
+                if fitted_meta.get('updates', 0) + 1 >= params.get('refit_every', 10):
+                    # Trees of older windows cannot follow a trending price, they are replaced periodically
+                    self.logger.info("Periodic refit of the tree ensemble")
+                    return self.install(self.fit(df), symbol=symbol, timeframe=timeframe, save=save)
+
+                # The new trees see the recent window, which ends with the new rows
+                window = params.get('fit_window', 500)
+                X, y = X[-window:], y[-window:]
+                model.set_params(warm_start=True, n_estimators=n_estimators)
+                model.fit(X, y)
+
+                # Forests forget their oldest trees
+                if isinstance(model, RandomForestRegressor) and max_estimators and \
+                        len(model.estimators_) > max_estimators:
+                    model.estimators_ = model.estimators_[-max_estimators:]
+                    model.set_params(n_estimators=len(model.estimators_))
+
+            fitted = {
+                'model': model,
+                'scaler': scaler,
+                'features': features,
+                'lookback': lookback,
+                'fitted_until': int(timestamps[lookback - 1 + rows[-1]]) if timestamps is not None else None,
+                'updates': fitted_meta.get('updates', 0) + 1,
+                'metrics': {'rows': int(len(rows)), 'update': True,
+                            'mae': float(np.mean(np.abs(model.predict(X) - y)))}
+            }
+            self.logger.info(f"Model updated with {len(rows)} new rows")
+            return self.install(fitted, symbol=symbol, timeframe=timeframe, save=save)
 
         except Exception as e:
-            self.logger.error(f"Error training the model: {str(e)}")
+            self.logger.error(f"Error updating the model: {str(e)}")
+            return None
+
+    def _rescale_linear(self, model: Any, old_scaler: StandardScaler, new_scaler: StandardScaler,
+                        lookback: int) -> None:
+        """
+        Adapts the coefficients of a linear model to new scaler statistics
+
+        w * (x - m) / s + b equals (w * s' / s) * (x - m') / s' + b + w * (m' - m) / s, so the
+        model predicts exactly as before on the newly scaled inputs.
+        """
+        # Every lag of the window uses the same statistics
+        old_mean, old_scale = np.tile(old_scaler.mean_, lookback), np.tile(old_scaler.scale_, lookback)
+        new_mean, new_scale = np.tile(new_scaler.mean_, lookback), np.tile(new_scaler.scale_, lookback)
+        coef = model.coef_
+        model.intercept_ = model.intercept_ + np.dot(coef, (new_mean - old_mean) / old_scale)
+        model.coef_ = coef * new_scale / old_scale
+
+    def _row_timestamps(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Candle open times of df in ms, None if df has no timestamps"""
+        if 'timestamp' in df.columns:
+            return pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+        if isinstance(df.index, pd.DatetimeIndex):
+            return df.index.as_unit('ms').asi8
+        return None
 
     def predict(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -141,55 +472,35 @@ class PredictionModel:
             Dictionary with prediction results
         """
         try:
-            if self.model is None:
-                # Try to load a saved model
-                self.load_model()
-                if self.model is None:
-                    # If no model can be loaded, train a simple one with the available data
-                    self.logger.warning("No trained model available, training simple model")
-                    self.model = self._create_model()
-                    # Minimal training with available data
-                    X, y = self.prepare_data(df)
-                    if y is not None and len(y) > 0:
-                        self.model.fit(X[:len(y)], y)
-                    else:
-                        # If no target variable is available, do a dummy training
-                        self.model.fit(X, np.random.normal(0, 0.01, size=len(X)))
-
-            # Debug information
-            self.logger.info(f"DataFrame for prediction: Columns: {df.columns.tolist()}, Shape: {df.shape}")
-
-            # Ensure that 'close' is in the features
-            if 'close' not in df.columns and 'Close' in df.columns:
-                df['close'] = df['Close']
-
-            # Ensure that the data contains no missing values
-            df_clean = df.fillna(method='ffill').fillna(method='bfill').fillna(0)
-
-            X, _ = self.prepare_data(df_clean)
-
-            # Make prediction
-            pred_value = self.model.predict(X[-1].reshape(1, -1))[0]
-
-            # Get current value for comparison
-            current_value = df_clean[self.config.get('target', 'close')].iloc[-1]
-
-            # Compile results
-            result = {
-                'prediction': float(pred_value),  # Ensure it's a normal Python float
-                'current': float(current_value),
-                'change': float(pred_value - current_value),
-                'change_pct': float((pred_value - current_value) / current_value * 100),
-                'direction': 'up' if pred_value > current_value else 'down',
-                'timestamp': pd.Timestamp.now().isoformat(),
-                'confidence': float(self._get_prediction_confidence(X[-1].reshape(1, -1))),
-                'horizon': self.config.get('prediction_horizon', 1)
-            }
+            with self._swap_lock:
+                self._ensure_model(df)
+
+                # Debug information
+                self.logger.info(f"DataFrame for prediction: Columns: {df.columns.tolist()}, Shape: {df.shape}")
+
+                # Ensure that 'close' is in the features
+                if 'close' not in df.columns and 'Close' in df.columns:
+                    df['close'] = df['Close']
+
+                # Ensure that the data contains no missing values
+                df_clean = df.ffill().bfill().fillna(0)
 
-            self.logger.info(f"Prediction: Current={current_value:.2f}, " +
-                             f"Forecast={pred_value:.2f}, Change={result['change_pct']:.2f}%")
+                X, _ = self.prepare_data(df_clean, last_row_only=True)
 
-            return result
+                # Make prediction
+                pred_values, confidences = self._predict_with_confidence(X[-1].reshape(1, -1))
+                pred_value = pred_values[0]
+
+                # Get current value for comparison
+                current_value = df_clean[self.config.get('target', 'close')].iloc[-1]
+
+                # Compile results
+                result = self._build_result(pred_value, current_value, confidences[0])
+
+                self.logger.info(f"Prediction: Current={current_value:.2f}, " +
+                                 f"Forecast={pred_value:.2f}, Change={result['change_pct']:.2f}%")
+
+                return result
 
         except Exception as e:
             self.logger.error(f"Error making prediction: {str(e)}")
@@ -198,85 +509,277 @@ class PredictionModel:
                 'timestamp': pd.Timestamp.now().isoformat()
             }
 
-    def _get_prediction_confidence(self, X: np.ndarray) -> float:
+    def predict_many(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
         """
-        Calculates a confidence measure for the prediction
+        Makes predictions for several symbols with one model call
+
+        The last feature row of every frame is stacked into one matrix, so the model
+        and the confidence computation run once for the whole batch.
 
         Args:
-            X: Features for the prediction
+            frames: Dictionary with the market data frame per symbol
 
         Returns:
-            Confidence value between 0 and 1
+            Dictionary with the prediction results per symbol (same format as predict)
+        """
+        results = {}
+        rows = []
+        currents = []
+        symbols = []
+
+        available = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+        for symbol in frames:
+            if symbol not in available:
+                results[symbol] = {'error': f"No data for {symbol}", 'timestamp': pd.Timestamp.now().isoformat()}
+        if not available:
+            return results
+
+        with self._swap_lock:
+            try:
+                self._ensure_model(next(iter(available.values())))
+            except Exception as e:
+                self.logger.error(f"Error loading the model: {str(e)}")
+                for symbol in available:
+                    results[symbol] = {'error': str(e), 'timestamp': pd.Timestamp.now().isoformat()}
+                return results
+
+            for symbol, df in available.items():
+                try:
+                    if 'close' not in df.columns and 'Close' in df.columns:
+                        df['close'] = df['Close']
+                    df_clean = df.ffill().bfill().fillna(0)
+
+                    X, _ = self.prepare_data(df_clean, last_row_only=True)
+                    rows.append(X[-1])
+                    currents.append(df_clean[self.config.get('target', 'close')].iloc[-1])
+                    symbols.append(symbol)
+                except Exception as e:
+                    self.logger.error(f"Error preparing data for {symbol}: {str(e)}")
+                    results[symbol] = {'error': str(e), 'timestamp': pd.Timestamp.now().isoformat()}
+
+            if not symbols:
+                return results
+
+            try:
+                pred_values, confidences = self._predict_with_confidence(np.vstack(rows))
+            except Exception as e:
+                self.logger.error(f"Error making batch prediction: {str(e)}")
+                for symbol in symbols:
+                    results[symbol] = {'error': str(e), 'timestamp': pd.Timestamp.now().isoformat()}
+                return results
+
+        for symbol, pred_value, current_value, confidence in zip(symbols, pred_values, currents, confidences):
+            results[symbol] = self._build_result(pred_value, current_value, confidence)
+
+        self.logger.info(f"Batch prediction for {len(symbols)} symbols")
+        return results
+
+    def predict_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Predicts every row of df that has a full lookback window, in one model call
+
+        Row t sees the features of rows t - lookback + 1 .. t only, like predict()
+        called on the candles up to t. Used for backtests.
+
+        Args:
+            df: DataFrame with the fitted feature columns
+
+        Returns:
+            DataFrame with prediction, current, change_pct and confidence, indexed
+            like the predicted rows of df
+        """
+        if self.model is None:
+            raise ValueError("No fitted model available")
+
+        with self._swap_lock:
+            features = self.fitted['features']
+            lookback = self.fitted.get('lookback', 1)
+            X = window_features(self._scale(df[features].to_numpy(dtype=np.float64)), lookback)
+            pred_values, confidences = self._predict_with_confidence(X)
+
+        current = df[self.config.get('target', 'close')].to_numpy(dtype=np.float64)[lookback - 1:]
+        return pd.DataFrame({
+            'prediction': pred_values,
+            'current': current,
+            'change_pct': (pred_values - current) / current * 100,
+            'confidence': confidences
+        }, index=df.index[lookback - 1:])
+
+    def _ensure_model(self, df: pd.DataFrame) -> None:
+        """Loads a saved model or, if there is none, trains a simple one on df"""
+        if self.model is not None:
+            return
+
+        # Try to load a saved model, models of a single symbol are only served through the ModelRouter
+        self.load_model(generic_only=True)
+        if self.model is None:
+            # If no model can be loaded, train a simple one with the available data
+            self.logger.warning("No trained model available, training simple model")
+            self.model = self._create_model()
+            # Minimal training with available data
+            X, y = self.prepare_data(df, fit=True)
+            if y is not None and len(y) > 0:
+                self.model.fit(X[:len(y)], y)
+            else:
+                # If no target variable is available, do a dummy training
+                self.model.fit(X, np.random.normal(0, 0.01, size=len(X)))
+
+    def _build_result(self, pred_value: float, current_value: float, confidence: float) -> Dict[str, Any]:
+        """Compiles the result dictionary of one prediction"""
+        return {
+            'prediction': float(pred_value),  # Ensure it's a normal Python float
+            'current': float(current_value),
+            'change': float(pred_value - current_value),
+            'change_pct': float((pred_value - current_value) / current_value * 100),
+            'direction': 'up' if pred_value > current_value else 'down',
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'confidence': float(confidence),
+            'horizon': self.config.get('prediction_horizon', 1)
+        }
+
+    def _predict_with_confidence(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predicts the rows of X and calculates their confidence
+
+        Small batches of tree ensembles are evaluated with the compiled node arrays,
+        which give the same values as sklearn without its per-call overhead. For
+        forests the tree outputs of that walk also give the confidence.
+        """
+        compiled = self._get_compiled()
+        if compiled is None or len(X) > COMPILED_MAX_ROWS:
+            return self.model.predict(X), self._get_prediction_confidences(X)
+
+        outputs = compiled.tree_outputs(X)
+        pred_values = compiled.predict_from_outputs(outputs)
+        if isinstance(self.model, RandomForestRegressor):
+            return pred_values, 1.0 - (outputs.std(axis=1) / outputs.mean(axis=1))
+        return pred_values, self._get_prediction_confidences(X)
+
+    def _get_compiled(self) -> Optional[CompiledEnsemble]:
+        """Returns the compiled node arrays of the current model, None if there are none"""
+        if self._compiled is None or self._compiled[0] is not self.model:
+            return None
+        return self._compiled[1]
+
+    def _get_prediction_confidences(self, X: np.ndarray) -> np.ndarray:
+        """
+        Calculates the confidence measure for every row of X
+
+        Args:
+            X: Features, one row per prediction
+
+        Returns:
+            Array with one confidence value (between 0 and 1) per row
         """
         if hasattr(self.model, 'predict_proba'):
             # For models with probability estimation
             try:
-                proba = self.model.predict_proba(X)
-                return np.max(proba)
-            except:
+                return np.max(self.model.predict_proba(X), axis=1)
+            except Exception:
                 pass
 
         # For RandomForest: Standard deviation of tree predictions
         if isinstance(self.model, RandomForestRegressor):
-            predictions = [tree.predict(X)[0] for tree in self.model.estimators_]
-            return 1.0 - (np.std(predictions) / np.mean(predictions))
+            # One apply() call returns the leaf of every tree for every row (parallel with n_jobs),
+            # the tree predictions are then gathered from the padded leaf value matrix
+            leaves = self.model.apply(X)  # (rows, trees)
+            values = self._forest_leaf_values()
+            predictions = values[np.arange(values.shape[0]), leaves]
+            return 1.0 - (predictions.std(axis=1) / predictions.mean(axis=1))
 
         # Fallback
-        return 0.8
+        return np.full(len(X), 0.8)
+
+    def _forest_leaf_values(self) -> np.ndarray:
+        """Returns the node values of all trees as one (trees, max nodes) matrix, cached per model"""
+        if self._leaf_values is None or self._leaf_values[0] is not self.model:
+            trees = [estimator.tree_ for estimator in self.model.estimators_]
+            values = np.zeros((len(trees), max(tree.node_count for tree in trees)))
+            for i, tree in enumerate(trees):
+                values[i, :tree.node_count] = tree.value[:, 0, 0]
+            self._leaf_values = (self.model, values)
+        return self._leaf_values[1]
+
+    def _get_prediction_confidence(self, X: np.ndarray) -> float:
+        """
+        Calculates a confidence measure for the prediction
+
+        Args:
+            X: Features for the prediction
+
+        Returns:
+            Confidence value between 0 and 1
+        """
+        return float(self._get_prediction_confidences(X)[0])
+
+    def save_model(self, symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                   metrics: Optional[Dict[str, float]] = None) -> Optional[str]:
+        """
+        Saves the trained model, the scaler and the config in the model registry
+
+        Tree ensembles are also exported as flat node arrays for fast inference.
 
-    def save_model(self) -> None:
-        """Saves the trained model and the scaler"""
+        Returns:
+            Name of the saved model, None on failure
+        """
         if self.model is not None:
             try:
-                model_name = f"{self.config['model_type']}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}"
-                joblib.dump(self.model, os.path.join(self.models_dir, f"{model_name}.joblib"))
-                joblib.dump(self.scaler, os.path.join(self.models_dir, f"{model_name}_scaler.joblib"))
-
-                # Save config
-                with open(os.path.join(self.models_dir, f"{model_name}_config.json"), 'w') as f:
-                    import json
-                    json.dump(self.config, f)
+                compiled = compile_ensemble(self.model)
+                # The fitted metadata is saved with the config, but under its own key
+                model_name = self.registry.register(self.model, self.scaler, dict(self.config, fitted=self.fitted),
+                                                    compiled=compiled,
+                                                    symbol=symbol, timeframe=timeframe, metrics=metrics)
+                with self._swap_lock:
+                    self._compiled = (self.model, compiled) if compiled is not None else None
+                    self.model_name = model_name
 
                 self.logger.info(f"Model successfully saved as {model_name}")
+                return model_name
             except Exception as e:
                 self.logger.error(f"Error saving the model: {str(e)}")
+        return None
 
-    def load_model(self, model_name: Optional[str] = None) -> bool:
+    def load_model(self, model_name: Optional[str] = None, symbol: Optional[str] = None,
+                   timeframe: Optional[str] = None, generic_only: bool = False) -> bool:
         """
-        Loads a saved model
+        Loads a saved model and swaps it in atomically
 
         Args:
             model_name: Name of the model to load, if None the newest model is loaded
+            symbol: Only consider models trained on this symbol (if model_name is None)
+            timeframe: Only consider models trained on this timeframe (if model_name is None)
+            generic_only: Only consider models trained without a symbol (if model_name is None)
 
         Returns:
             True if successful, otherwise False
         """
         try:
             if model_name is None:
-                # Find newest model
-                model_files = [f for f in os.listdir(self.models_dir) if
-                               f.endswith('.joblib') and not f.endswith('_scaler.joblib')]
-                if not model_files:
+                # Newest model according to the registry index
+                entry = self.registry.latest(symbol=symbol, timeframe=timeframe, generic_only=generic_only)
+                if entry is None:
                     self.logger.warning("No saved models found")
                     return False
-
-                model_files.sort(reverse=True)  # Newest first
-                model_name = model_files[0].replace('.joblib', '')
-
-            # Load model
-            self.model = joblib.load(os.path.join(self.models_dir, f"{model_name}.joblib"))
-
-            # Load scaler
-            scaler_path = os.path.join(self.models_dir, f"{model_name}_scaler.joblib")
-            if os.path.exists(scaler_path):
-                self.scaler = joblib.load(scaler_path)
-
-            # Load config
-            config_path = os.path.join(self.models_dir, f"{model_name}_config.json")
-            if os.path.exists(config_path):
-                import json
-                with open(config_path, 'r') as f:
-                    self.config = json.load(f)
+                model_name = entry['name']
+
+            artifacts = self.registry.load(model_name)
+            model = artifacts['model']
+
+            # Use the exported node arrays, compile older models without them
+            if artifacts['compiled'] is not None:
+                compiled = CompiledEnsemble.from_arrays(artifacts['compiled'])
+            else:
+                compiled = compile_ensemble(model)
+
+            # Everything is loaded before the serving model is replaced
+            with self._swap_lock:
+                self.model = model
+                self._compiled = (model, compiled) if compiled is not None else None
+                if artifacts['scaler'] is not None:
+                    self.scaler = artifacts['scaler']
+                if artifacts['config'] is not None:
+                    self.config, self.fitted = self._split_saved_config(artifacts['config'])
+                self.model_name = model_name
 
             self.logger.info(f"Model {model_name} successfully loaded")
             return True
@@ -285,6 +788,15 @@ class PredictionModel:
             self.logger.error(f"Error loading the model: {str(e)}")
             return False
 
+    def _split_saved_config(self, saved: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Splits a saved config into the model config and the fitted metadata"""
+        config = {key: value for key, value in saved.items() if key != 'fitted' and key not in LEGACY_FITTED_KEYS}
+        fitted = dict(saved.get('fitted') or {})
+        for legacy_key, key in LEGACY_FITTED_KEYS.items():
+            if legacy_key in saved:
+                fitted.setdefault(key, saved[legacy_key])
+        return config, fitted
+
     def update_config(self, new_config: Dict[str, Any]) -> None:
         """
         Updates the model configuration
@@ -0,0 +1,295 @@
+# model_registry.py
+import os
+import json
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+import joblib
+import pandas as pd
+
+# Artifact files of a model, relative to the models directory
+ARTIFACT_SUFFIXES = {
+    'model': '.joblib',
+    'scaler': '_scaler.joblib',
+    'config': '_config.json',
+    'compiled': '_compiled.joblib'
+}
+
+# Registries of the same directory in one process share a lock, see _directory_lock
+_directory_locks: Dict[str, threading.RLock] = {}
+_directory_locks_guard = threading.Lock()
+
+
+def _directory_lock(models_dir: str) -> threading.RLock:
+    """Returns the lock of a models directory, one per directory and process"""
+    key = os.path.realpath(models_dir)
+    with _directory_locks_guard:
+        return _directory_locks.setdefault(key, threading.RLock())
+
+
+class ModelRegistry:
+    """
+    Index of the saved models in the models directory
+
+    A small index file (index.json) records name, type, symbol, timeframe,
+    creation time, metrics and artifact files of every model, so finding the
+    newest model never lists or sorts the directory. Artifacts are loaded with
+    memory-mapped NumPy arrays, and only the newest `keep` models per
+    (symbol, timeframe, model type) are retained.
+
+    Every PredictionModel without a shared registry opens its own one, so several
+    registries may work on one directory. They share a lock per directory, re-read
+    the index before changing it and reload it when another registry wrote it.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, models_dir: str = 'models', keep: int = 3, mmap_mode: Optional[str] = 'r'):
+        """
+        Initializes the registry
+
+        Args:
+            models_dir: Directory with the model artifacts
+            keep: Number of models retained per (symbol, timeframe, model type)
+            mmap_mode: joblib mmap mode for loading artifacts, None to load into memory
+        """
+        self.models_dir = models_dir
+        self.keep = keep
+        self.mmap_mode = mmap_mode
+        self.logger = logging.getLogger('ModelRegistry')
+        os.makedirs(self.models_dir, exist_ok=True)
+        self._lock = _directory_lock(self.models_dir)
+        self._index_stamp = None  # stat of the index file the entries were read from or written to
+        with self._lock:
+            self._entries = self._read_index()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.models_dir, self.INDEX_FILE)
+
+    def _stat_index(self) -> Optional[tuple]:
+        """(inode, mtime, size) of the index file, None if it does not exist"""
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reload(self) -> None:
+        """Re-reads the index if another registry wrote it, call with the lock held"""
+        stamp = self._stat_index()
+        if stamp is None or stamp != self._index_stamp:
+            self._entries = self._read_index()
+
+    def _read_index(self) -> List[Dict[str, Any]]:
+        """Reads the index, rebuilds it once from the directory if it does not exist"""
+        if os.path.exists(self.index_path):
+            try:
+                stamp = self._stat_index()
+                with open(self.index_path, 'r') as f:
+                    entries = json.load(f)['models']
+                self._index_stamp = stamp
+                return entries
+            except Exception as e:
+                self.logger.warning(f"Model index could not be read, rebuilding it: {str(e)}")
+
+        entries = self._scan_directory()
+        self._write_index(entries)
+        return entries
+
+    def _scan_directory(self) -> List[Dict[str, Any]]:
+        """Builds index entries for models saved without an index"""
+        entries = []
+        for filename in os.listdir(self.models_dir):
+            if not filename.endswith('.joblib') or any(
+                    filename.endswith(suffix) for key, suffix in ARTIFACT_SUFFIXES.items() if key != 'model'):
+                continue
+
+            name = filename[:-len('.joblib')]
+            path = os.path.join(self.models_dir, filename)
+            config = {}
+            config_path = os.path.join(self.models_dir, f"{name}_config.json")
+            if os.path.exists(config_path):
+                try:
+                    with open(config_path, 'r') as f:
+                        config = json.load(f)
+                except Exception:
+                    pass
+
+            entries.append({
+                'name': name,
+                'model_type': config.get('model_type', name.split('_20')[0]),
+                'symbol': None,
+                'timeframe': None,
+                'created': pd.Timestamp(os.path.getmtime(path), unit='s').isoformat(),
+                'metrics': {},
+                'files': {key: f"{name}{suffix}" for key, suffix in ARTIFACT_SUFFIXES.items()
+                          if os.path.exists(os.path.join(self.models_dir, f"{name}{suffix}"))}
+            })
+
+        self.logger.info(f"Model index rebuilt with {len(entries)} models")
+        return sorted(entries, key=lambda entry: entry['created'])
+
+    def _write_index(self, entries: List[Dict[str, Any]]) -> None:
+        """Writes the index atomically"""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'models': entries}, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+        self._index_stamp = self._stat_index()
+
+    def entries(self, symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                model_type: Optional[str] = None, generic_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Returns the index entries matching the filters, oldest first
+
+        symbol=None matches every symbol, generic_only restricts the result to models
+        trained without a symbol.
+        """
+        with self._lock:
+            self._reload()
+            return [dict(entry) for entry in self._entries
+                    if (symbol is None or entry.get('symbol') == symbol)
+                    and (not generic_only or entry.get('symbol') is None)
+                    and (timeframe is None or entry.get('timeframe') == timeframe)
+                    and (model_type is None or entry.get('model_type') == model_type)]
+
+    def latest(self, symbol: Optional[str] = None, timeframe: Optional[str] = None,
+               model_type: Optional[str] = None, generic_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Returns the index entry of the newest matching model, None if there is none"""
+        entries = self.entries(symbol, timeframe, model_type, generic_only=generic_only)
+        return entries[-1] if entries else None
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Returns the index entry of a model by name"""
+        with self._lock:
+            self._reload()
+            for entry in self._entries:
+                if entry['name'] == name:
+                    return dict(entry)
+        return None
+
+    def register(self, model: Any, scaler: Any, config: Dict[str, Any], compiled: Any = None,
+                 symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                 metrics: Optional[Dict[str, float]] = None) -> str:
+        """
+        Saves the artifacts of a model and adds it to the index
+
+        Args:
+            model: Fitted estimator
+            scaler: Fitted scaler
+            config: Model configuration
+            compiled: Optional CompiledEnsemble of the estimator
+            symbol: Symbol the model was trained on
+            timeframe: Timeframe the model was trained on
+            metrics: Training metrics
+
+        Returns:
+            Name of the saved model
+        """
+        model_type = config.get('model_type', 'unknown')
+        created = pd.Timestamp.now()
+        parts = [model_type] + ([symbol.replace('/', '_')] if symbol else []) + ([timeframe] if timeframe else [])
+        base_name = f"{'_'.join(parts)}_{created.strftime('%Y%m%d_%H%M%S')}"
+
+        with self._lock:
+            # Another registry may have added models since the last read
+            self._entries = self._read_index()
+            names = {entry['name'] for entry in self._entries}
+            name, counter = base_name, 1
+            while name in names:
+                name, counter = f"{base_name}_{counter}", counter + 1
+
+            files = {}
+            for key, artifact in [('model', model), ('scaler', scaler), ('compiled', compiled)]:
+                if artifact is None:
+                    continue
+                if key == 'compiled':
+                    artifact = artifact.to_arrays()
+                files[key] = f"{name}{ARTIFACT_SUFFIXES[key]}"
+                joblib.dump(artifact, os.path.join(self.models_dir, files[key]))
+
+            files['config'] = f"{name}{ARTIFACT_SUFFIXES['config']}"
+            with open(os.path.join(self.models_dir, files['config']), 'w') as f:
+                json.dump(config, f)
+
+            self._entries.append({
+                'name': name,
+                'model_type': model_type,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'created': created.isoformat(),
+                'metrics': metrics or {},
+                'files': files
+            })
+            self._write_index(self._entries)
+            self.compact()
+
+        self.logger.info(f"Model {name} registered")
+        return name
+
+    def load(self, name: str) -> Dict[str, Any]:
+        """
+        Loads the artifacts of a model
+
+        Returns:
+            Dictionary with 'entry', 'model', 'scaler' (or None), 'config' and 'compiled' arrays (or None)
+
+        Raises:
+            KeyError: If the model is not in the index
+        """
+        entry = self.get(name)
+        if entry is None:
+            raise KeyError(f"Model {name} not found in the registry")
+
+        files = entry['files']
+        artifacts = {'entry': entry, 'scaler': None, 'config': None, 'compiled': None}
+        artifacts['model'] = joblib.load(os.path.join(self.models_dir, files['model']), mmap_mode=self.mmap_mode)
+        if 'scaler' in files:
+            artifacts['scaler'] = joblib.load(os.path.join(self.models_dir, files['scaler']))
+        if 'compiled' in files:
+            artifacts['compiled'] = joblib.load(os.path.join(self.models_dir, files['compiled']),
+                                                mmap_mode=self.mmap_mode)
+        if 'config' in files:
+            with open(os.path.join(self.models_dir, files['config']), 'r') as f:
+                artifacts['config'] = json.load(f)
+        return artifacts
+
+    def compact(self) -> int:
+        """
+        Removes all but the newest `keep` models per (symbol, timeframe, model type)
+        and artifact files that belong to no indexed model
+
+        Returns:
+            Number of removed models
+        """
+        with self._lock:
+            # The files of models another registry added are referenced by the index file only
+            self._entries = self._read_index()
+            groups = {}
+            for entry in self._entries:
+                key = (entry.get('symbol'), entry.get('timeframe'), entry.get('model_type'))
+                groups.setdefault(key, []).append(entry)
+
+            removed = [entry for group in groups.values()
+                       for entry in sorted(group, key=lambda item: item['created'])[:-self.keep]]
+            if removed:
+                removed_names = {entry['name'] for entry in removed}
+                self._entries = [entry for entry in self._entries if entry['name'] not in removed_names]
+                self._write_index(self._entries)
+
+            # Delete after the index no longer references the files
+            referenced = {filename for entry in self._entries for filename in entry['files'].values()}
+            referenced.add(self.INDEX_FILE)
+            for filename in os.listdir(self.models_dir):
+                is_artifact = filename.endswith(tuple(ARTIFACT_SUFFIXES.values()))
+                if is_artifact and filename not in referenced:
+                    try:
+                        os.remove(os.path.join(self.models_dir, filename))
+                    except OSError as e:
+                        self.logger.warning(f"Could not remove {filename}: {str(e)}")
+
+        if removed:
+            self.logger.info(f"Removed {len(removed)} old models")
+        return len(removed)
@@ -0,0 +1,197 @@
+# model_router.py
+import os
+import copy
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from model import PredictionModel
+
+
+class ModelRouter:
+    """
+    Serves a PredictionModel per (symbol, timeframe)
+
+    Models are loaded lazily from the registry into a cache that is bounded by a
+    number of models and a memory budget (estimated from the artifact sizes).
+    When the cache is full, the model with the fewest recent accesses is evicted,
+    ties go to the least recently used one. Access counts are halved every
+    `decay_interval` accesses, so models that were popular long ago age out.
+    Symbols without a model of their own are served by the default model.
+    """
+
+    def __init__(self, default_model: PredictionModel, max_models: int = 50, memory_budget_mb: float = 512.0,
+                 decay_interval: int = 1000):
+        """
+        Initializes the router
+
+        Args:
+            default_model: Model for symbols without a symbol-specific model, its registry is shared
+            max_models: Maximum number of cached symbol-specific models
+            memory_budget_mb: Maximum estimated size of the cached models
+            decay_interval: Number of accesses after which all access counts are halved
+        """
+        self.default_model = default_model
+        self.registry = default_model.registry
+        self.max_models = max_models
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.decay_interval = decay_interval
+        self.logger = logging.getLogger('ModelRouter')
+
+        self._models: 'OrderedDict[Tuple[str, str], Tuple[PredictionModel, int]]' = OrderedDict()  # LRU order
+        self._counts: Dict[Tuple[str, str], float] = {}
+        self._accesses = 0
+        self._memory = 0
+        self._lock = threading.RLock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def _new_model(self) -> PredictionModel:
+        """Creates an empty model with the default configuration"""
+        return PredictionModel(config=copy.deepcopy(self.default_model.config), registry=self.registry)
+
+    def _model_size(self, model: PredictionModel) -> int:
+        """Estimated memory of a model from the size of its artifact files"""
+        entry = self.registry.get(model.model_name) if model.model_name else None
+        if entry is None:
+            return 0
+
+        size = 0
+        for filename in entry['files'].values():
+            try:
+                size += os.path.getsize(os.path.join(self.registry.models_dir, filename))
+            except OSError:
+                pass
+        return size
+
+    def _record_access(self, key: Tuple[str, str]) -> None:
+        """Counts an access (caller holds the lock)"""
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self._accesses += 1
+        if self._accesses % self.decay_interval == 0:
+            self._counts = {k: count / 2 for k, count in self._counts.items() if count >= 1}
+
+    def _insert(self, key: Tuple[str, str], model: PredictionModel) -> None:
+        """Adds a model to the cache and evicts until the limits hold (caller holds the lock)"""
+        if key in self._models:
+            self._memory -= self._models.pop(key)[1]
+
+        size = self._model_size(model)
+        self._models[key] = (model, size)
+        self._memory += size
+
+        while len(self._models) > 1 and (len(self._models) > self.max_models or self._memory > self.memory_budget):
+            # Fewest accesses first, OrderedDict order breaks ties by recency
+            victim = min((k for k in self._models if k != key), key=lambda k: self._counts.get(k, 0))
+            self._memory -= self._models.pop(victim)[1]
+            self.logger.info(f"Evicted model for {victim[0]} {victim[1]}")
+
+    def get(self, symbol: str, timeframe: str = '1h') -> PredictionModel:
+        """
+        Returns the model for a symbol and timeframe
+
+        The symbol-specific model is loaded from the registry on first use; the
+        default model is returned if there is none.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            self._record_access(key)
+            cached = self._models.get(key)
+            if cached is not None:
+                self._models.move_to_end(key)
+                return cached[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Loading happens outside the router lock, concurrent requests for one key load once
+        with key_lock:
+            with self._lock:
+                cached = self._models.get(key)
+                if cached is not None:
+                    return cached[0]
+
+            if self.registry.latest(symbol=symbol, timeframe=timeframe) is None:
+                return self.default_model
+
+            model = self._new_model()
+            if not model.load_model(symbol=symbol, timeframe=timeframe):
+                return self.default_model
+
+            with self._lock:
+                self._insert(key, model)
+            self.logger.info(f"Loaded model {model.model_name} for {symbol} {timeframe}")
+            return model
+
+    def install(self, symbol: str, timeframe: str, fitted: Dict[str, Any],
+                config: Optional[Dict[str, Any]] = None) -> PredictionModel:
+        """
+        Saves a model fitted elsewhere (e.g. in a training process) and serves it
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe
+            fitted: Output of PredictionModel.fit()
+            config: Configuration the model was fitted with, defaults to the default config
+        """
+        model = self._new_model()
+        if config is not None:
+            model.config = copy.deepcopy(config)
+        model.install(fitted, symbol=symbol, timeframe=timeframe)
+
+        with self._lock:
+            self._insert((symbol, timeframe), model)
+        return model
+
+    def update(self, symbol: str, timeframe: str, df: pd.DataFrame) -> PredictionModel:
+        """
+        Updates the model of a symbol with new candles (PredictionModel.update)
+
+        Symbols that are still served by the default model get a model of their own,
+        fitted on df in the calling thread (TrainingJobManager fits those in a worker
+        process instead).
+        """
+        model = self.get(symbol, timeframe)
+        if model is self.default_model:
+            return self.install(symbol, timeframe, self._new_model().fit(df))
+
+        model.update(df, symbol=symbol, timeframe=timeframe)
+        with self._lock:
+            if (symbol, timeframe) in self._models:
+                # The artifact size changes with added trees
+                self._insert((symbol, timeframe), model)
+        return model
+
+    def predict(self, symbol: str, df: pd.DataFrame, timeframe: str = '1h') -> Dict[str, Any]:
+        """Makes a prediction with the model of the symbol"""
+        return self.get(symbol, timeframe).predict(df)
+
+    def predict_many(self, frames: Dict[str, pd.DataFrame], timeframe: str = '1h') -> Dict[str, Dict[str, Any]]:
+        """Makes predictions for several symbols, batched per model"""
+        groups: Dict[int, Tuple[PredictionModel, Dict[str, pd.DataFrame]]] = {}
+        for symbol, df in frames.items():
+            model = self.get(symbol, timeframe)
+            groups.setdefault(id(model), (model, {}))[1][symbol] = df
+
+        results = {}
+        for model, model_frames in groups.values():
+            results.update(model.predict_many(model_frames))
+        return results
+
+    def invalidate(self, symbol: str, timeframe: str = '1h') -> None:
+        """Drops a cached model, it is reloaded on the next access"""
+        with self._lock:
+            cached = self._models.pop((symbol, timeframe), None)
+            if cached is not None:
+                self._memory -= cached[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the cache usage"""
+        with self._lock:
+            return {
+                'models': len(self._models),
+                'max_models': self.max_models,
+                'memory_mb': self._memory / (1024 * 1024),
+                'memory_budget_mb': self.memory_budget / (1024 * 1024),
+                'cached': [f"{symbol}_{timeframe}" for symbol, timeframe in self._models]
+            }
@@ -0,0 +1,199 @@
+# rate_limiter.py
+import time
+import heapq
+import itertools
+import threading
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Request priorities, lower values are served first
+PRIORITY_TRADE = 0  # orders, prices for trades and stop-loss checks
+PRIORITY_LIVE = 1  # market data for predictions and jobs
+PRIORITY_BACKFILL = 2  # training data and other bulk downloads
+
+# Request weight per Binance REST endpoint (see the Binance API docs)
+ENDPOINT_WEIGHTS = {
+    'klines': 2,
+    'ticker_price': 2,
+    'ticker_price_all': 4,
+    'order': 1,
+    'account': 20
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request could not be scheduled within its timeout"""
+
+
+class RequestScheduler:
+    """
+    Schedules exchange requests within the request-weight limit
+
+    Tracks the weight used in a rolling window, combines it with the used weight the
+    exchange reports in its response headers and lets waiting requests through in
+    priority order (trade-critical before live data before backfills). After a 429 or
+    418 response no request is sent until the Retry-After time has passed.
+    """
+
+    def __init__(self, weight_limit: int = 6000, window: float = 60.0, safety_margin: float = 0.9,
+                 used_weight_header: str = 'x-mbx-used-weight-1m'):
+        """
+        Initializes the scheduler
+
+        Args:
+            weight_limit: Allowed request weight per window (Binance: 6000 per minute)
+            window: Window length in seconds
+            safety_margin: Share of the limit that may be used
+            used_weight_header: Response header with the weight used in the current window
+        """
+        self.weight_limit = weight_limit
+        self.window = window
+        self.budget = int(weight_limit * safety_margin)
+        self.used_weight_header = used_weight_header
+        self.logger = logging.getLogger('RequestScheduler')
+
+        self._requests = deque()  # (time.monotonic(), weight) of the requests in the window
+        self._local_used = 0
+        self._server_used = 0
+        self._server_used_at = 0.0
+        self._banned_until = 0.0
+        self._waiters = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _used_weight(self, now: float) -> int:
+        """Weight used in the current window (caller holds the lock)"""
+        while self._requests and self._requests[0][0] <= now - self.window:
+            self._local_used -= self._requests.popleft()[1]
+
+        server_used = self._server_used if now - self._server_used_at < self.window else 0
+        return max(self._local_used, server_used)
+
+    def _wait_time(self, now: float, weight: int) -> Optional[float]:
+        """Seconds until capacity may be available, None if the request can be sent now (caller holds the lock)"""
+        if now < self._banned_until:
+            return self._banned_until - now
+        if self._used_weight(now) + weight <= self.budget:
+            return None
+
+        # Over budget: re-check when the oldest request or the server reading leaves the window
+        expiries = []
+        if self._requests:
+            expiries.append(self._requests[0][0] + self.window - now)
+        if now - self._server_used_at < self.window:
+            expiries.append(self._server_used_at + self.window - now)
+        return max(min(expiries, default=0.0), 0.01)
+
+    def acquire(self, weight: int = 1, priority: int = PRIORITY_LIVE, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until a request with the given weight may be sent
+
+        Raises:
+            RateLimitExceeded: If the request could not be scheduled within timeout seconds
+        """
+        weight = min(weight, self.budget)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait_time = self._wait_time(now, weight)
+                    if self._waiters[0] == entry:
+                        if wait_time is None:
+                            heapq.heappop(self._waiters)
+                            self._requests.append((now, weight))
+                            self._local_used += weight
+                            self._cond.notify_all()
+                            return
+                    else:
+                        # Only the first waiter polls, the others are woken by notify_all
+                        wait_time = None
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise RateLimitExceeded(f"Request with weight {weight} not scheduled within {timeout}s")
+                        wait_time = remaining if wait_time is None else min(wait_time, remaining)
+
+                    self._cond.wait(wait_time)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def record_response(self, headers: Optional[Dict[str, str]] = None, status_code: Optional[int] = None) -> None:
+        """Updates the usage from the exchange's response headers and handles 429/418 responses"""
+        with self._cond:
+            now = time.monotonic()
+            if headers:
+                used = headers.get(self.used_weight_header)
+                if used is not None:
+                    self._server_used = int(used)
+                    self._server_used_at = now
+
+            if status_code in (418, 429):
+                retry_after = float((headers or {}).get('Retry-After', self.window))
+                self._banned_until = max(self._banned_until, now + retry_after)
+                self.logger.warning(f"Rate limit response {status_code} from the exchange, pausing for {retry_after:.0f}s")
+
+            self._cond.notify_all()
+
+    def _record_hook(self, response: Any, *args, **kwargs) -> None:
+        """requests response hook, records the headers of every response"""
+        self.record_response(response.headers, response.status_code)
+
+    def _hook_client(self, client: Any) -> bool:
+        """
+        Registers _record_hook on the requests session of a client
+
+        The hook runs in the thread of each request with its own response, while
+        client.response is shared by all threads using the client and may already
+        belong to another call when it is read.
+
+        Returns:
+            False if the client has no requests session
+        """
+        hooks = getattr(getattr(client, 'session', None), 'hooks', None)
+        if not isinstance(hooks, dict):
+            return False
+        with self._cond:
+            response_hooks = hooks.setdefault('response', [])
+            if self._record_hook not in response_hooks:
+                response_hooks.append(self._record_hook)
+        return True
+
+    def call(self, client: Any, func: Callable, *args, weight: int = 1, priority: int = PRIORITY_LIVE,
+             timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Schedules and executes a python-binance client call
+
+        The used weight is recorded from every response by a hook on the client's
+        requests session; for clients without one, from the exception of failed calls.
+        """
+        hooked = self._hook_client(client)
+        self.acquire(weight, priority, timeout)
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not hooked:
+                response = getattr(e, 'response', None)
+                self.record_response(getattr(response, 'headers', None), getattr(e, 'status_code', None))
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the current usage"""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                'used_weight': self._used_weight(now),
+                'budget': self.budget,
+                'weight_limit': self.weight_limit,
+                'waiting': len(self._waiters),
+                'banned_for': max(self._banned_until - now, 0.0)
+            }
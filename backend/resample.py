@@ -0,0 +1,171 @@
+# resample.py
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from candle_store import INTERVAL_MS
+
+# Binance weeks start on Monday, the Unix epoch was a Thursday
+BUCKET_OFFSET_MS = {'1w': 4 * 86_400_000}
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def can_resample(base_timeframe: str, timeframe: str) -> bool:
+    """True if candles of `timeframe` can be built from `base_timeframe` candles"""
+    if base_timeframe not in INTERVAL_MS or timeframe not in INTERVAL_MS or base_timeframe == timeframe:
+        return False
+    if timeframe == '1M':
+        return INTERVAL_MS[base_timeframe] <= INTERVAL_MS['1d']
+    return INTERVAL_MS[timeframe] % INTERVAL_MS[base_timeframe] == 0
+
+
+def bucket_starts(timestamps: np.ndarray, timeframe: str) -> np.ndarray:
+    """Returns the open time (ms) of the `timeframe` candle each timestamp (ms) belongs to"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if timeframe == '1M':
+        return timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+
+    interval_ms = INTERVAL_MS[timeframe]
+    offset = BUCKET_OFFSET_MS.get(timeframe, 0)
+    return timestamps - (timestamps - offset) % interval_ms
+
+
+def bucket_close_times(starts: np.ndarray, timeframe: str) -> np.ndarray:
+    """Returns the close time (ms) of the candles opening at `starts`"""
+    if timeframe == '1M':
+        next_month = (starts.astype('datetime64[ms]').astype('datetime64[M]') + 1).astype('datetime64[ms]')
+        return next_month.astype(np.int64) - 1
+    return starts + INTERVAL_MS[timeframe] - 1
+
+
+def aggregate_ohlcv(timestamps: np.ndarray, values: np.ndarray, timeframe: str) -> Dict[str, np.ndarray]:
+    """
+    Aggregates ascending base candles into `timeframe` candles
+
+    Args:
+        timestamps: Base candle open times (ms), ascending
+        values: Array of shape (n, 5) with open, high, low, close, volume
+        timeframe: Target timeframe
+
+    Returns:
+        Dictionary with timestamp, open, high, low, close, volume, close_time and the
+        number of base candles per bucket ('count')
+    """
+    starts = bucket_starts(timestamps, timeframe)
+    if len(starts) == 0:
+        empty_float = np.empty(0, dtype=np.float64)
+        empty_int = np.empty(0, dtype=np.int64)
+        return {'timestamp': empty_int, 'open': empty_float, 'high': empty_float, 'low': empty_float,
+                'close': empty_float, 'volume': empty_float, 'close_time': empty_int, 'count': empty_int}
+
+    # Index of the first base candle of every bucket
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], len(starts)] - 1
+    bucket_timestamps = starts[first]
+
+    return {
+        'timestamp': bucket_timestamps,
+        'open': values[first, 0],
+        'high': np.maximum.reduceat(values[:, 1], first),
+        'low': np.minimum.reduceat(values[:, 2], first),
+        'close': values[last, 3],
+        'volume': np.add.reduceat(values[:, 4], first),
+        'close_time': bucket_close_times(bucket_timestamps, timeframe),
+        'count': last - first + 1
+    }
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str, base_timeframe: Optional[str] = None) -> pd.DataFrame:
+    """
+    Builds `timeframe` candles from a base candle frame
+
+    Args:
+        df: Base candles with timestamp and OHLCV columns, ascending
+        timeframe: Target timeframe
+        base_timeframe: Timeframe of df, used to drop an incomplete first bucket
+
+    Returns:
+        DataFrame with timestamp, open, high, low, close, volume and close_time
+    """
+    timestamps = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+    values = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+    columns = aggregate_ohlcv(timestamps, values, timeframe)
+
+    # History that starts in the middle of a bucket gives an incomplete first candle
+    if base_timeframe is not None and timeframe != '1M' and len(columns['count']) > 0:
+        expected = INTERVAL_MS[timeframe] // INTERVAL_MS[base_timeframe]
+        if columns['count'][0] < expected:
+            columns = {col: column[1:] for col, column in columns.items()}
+
+    return _to_frame(columns)
+
+
+def _to_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    df = pd.DataFrame({col: columns[col] for col in OHLCV_COLUMNS})
+    df.insert(0, 'timestamp', pd.to_datetime(columns['timestamp'], unit='ms'))
+    df['close_time'] = columns['close_time']
+    return df
+
+
+class Resampler:
+    """
+    Incrementally maintained higher-timeframe candles per symbol
+
+    Only the buckets from the newest stored (possibly still open) bucket onward are
+    recomputed when new base candles arrive.
+    """
+
+    def __init__(self, max_candles: int = 5000):
+        self.max_candles = max_candles
+        self.logger = logging.getLogger('Resampler')
+        self._series: Dict[Tuple[str, str, str], Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def resample(self, symbol: str, base_timeframe: str, timeframe: str, base_df: pd.DataFrame,
+                 limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Updates and returns the `timeframe` candles of a symbol
+
+        Args:
+            symbol: Trading symbol
+            base_timeframe: Timeframe of base_df
+            timeframe: Target timeframe
+            base_df: Newest base candles (timestamp and OHLCV columns), ascending
+            limit: Number of newest candles to return, None for all
+
+        Returns:
+            DataFrame with timestamp, open, high, low, close, volume and close_time
+        """
+        key = (symbol, base_timeframe, timeframe)
+        timestamps = pd.DatetimeIndex(base_df['timestamp']).as_unit('ms').asi8
+        values = base_df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+
+        with self._lock:
+            series = self._series.get(key)
+            start = None
+            if series is not None and len(series['timestamp']) > 0 and len(timestamps) > 0:
+                last_bucket = series['timestamp'][-1]
+                # The base frame has to cover the newest stored bucket from its start
+                if timestamps[0] <= last_bucket <= timestamps[-1]:
+                    start = last_bucket
+
+            if start is None:
+                frame = resample_ohlcv(base_df, timeframe, base_timeframe)
+                series = {col: frame[col].to_numpy() for col in ['open', 'high', 'low', 'close', 'volume', 'close_time']}
+                series['timestamp'] = pd.DatetimeIndex(frame['timestamp']).as_unit('ms').asi8
+            else:
+                mask = timestamps >= start
+                fresh = aggregate_ohlcv(timestamps[mask], values[mask], timeframe)
+                keep = series['timestamp'] < start
+                series = {col: np.concatenate([series[col][keep], fresh[col]]) for col in series}
+
+            series = {col: column[-self.max_candles:] for col, column in series.items()}
+            self._series[key] = series
+
+        if limit is not None:
+            series = {col: column[-limit:] for col, column in series.items()}
+        return _to_frame(series)
@@ -0,0 +1,149 @@
+# simulator.py
+import logging
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from candle_store import INTERVAL_MS
+
+
+class MarketSimulator:
+    """
+    Vectorized, seedable generator of synthetic OHLCV candles
+
+    Prices follow a geometric Brownian motion ('gbm') or a two-state
+    regime-switching GBM ('regime') with a bull and a bear regime. All symbols and
+    candles of one call are generated with a handful of array operations, so
+    millions of candles can be produced for load tests and offline benchmarks.
+    """
+
+    BASE_PRICES = {'BTC': 30000.0, 'ETH': 2000.0}
+    DEFAULT_BASE_PRICE = 100.0
+
+    def __init__(self, seed: Optional[int] = None, model: str = 'gbm', volatility: float = 0.01,
+                 drift: float = 0.0, regimes: Optional[Dict[str, Dict[str, float]]] = None,
+                 switch_probability: float = 0.02):
+        """
+        Initializes the simulator
+
+        Args:
+            seed: Seed of the random generator, None for a random seed
+            model: 'gbm' or 'regime'
+            volatility: Standard deviation of the log return per candle
+            drift: Mean log return per candle
+            regimes: Drift/volatility per regime for the 'regime' model
+            switch_probability: Probability per candle of switching the regime
+        """
+        if model not in ('gbm', 'regime'):
+            raise ValueError(f"Unknown simulator model: {model}")
+
+        self.rng = np.random.default_rng(seed)
+        self.model = model
+        self.volatility = volatility
+        self.drift = drift
+        self.regimes = regimes or {
+            'bull': {'drift': 0.001, 'volatility': volatility * 0.8},
+            'bear': {'drift': -0.001, 'volatility': volatility * 1.5}
+        }
+        self.switch_probability = switch_probability
+        self.logger = logging.getLogger('MarketSimulator')
+
+    def base_price(self, symbol: str) -> float:
+        """Returns the start price for a symbol"""
+        for asset, price in self.BASE_PRICES.items():
+            if asset in symbol:
+                return price
+        return self.DEFAULT_BASE_PRICE
+
+    def _log_returns(self, n_symbols: int, n: int) -> np.ndarray:
+        """Draws the log returns of all symbols, shape (n_symbols, n)"""
+        shocks = self.rng.standard_normal((n_symbols, n))
+
+        if self.model == 'gbm':
+            return (self.drift - 0.5 * self.volatility ** 2) + self.volatility * shocks
+
+        # Regime path: every switch moves to the next regime (a symmetric Markov chain for two regimes)
+        drifts = np.array([regime['drift'] for regime in self.regimes.values()])
+        vols = np.array([regime['volatility'] for regime in self.regimes.values()])
+        switches = self.rng.random((n_symbols, n)) < self.switch_probability
+        start = self.rng.integers(0, len(drifts), size=(n_symbols, 1))
+        state = (start + np.cumsum(switches, axis=1)) % len(drifts)
+        return (drifts[state] - 0.5 * vols[state] ** 2) + vols[state] * shocks
+
+    def generate_arrays(self, start_prices: Union[List[float], np.ndarray], n: int,
+                        dtype=np.float64) -> np.ndarray:
+        """
+        Generates OHLCV values for several symbols
+
+        Args:
+            start_prices: Start price per symbol
+            n: Number of candles per symbol
+            dtype: Output dtype (np.float32 halves the memory for very large runs)
+
+        Returns:
+            Array of shape (n_symbols, n, 5) with open, high, low, close, volume
+        """
+        start_prices = np.asarray(start_prices, dtype=np.float64).reshape(-1, 1)
+        n_symbols = len(start_prices)
+
+        close = start_prices * np.exp(np.cumsum(self._log_returns(n_symbols, n), axis=1))
+        open_ = np.empty_like(close)
+        open_[:, 0] = start_prices[:, 0]
+        open_[:, 1:] = close[:, :-1]
+
+        wick = np.abs(self.rng.normal(0, self.volatility / 2, size=(2, n_symbols, n)))
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = self.rng.lognormal(mean=np.log(500), sigma=0.5, size=(n_symbols, n)) * (start_prices / 100)
+
+        out = np.empty((n_symbols, n, 5), dtype=dtype)
+        out[..., 0] = open_
+        out[..., 1] = high
+        out[..., 2] = low
+        out[..., 3] = close
+        out[..., 4] = volume
+        return out
+
+    def generate(self, symbols: Union[str, List[str]], n: int, timeframe: str = '1h',
+                 end: Optional[pd.Timestamp] = None, dtype=np.float64) -> Dict[str, pd.DataFrame]:
+        """
+        Generates candle DataFrames for several symbols
+
+        Args:
+            symbols: Symbol or list of symbols
+            n: Number of candles per symbol
+            timeframe: Candle timeframe, determines the timestamp spacing
+            end: Open time of the newest candle, defaults to the current candle
+            dtype: Dtype of the OHLCV columns
+
+        Returns:
+            Dictionary with a DataFrame (timestamp, open, high, low, close, volume, close_time) per symbol
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        interval_ms = INTERVAL_MS.get(timeframe, INTERVAL_MS['1h'])
+        if end is None:
+            now_ms = pd.Timestamp.now().value // 1_000_000
+            end_ms = now_ms - now_ms % interval_ms
+        else:
+            end_ms = pd.Timestamp(end).value // 1_000_000
+
+        timestamps = end_ms - interval_ms * np.arange(n - 1, -1, -1, dtype=np.int64)
+        values = self.generate_arrays([self.base_price(symbol) for symbol in symbols], n, dtype=dtype)
+
+        frames = {}
+        for i, symbol in enumerate(symbols):
+            frames[symbol] = pd.DataFrame({
+                'timestamp': pd.to_datetime(timestamps, unit='ms'),
+                'open': values[i, :, 0],
+                'high': values[i, :, 1],
+                'low': values[i, :, 2],
+                'close': values[i, :, 3],
+                'volume': values[i, :, 4],
+                'close_time': timestamps + interval_ms - 1
+            })
+
+        self.logger.info(f"Simulated {n} candles for {len(symbols)} symbols ({self.model})")
+        return frames
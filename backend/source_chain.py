@@ -0,0 +1,214 @@
+# source_chain.py
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class SourceChainError(Exception):
+    """Raised when no source of the chain delivered a result"""
+
+
+class DataSource:
+    """A named data source with its own deadline and latency history"""
+
+    def __init__(self, name: str, fetch: Callable[..., Any], deadline: float = 10.0, history: int = 100):
+        """
+        Args:
+            name: Name reported for results of this source
+            fetch: Function returning the result or None if the source has no data
+            deadline: Seconds after which the source is given up
+            history: Number of latencies kept for the hedging percentile
+        """
+        self.name = name
+        self.fetch = fetch
+        self.deadline = deadline
+        self.latencies = deque(maxlen=history)
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of the successful calls, None without enough history"""
+        if len(self.latencies) < 5:
+            return None
+        latencies = sorted(self.latencies)
+        index = min(int(len(latencies) * percentile / 100), len(latencies) - 1)
+        return latencies[index]
+
+
+class SourceChain:
+    """
+    Tries data sources in order within per-source and overall deadlines
+
+    Every source runs in a worker thread, so a hung request only costs its own
+    deadline before the next source is tried. The deadline of a source starts when
+    its call starts running, time spent waiting for a free worker only counts against
+    the overall deadline. With hedging enabled, the next source is started as soon as
+    the running one is slower than its usual latency (hedge_percentile of its
+    history); the first usable result wins. Hedged calls run in a pool of their own,
+    so they are not queued behind the calls they are meant to overtake.
+
+    Calls that are given up keep running in the background until the HTTP timeout of
+    the source ends them, their results are discarded.
+    """
+
+    # Seconds between checks whether a queued call has started
+    QUEUE_POLL_INTERVAL = 0.05
+
+    def __init__(self, sources: List[DataSource], overall_deadline: float = 20.0, hedge: bool = False,
+                 hedge_percentile: float = 95.0, max_workers: int = 8, hedge_workers: int = 4):
+        """
+        Initializes the chain
+
+        Args:
+            sources: Sources in order of preference
+            overall_deadline: Seconds after which the whole chain is given up
+            hedge: Start the next source early if the running one is slow
+            hedge_percentile: Latency percentile that triggers the hedged request
+            max_workers: Worker threads for the source calls
+            hedge_workers: Worker threads for hedged calls
+        """
+        self.sources = sources
+        self.overall_deadline = overall_deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='source-chain')
+        self.hedge_executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix='source-chain-hedge')
+        self.logger = logging.getLogger('SourceChain')
+        self._lock = threading.Lock()
+
+    def _timed_fetch(self, source: DataSource, started: List[float], args: Tuple, kwargs: Dict) -> Tuple[Any, float]:
+        """Runs the fetch of a source, records its start time in `started`"""
+        started.append(time.monotonic())
+        result = source.fetch(*args, **kwargs)
+        return result, time.monotonic() - started[0]
+
+    def _hedge_delay(self, source: DataSource) -> Optional[float]:
+        """Seconds after which the next source is started alongside `source`"""
+        if not self.hedge:
+            return None
+        with self._lock:
+            return source.latency_percentile(self.hedge_percentile)
+
+    def run(self, args: Tuple = (), kwargs: Optional[Dict] = None, deadline_scale: float = 1.0) -> Tuple[Any, str]:
+        """
+        Fetches a result from the first source that delivers one
+
+        Args:
+            args: Positional arguments for the fetch function of every source
+            kwargs: Keyword arguments for the fetch function of every source
+            deadline_scale: Factor for all deadlines (e.g. for multi-page downloads)
+
+        Returns:
+            Tuple of the result and the name of the source that served it
+
+        Raises:
+            SourceChainError: If all sources failed, returned None or ran out of time
+        """
+        kwargs = kwargs or {}
+        chain_start = time.monotonic()
+        chain_deadline = chain_start + self.overall_deadline * deadline_scale
+        pending = {}  # future -> (source, [start time once running], submit time, hedge delay)
+        next_index = 0
+        errors = []
+
+        def deadline_of(info):
+            source, started = info[:2]
+            if not started:
+                return chain_deadline
+            return min(started[0] + source.deadline * deadline_scale, chain_deadline)
+
+        def slow_since(info):
+            # Queued calls are as slow as running ones from the caller's point of view
+            return info[1][0] if info[1] else info[2]
+
+        while True:
+            now = time.monotonic()
+
+            # Start the next source if nothing is running or the running sources are slow
+            if next_index < len(self.sources) and now < chain_deadline:
+                start_next = not pending
+                if not start_next and self.hedge:
+                    start_next = all(info[3] is not None and now - slow_since(info) >= info[3]
+                                     for info in pending.values())
+                if start_next:
+                    source = self.sources[next_index]
+                    next_index += 1
+                    started = []
+                    executor = self.hedge_executor if pending else self.executor
+                    future = executor.submit(self._timed_fetch, source, started, args, kwargs)
+                    pending[future] = (source, started, now, self._hedge_delay(source))
+                    if len(pending) > 1:
+                        self.logger.info(f"Hedging with {source.name}")
+                    continue
+
+            if not pending:
+                break
+
+            # Wake up at the earliest deadline or hedge time, queued calls are polled until they start
+            wake_times = [deadline_of(info) for info in pending.values()]
+            if self.hedge and next_index < len(self.sources):
+                wake_times += [slow_since(info) + info[3] for info in pending.values() if info[3] is not None]
+            if not all(info[1] for info in pending.values()):
+                wake_times.append(now + self.QUEUE_POLL_INTERVAL)
+            timeout = max(min(wake_times) - now, 0.0)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)[0]
+                try:
+                    result, latency = future.result()
+                except Exception as e:
+                    with self._lock:
+                        source.failures += 1
+                    errors.append(f"{source.name}: {str(e)}")
+                    self.logger.warning(f"Source {source.name} failed: {str(e)}")
+                    continue
+
+                if result is None or getattr(result, 'empty', False):
+                    with self._lock:
+                        source.failures += 1
+                    errors.append(f"{source.name}: no data")
+                    continue
+
+                with self._lock:
+                    source.successes += 1
+                    source.latencies.append(latency)
+                self.logger.info(f"Served by {source.name} in {latency:.2f}s "
+                                 f"(chain {time.monotonic() - chain_start:.2f}s)")
+                return result, source.name
+
+            # Give up sources that passed their deadline
+            now = time.monotonic()
+            for future, info in list(pending.items()):
+                if now >= deadline_of(info):
+                    source = pending.pop(future)[0]
+                    future.cancel()
+                    with self._lock:
+                        source.timeouts += 1
+                    errors.append(f"{source.name}: deadline exceeded")
+                    self.logger.warning(f"Source {source.name} exceeded its deadline")
+
+        raise SourceChainError("; ".join(errors) or "no sources configured")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns calls and latency percentiles per source"""
+        with self._lock:
+            return {
+                source.name: {
+                    'successes': source.successes,
+                    'failures': source.failures,
+                    'timeouts': source.timeouts,
+                    'p50_latency': source.latency_percentile(50),
+                    'p95_latency': source.latency_percentile(95)
+                }
+                for source in self.sources
+            }
+
+    def shutdown(self) -> None:
+        """Stops the worker threads without waiting for running calls"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.hedge_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+# test_backtester.py
+import numpy as np
+import pandas as pd
+
+from backtester import Backtester, first_exit
+from model import PredictionModel
+from simulator import MarketSimulator
+
+
+def test_first_exit_finds_the_first_touch_across_chunks():
+    prices = np.full(1000, 100.0)
+    prices[700] = 103.0
+    prices[800] = 97.0
+
+    assert first_exit(prices, 0, 98.0, 103.0, chunk=4) == 700
+    assert first_exit(prices, 701, 98.0, 103.0, chunk=4) == 800
+    assert first_exit(prices, 801, 98.0, 103.0, chunk=4) == -1
+    assert first_exit(prices, 1000, 98.0, 103.0) == -1
+
+
+def _series():
+    closes = np.full(30, 95.0)
+    closes[:10] = [100.0, 100.0, 101.0, 103.5, 103.0, 100.0, 97.5, 98.0, 99.0, 95.0]
+    return pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=len(closes), freq='h'),
+                         'close': closes})
+
+
+def _predictions(df, signals):
+    """Predictions with full confidence, signals maps row -> predicted change in percent"""
+    rows = np.arange(len(df))
+    change = np.array([signals.get(row, 0.0) for row in rows])
+    current = df['close'].to_numpy()
+    return pd.DataFrame({'prediction': current * (1 + change / 100), 'current': current,
+                         'change_pct': change, 'confidence': np.ones(len(df))}, index=rows)
+
+
+def test_simulate_trades_do_not_overlap_and_close_for_the_right_reason():
+    df = _series()
+    # Row 1 and 4 signal while a trade is open; row 10 exceeds the daily limit; row 25 is the next day
+    predictions = _predictions(df, {0: 2.0, 1: 2.0, 3: -2.0, 4: 2.0, 6: 2.0, 10: 2.0, 25: -2.0})
+    backtester = Backtester(trader_config={'max_trades_per_day': 3, 'stop_loss_pct': 2.0, 'take_profit_pct': 3.0,
+                                           'confidence_threshold': 0.7, 'min_change_pct': 1.0})
+
+    trades = backtester.simulate(df, predictions)['trades']
+
+    assert trades[['entry_index', 'exit_index', 'action', 'close_reason']].values.tolist() == [
+        [0, 3, 'buy', 'take_profit'],  # 103.5 >= 103
+        [3, 5, 'sell', 'take_profit'],  # the exit candle opens the next trade, 100 <= 100.395
+        [6, 9, 'buy', 'stop_loss'],  # 95 <= 95.55
+        [25, 29, 'sell', 'end']
+    ]
+    assert (trades['entry_index'].to_numpy()[1:] >= trades['exit_index'].to_numpy()[:-1]).all()
+    assert np.allclose(trades['profit_loss'], [3.5, (103.5 - 100.0) / 103.5 * 100, (95.0 - 97.5) / 97.5 * 100, 0.0])
+
+
+def test_simulate_ignores_weak_signals():
+    df = _series()
+    predictions = _predictions(df, {0: 0.5, 3: -0.9})
+    predictions.loc[6, ['change_pct', 'confidence']] = [2.0, 0.5]
+
+    result = Backtester().simulate(df, predictions)
+
+    assert result['trades'].empty
+    assert (result['equity'] == 10000.0).all()
+
+
+def _model_config(model_type='linear'):
+    config = PredictionModel().config
+    config['model_type'] = model_type
+    return config
+
+
+def _candles(n):
+    return MarketSimulator(seed=7, model='regime').generate('BTC-USDT', n, '1h')['BTC-USDT']
+
+
+def test_walk_forward_predicts_every_row_after_the_first_training_window():
+    backtester = Backtester(model_config=_model_config(), train_window=300, test_window=100, mode='refit')
+    df = backtester._feature_frame(_candles(900))
+
+    predictions = backtester.predict(df)
+
+    assert predictions.index.tolist() == list(range(300, len(df)))
+    assert predictions[['prediction', 'confidence']].notna().all().all()
+
+
+def test_refit_predictions_only_see_the_preceding_candles():
+    backtester = Backtester(model_config=_model_config(), train_window=300, test_window=100, mode='refit')
+    df = backtester._feature_frame(_candles(900))
+    predictions = backtester.predict(df)
+
+    # The first window comes from a model fitted on the 300 candles before it
+    model = PredictionModel(config=_model_config())
+    model.install(model.fit(df.iloc[:300]), save=False)
+    expected = model.predict_frame(df.iloc[300 - 23:400])
+    np.testing.assert_allclose(predictions.loc[300:399, 'prediction'], expected.loc[300:, 'prediction'])
+
+    # Changing later candles leaves the earlier windows alone
+    changed = df.copy()
+    changed.loc[500:, 'close'] *= 2
+    np.testing.assert_allclose(backtester.predict(changed).loc[300:499, 'prediction'],
+                               predictions.loc[300:499, 'prediction'])
+
+
+def test_update_mode_fits_once_and_updates_between_windows(monkeypatch):
+    calls = []
+    fit, update = PredictionModel.fit, PredictionModel.update
+    monkeypatch.setattr(PredictionModel, 'fit', lambda self, df: calls.append('fit') or fit(self, df))
+    monkeypatch.setattr(PredictionModel, 'update',
+                        lambda self, df, **kwargs: calls.append('update') or update(self, df, **kwargs))
+    backtester = Backtester(model_config=_model_config('sgd'), train_window=300, test_window=100)
+    df = backtester._feature_frame(_candles(900))
+
+    predictions = backtester.predict(df)
+
+    folds = -(-(len(df) - 300) // 100)
+    assert calls == ['fit'] + ['update'] * (folds - 1)
+    assert predictions.index.tolist() == list(range(300, len(df)))
+
+
+def test_max_trees_caps_the_ensemble_and_its_updates():
+    backtester = Backtester(max_trees=20)
+
+    assert backtester.model_config['model_params']['random_forest']['n_estimators'] == 20
+    assert backtester.model_config['incremental']['trees_per_update'] == 2
+    assert backtester.model_config['incremental']['max_estimators'] == 60
+
+
+def test_a_year_of_hourly_candles_runs_in_seconds():
+    result = Backtester(model_config=_model_config('sgd')).run(_candles(365 * 24))
+
+    assert result['stats']['candles'] == len(result['equity'])
+    assert result['stats']['duration_s'] < 10
@@ -0,0 +1,40 @@
+# test_cache.py
+import threading
+
+from cache import TTLCache
+
+
+def test_get_or_load_coalesces_concurrent_loads():
+    cache = TTLCache(ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+    assert cache.get('key') == 'value'
+
+
+def test_values_rejected_by_cacheable_are_not_stored():
+    cache = TTLCache(ttl=60)
+    assert cache.get_or_load('key', lambda: 'synthetic', cacheable=lambda value: value != 'synthetic') == 'synthetic'
+    assert 'key' not in cache
+
+    assert cache.get_or_load('key', lambda: 'real', cacheable=lambda value: value != 'synthetic') == 'real'
+    assert cache.get('key') == 'real'
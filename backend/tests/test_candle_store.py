@@ -0,0 +1,68 @@
+# test_candle_store.py
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore
+
+HOUR_MS = 3_600_000
+
+
+def _candles(start, n, close=1.0):
+    timestamps = (start + np.arange(n)) * HOUR_MS
+    return pd.DataFrame({'timestamp': timestamps, 'open': close, 'high': close, 'low': close, 'close': close,
+                         'volume': 1.0, 'close_time': timestamps + HOUR_MS - 1})
+
+
+def test_append_merges_and_keeps_one_generation(tmp_path):
+    store = CandleStore(str(tmp_path), max_candles=8)
+    store.append('BTCUSDT', '1h', _candles(0, 5, close=1.0))
+    store.append('BTCUSDT', '1h', _candles(3, 5, close=2.0))
+
+    df = store.read('BTCUSDT', '1h')
+    assert df['close'].tolist() == [1.0] * 3 + [2.0] * 5
+    assert store.read('BTCUSDT', '1h', limit=2)['close'].tolist() == [2.0, 2.0]
+    assert store.last_close_time('BTCUSDT', '1h') == 8 * HOUR_MS - 1
+
+    key_dir = store._key_dir('BTCUSDT', '1h')
+    with open(os.path.join(key_dir, 'meta.json')) as f:
+        manifest = json.load(f)
+    assert manifest['rows'] == 8 and manifest['generation'] == 2
+    assert sorted(f for f in os.listdir(key_dir) if f.endswith('.npy')) == sorted(manifest['columns'].values())
+
+
+def test_unfinished_write_is_not_visible(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('BTCUSDT', '1h', _candles(0, 5, close=1.0))
+
+    # A writer died after writing some columns of the next generation, before the manifest
+    key_dir = store._key_dir('BTCUSDT', '1h')
+    np.save(os.path.join(key_dir, 'close.2.npy'), np.full(6, 9.0))
+
+    assert store.read('BTCUSDT', '1h')['close'].tolist() == [1.0] * 5
+    store.append('BTCUSDT', '1h', _candles(5, 1, close=3.0))
+    assert store.read('BTCUSDT', '1h')['close'].tolist() == [1.0] * 5 + [3.0]
+
+
+def test_columns_that_do_not_match_the_manifest_are_ignored(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('BTCUSDT', '1h', _candles(0, 5))
+    key_dir = store._key_dir('BTCUSDT', '1h')
+    np.save(os.path.join(key_dir, 'volume.1.npy'), np.ones(4))
+
+    assert store.read('BTCUSDT', '1h') is None
+
+
+def test_store_without_manifest_is_refetched(tmp_path):
+    store = CandleStore(str(tmp_path))
+    key_dir = store._key_dir('BTCUSDT', '1h')
+    os.makedirs(key_dir)
+    for col, values in _candles(0, 5).items():
+        np.save(os.path.join(key_dir, f"{col}.npy"), np.asarray(values))
+
+    assert store.read('BTCUSDT', '1h') is None
+    store.append('BTCUSDT', '1h', _candles(0, 3))
+    assert len(store.read('BTCUSDT', '1h')) == 3
+    assert not os.path.exists(os.path.join(key_dir, 'close.npy'))
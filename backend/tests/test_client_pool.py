@@ -0,0 +1,81 @@
+# test_client_pool.py
+import sys
+import types
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from client_pool import BinanceClientPool
+
+
+class FakeClient:
+    """Stands in for binance.client.Client: records its arguments, has a real session, no network"""
+
+    def __init__(self, api_key, api_secret, requests_params=None, ping=True):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.requests_params = requests_params
+        self.ping = ping
+        self.session = requests.Session()
+        self.closed = False
+
+    def close_connection(self):
+        self.closed = True
+        self.session.close()
+
+
+@pytest.fixture(autouse=True)
+def fake_binance(monkeypatch):
+    binance = types.ModuleType('binance')
+    binance.client = types.ModuleType('binance.client')
+    binance.client.Client = FakeClient
+    monkeypatch.setitem(sys.modules, 'binance', binance)
+    monkeypatch.setitem(sys.modules, 'binance.client', binance.client)
+
+
+def test_same_credentials_share_one_client():
+    pool = BinanceClientPool()
+
+    client = pool.get('key', 'secret')
+
+    assert pool.get('key', 'secret') is client
+    assert pool.get('key', 'other secret') is not client
+    assert pool.get('other key', 'secret') is not client
+    assert pool.stats() == {'clients': 3, 'max_clients': 4}
+
+
+def test_least_recently_used_client_is_evicted_and_closed():
+    pool = BinanceClientPool(max_clients=2)
+    first, second = pool.get('first'), pool.get('second')
+    assert pool.get('first') is first  # second is now the least recently used
+
+    third = pool.get('third')
+
+    assert second.closed and not first.closed and not third.closed
+    assert pool.stats()['clients'] == 2
+    assert pool.get('first') is first
+    assert pool.get('second') is not second
+
+
+def test_clients_get_the_timeout_and_connection_pool_size():
+    pool = BinanceClientPool(pool_maxsize=25, timeout=3.5)
+
+    client = pool.get('key', 'secret')
+
+    assert client.requests_params == {'timeout': 3.5}
+    assert client.ping is False
+    adapter = client.session.get_adapter('https://api.binance.com/api/v3/klines')
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == 25
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 25
+
+
+def test_close_all_closes_every_client():
+    pool = BinanceClientPool()
+    clients = [pool.get(f"key{i}") for i in range(3)]
+
+    pool.close_all()
+
+    assert all(client.closed for client in clients)
+    assert pool.stats()['clients'] == 0
@@ -0,0 +1,326 @@
+# test_data_collector.py
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_collector
+from data_collector import DataCollector
+
+
+@pytest.fixture
+def collector(tmp_path):
+    return DataCollector(api_keys={'news_api': 'key'}, data_dir=str(tmp_path))
+
+
+def test_news_ticker_maps_trading_symbols_to_crypto_tickers(collector):
+    assert collector._news_ticker('BTC-USDT') == 'CRYPTO:BTC'
+    assert collector._news_ticker('ethusdt') == 'CRYPTO:ETH'
+    assert collector._news_ticker('AAPL') == 'AAPL'
+
+
+def test_news_sentiment_uses_the_ticker_score_per_ticker(collector, monkeypatch):
+    feeds = {
+        'CRYPTO:BTC': [
+            {'overall_sentiment_score': -0.5, 'ticker_sentiment': [
+                {'ticker': 'CRYPTO:BTC', 'ticker_sentiment_score': '0.4'},
+                {'ticker': 'CRYPTO:ETH', 'ticker_sentiment_score': '-0.6'}]},
+            {'overall_sentiment_score': 0.0, 'ticker_sentiment': [
+                {'ticker': 'CRYPTO:BTC', 'ticker_sentiment_score': '0.2'}]}
+        ],
+        'CRYPTO:ETH': []
+    }
+    requested = []
+
+    class Response:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def json(self):
+            return {'feed': feeds[self.ticker]}
+
+    def get(url, params, timeout):
+        requested.append(params['tickers'])
+        return Response(params['tickers'])
+
+    monkeypatch.setattr(data_collector.requests, 'get', get)
+    scores = collector.get_news_sentiment_many(['BTC-USDT', 'ETH-USDT', 'BTCUSDT'])
+
+    assert scores['BTC-USDT'] == pytest.approx(0.3)
+    assert scores['BTCUSDT'] == pytest.approx(0.3)
+    assert scores['ETH-USDT'] == 0
+    assert sorted(requested) == ['CRYPTO:BTC', 'CRYPTO:ETH']
+
+
+def _streaming_collector(collector, closes, open_times=None):
+    stream = data_collector.KlineStream([('BTCUSDT', '1h')], buffer_size=10)
+    buffer = stream.get_buffer('BTCUSDT', '1h')
+    for i, close in enumerate(closes):
+        open_time = open_times[i] if open_times else i * 3_600_000
+        buffer.update(open_time, close, close, close, close, 1.0, open_time + 3_599_999)
+    stream.running = True
+    stream.connected.set()
+    collector.kline_stream = stream
+    return stream, buffer
+
+
+def test_streamed_market_data_requires_a_live_gapless_buffer(collector):
+    stream, buffer = _streaming_collector(collector, [1.0, 2.0, 3.0])
+    assert collector._get_streamed_market_data('BTC-USDT', '1h', 3)['close'].tolist() == [1.0, 2.0, 3.0]
+    assert collector._get_streamed_market_data('BTC-USDT', '1h', 4) is None
+
+    stream.connected.clear()  # reconnecting
+    assert collector._get_streamed_market_data('BTC-USDT', '1h', 3) is None
+
+    stream.connected.set()
+    buffer.updated_at -= collector.stream_max_age + 1
+    assert collector._get_streamed_market_data('BTC-USDT', '1h', 3) is None
+
+    _streaming_collector(collector, [1.0, 2.0, 3.0], open_times=[0, 3_600_000, 3 * 3_600_000])
+    assert collector._get_streamed_market_data('BTC-USDT', '1h', 3) is None
+
+
+def test_resampling_is_skipped_when_it_needs_too_many_base_candles(tmp_path, monkeypatch):
+    collector = DataCollector(data_dir=str(tmp_path), base_timeframe='15m', max_base_candles=1000)
+    requested = []
+
+    def get_market_data(symbol, timeframe='1h', limit=100):
+        requested.append((timeframe, limit))
+        return None
+
+    monkeypatch.setattr(collector, 'get_market_data', get_market_data)
+    assert collector._get_resampled_market_data('BTC-USDT', '1d', 168) is None  # 169 * 96 base candles
+    assert requested == []
+
+    collector._get_resampled_market_data('BTC-USDT', '4h', 48)
+    assert requested == [('15m', 49 * 16)]
+
+
+def test_store_top_up_starts_at_the_window_when_the_store_is_stale(collector, monkeypatch):
+    interval = 3_600_000
+    now_ms = int(data_collector.time.time() * 1000)
+    window_start = now_ms - now_ms % interval - 10 * interval
+    stale = pd.DataFrame({'timestamp': np.arange(-30, -10) * interval + window_start})
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        stale[column] = 1.0
+    stale['close_time'] = stale['timestamp'] + interval - 1
+    collector.candle_store.append('BTCUSDT', '1h', stale)
+
+    calls = []
+
+    def binance_call(client, method, endpoint, priority, **params):
+        calls.append(params)
+        return [[t, '2', '2', '2', '2', '1', t + interval - 1, '0', 0, '0', '0', '0']
+                for t in range(params['startTime'], now_ms, interval)]
+
+    monkeypatch.setattr(collector, '_binance_call', binance_call)
+    monkeypatch.setattr(collector, '_store_candles', lambda *args: None)
+    df = collector._get_stored_market_data(SimpleNamespace(get_klines=None), 'BTCUSDT', '1h', '1h', 10)
+
+    assert calls[0]['startTime'] == window_start
+    assert len(df) == 10 and (df['close'] == 2.0).all()  # no stale candles before the gap
+
+
+def _store_old_and_recent_block(collector, store_symbol, interval, recent):
+    """Stores 1000 candles from six weeks ago plus the `recent` candles before the current one"""
+    now_ms = int(data_collector.time.time() * 1000)
+    current_open = now_ms - now_ms % interval
+    open_times = np.concatenate([current_open + np.arange(-2000, -1000) * interval,
+                                 current_open + np.arange(-recent, 0) * interval])
+    stored = pd.DataFrame({'timestamp': open_times})
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        stored[column] = 1.0
+    stored['close_time'] = stored['timestamp'] + interval - 1
+    collector.candle_store.append(store_symbol, '1h', stored)
+    return now_ms, current_open
+
+
+def _assert_gapless_window(df, interval, window_start, limit):
+    open_times = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+    assert len(df) == limit
+    assert open_times[0] >= window_start
+    assert (np.diff(open_times) == interval).all()
+
+
+def test_stored_market_data_is_not_served_across_a_gap(collector, monkeypatch):
+    interval = 3_600_000
+    now_ms, current_open = _store_old_and_recent_block(collector, 'BTCUSDT', interval, recent=11)
+
+    def binance_call(client, method, endpoint, priority, **params):
+        return [[t, '2', '2', '2', '2', '1', t + interval - 1, '0', 0, '0', '0', '0']
+                for t in range(params['startTime'], now_ms, interval)]
+
+    monkeypatch.setattr(collector, '_binance_call', binance_call)
+    monkeypatch.setattr(collector, '_store_candles', lambda *args: None)
+
+    # 88 old candles + 11 recent + the current one would fill the window of 100
+    assert collector._get_stored_market_data(SimpleNamespace(get_klines=None), 'BTCUSDT', '1h', '1h', 100) is None
+
+    # A window covered by the recent block alone is still served from the store
+    df = collector._get_stored_market_data(SimpleNamespace(get_klines=None), 'BTCUSDT', '1h', '1h', 10)
+    _assert_gapless_window(df, interval, current_open - 10 * interval, 10)
+
+
+def test_yahoo_market_data_downloads_the_window_when_the_store_has_a_gap(collector, monkeypatch):
+    interval = 3_600_000
+    now_ms, current_open = _store_old_and_recent_block(collector, 'yahoo_BTC-USD', interval, recent=11)
+    window_start = current_open - 100 * interval
+    starts = []
+
+    class Ticker:
+        def __init__(self, symbol):
+            assert symbol == 'BTC-USD'
+
+        def history(self, start, end, interval, timeout):
+            starts.append(pd.Timestamp(start))
+            index = pd.date_range(pd.Timestamp(start).ceil('h'), pd.Timestamp(end), freq='h')
+            return pd.DataFrame({'Open': 2.0, 'High': 2.0, 'Low': 2.0, 'Close': 2.0, 'Volume': 1.0}, index=index)
+
+    monkeypatch.setitem(sys.modules, 'yfinance', SimpleNamespace(Ticker=Ticker))
+    monkeypatch.setattr(collector, '_store_candles', lambda *args: None)
+    df = collector._fetch_yahoo_market_data('BTC-USDT', '1h', 100)
+
+    # The top-up after the recent block is followed by a download of the whole window
+    assert len(starts) == 2 and starts[1] == pd.Timestamp(window_start, unit='ms', tz='UTC')
+    _assert_gapless_window(df, interval, window_start, 100)
+    assert (df['close'] == 2.0).all()
+
+
+def _backfill_collector(collector, monkeypatch, missing=(), missing_on_refetch=()):
+    """Stubs the klines endpoint, `missing` open times are left out of the first answer"""
+    interval = 3_600_000
+    calls = []
+
+    def binance_call(client, method, endpoint, priority, **params):
+        calls.append((params['startTime'], params['endTime']))
+        skipped = missing_on_refetch if len(calls) > 3 else missing
+        return [[t, '2', '2', '2', '2', '1', t + interval - 1, '0', 0, '0', '0', '0']
+                for t in range(params['startTime'], params['endTime'], interval) if t not in skipped]
+
+    monkeypatch.setattr(collector, '_binance_call', binance_call)
+    monkeypatch.setattr(collector, 'backfill_workers', 1)
+    return interval, calls
+
+
+def test_backfill_requests_page_sized_chunks_of_the_window(collector, monkeypatch):
+    interval, calls = _backfill_collector(collector, monkeypatch)
+
+    df = collector._backfill_klines(SimpleNamespace(get_klines=None), 'BTCUSDT', '1h', '1h', 2500)
+
+    assert len(calls) == 3
+    assert all((end + 1 - start) // interval <= 1000 for start, end in calls)
+    assert all(calls[i][1] + 1 == calls[i + 1][0] for i in range(2))
+    now_ms = int(data_collector.time.time() * 1000)
+    assert calls[-1][1] == now_ms - now_ms % interval + interval - 1
+    _assert_gapless_window(df, interval, calls[0][0], 2500)
+
+
+def test_backfill_refetches_missing_candles(collector, monkeypatch):
+    now_ms = int(data_collector.time.time() * 1000)
+    start = now_ms - now_ms % 3_600_000 - 2499 * 3_600_000
+    missing = {start + 1200 * 3_600_000, start + 1201 * 3_600_000}
+    interval, calls = _backfill_collector(collector, monkeypatch, missing=missing)
+
+    df = collector._backfill_klines(SimpleNamespace(get_klines=None), 'BTCUSDT', '1h', '1h', 2500)
+
+    assert calls[3:] == [(min(missing), max(missing) + interval - 1)]
+    _assert_gapless_window(df, interval, start, 2500)
+
+
+def test_backfill_fails_when_candles_stay_missing(collector, monkeypatch):
+    now_ms = int(data_collector.time.time() * 1000)
+    gap = now_ms - now_ms % 3_600_000 - 100 * 3_600_000
+    _backfill_collector(collector, monkeypatch, missing={gap}, missing_on_refetch={gap})
+
+    with pytest.raises(ValueError, match='gaps'):
+        collector._backfill_klines(SimpleNamespace(get_klines=None), 'BTCUSDT', '1h', '1h', 2500)
+
+
+def _frame_for(symbol, close, source='binance'):
+    df = pd.DataFrame({'timestamp': [pd.Timestamp('2024-01-01')], 'close': [close]})
+    df.attrs['source'] = source
+    return df
+
+
+def test_market_data_many_isolates_failing_symbols(collector, monkeypatch):
+    closes = {'BTC-USDT': 50000.0, 'ETH-USDT': 3000.0}
+
+    def get_market_data(symbol, timeframe='1h', limit=100):
+        if symbol == 'BAD-USDT':
+            raise ConnectionError('exchange down')
+        return _frame_for(symbol, closes[symbol] + (timeframe == '4h'))
+
+    monkeypatch.setattr(collector, 'get_market_data', get_market_data)
+    symbols = ['BTC-USDT', 'BAD-USDT', 'ETH-USDT']
+
+    frames = collector.get_market_data_many(symbols)
+    assert list(frames) == symbols
+    assert frames['BAD-USDT'].empty
+    assert frames['BTC-USDT']['close'].iloc[-1] == 50000.0 and frames['ETH-USDT']['close'].iloc[-1] == 3000.0
+
+    stacked = collector.get_market_data_many(symbols, timeframes=['1h', '4h'], stacked=True)
+    assert list(zip(stacked['symbol'], stacked['timeframe'], stacked['close'])) == [
+        ('BTC-USDT', '1h', 50000.0), ('BTC-USDT', '4h', 50001.0),
+        ('ETH-USDT', '1h', 3000.0), ('ETH-USDT', '4h', 3001.0)]
+
+
+def test_news_sentiment_many_isolates_failing_tickers(collector, monkeypatch):
+    def fetch(ticker):
+        if ticker == 'CRYPTO:BAD':
+            raise ConnectionError('news api down')
+        return {'CRYPTO:BTC': 0.4, 'CRYPTO:ETH': -0.2}[ticker]
+
+    monkeypatch.setattr(collector, '_fetch_news_sentiment', fetch)
+    monkeypatch.setattr(collector, '_dummy_sentiment', lambda symbol: 0.05)
+
+    scores = collector.get_news_sentiment_many(['BTC-USDT', 'BAD-USDT', 'ETH-USDT'])
+
+    assert scores == {'BTC-USDT': 0.4, 'BAD-USDT': 0.05, 'ETH-USDT': -0.2}
+
+
+def _ticker_collector(tmp_path, monkeypatch, tickers):
+    """Collector whose pooled Binance client answers the bulk ticker request with `tickers`"""
+    collector = DataCollector(api_keys={'binance': {'api_key': 'k', 'api_secret': 's'}, 'news_api': 'key'},
+                              data_dir=str(tmp_path))
+    requests_sent = []
+
+    def get_symbol_ticker(**params):
+        requests_sent.append(params)
+        return tickers
+
+    client = SimpleNamespace(get_symbol_ticker=get_symbol_ticker)
+    monkeypatch.setattr(collector, 'client_pool', SimpleNamespace(get=lambda key, secret: client))
+    return collector, requests_sent
+
+
+def test_one_ticker_request_serves_many_symbols(tmp_path, monkeypatch):
+    collector, requests_sent = _ticker_collector(tmp_path, monkeypatch, [
+        {'symbol': 'BTCUSDT', 'price': '50000.5'}, {'symbol': 'ETHUSDT', 'price': '3000'},
+        {'symbol': 'SOLUSDT', 'price': '150'}])
+    monkeypatch.setattr(collector, 'get_market_data', lambda *args, **kwargs: pytest.fail('fallback used'))
+
+    assert collector.get_prices(['BTC-USDT', 'ETH-USDT']) == {'BTC-USDT': 50000.5, 'ETH-USDT': 3000.0}
+    # All prices of the answer are cached, also for symbols that were not asked for
+    assert collector.get_prices(['SOLUSDT', 'BTC-USDT']) == {'SOLUSDT': 150.0, 'BTC-USDT': 50000.5}
+    assert requests_sent == [{}]
+
+    # Prices older than price_max_age are requested again
+    collector._prices = {symbol: (fetched_at - collector.price_max_age - 1, price)
+                         for symbol, (fetched_at, price) in collector._prices.items()}
+    assert collector.get_prices(['ETH-USDT']) == {'ETH-USDT': 3000.0}
+    assert len(requests_sent) == 2
+
+
+def test_missing_prices_fall_back_to_real_market_data_only(tmp_path, monkeypatch):
+    collector, requests_sent = _ticker_collector(tmp_path, monkeypatch, [{'symbol': 'BTCUSDT', 'price': '50000'}])
+    sources = {'ETH-USDT': 'yahoo', 'NEW-USDT': 'synthetic'}
+    monkeypatch.setattr(collector, 'get_market_data',
+                        lambda symbol, limit=100: _frame_for(symbol, 3000.0, source=sources[symbol]))
+
+    prices = collector.get_prices(['BTC-USDT', 'ETH-USDT', 'NEW-USDT'])
+
+    # NEW-USDT only has simulated candles, it gets no price rather than a made-up one
+    assert prices == {'BTC-USDT': 50000.0, 'ETH-USDT': 3000.0}
+    assert len(requests_sent) == 1
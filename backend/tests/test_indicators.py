@@ -0,0 +1,97 @@
+# test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FeaturePipeline
+from indicators import INDICATOR_COLUMNS, IndicatorEngine, IndicatorState, RunningWindowStd
+
+HOUR_MS = 3_600_000
+
+
+def _candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 60000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    close[100] = np.nan  # a missing close inside the served windows
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(np.arange(n) * HOUR_MS, unit='ms'),
+        'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+        'volume': rng.uniform(100, 1000, n)
+    })
+
+
+def test_running_std_matches_pandas_with_nan():
+    values = np.random.default_rng(1).normal(100, 5, 200)
+    values[[30, 31, 120]] = np.nan
+    running = RunningWindowStd(24)
+    result = [running.update(value) for value in values]
+
+    expected = pd.Series(values).rolling(window=24).std().to_numpy()
+    np.testing.assert_allclose(result, expected, rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('history', [500, 170])  # 170 compacts the row buffer every few windows
+def test_incremental_features_match_the_pandas_path_on_sliding_windows(history):
+    candles = _candles(400)
+    pipeline = FeaturePipeline(indicator_engine=IndicatorEngine(history=history))
+    columns = [definition.name for definition in pipeline.definitions]
+
+    # 168-row windows sliding by one candle, as served by prepare_features every hour
+    for end in range(168, len(candles) + 1, 7):
+        window = candles.iloc[end - 168:end].reset_index(drop=True)
+        incremental = pipeline.compute(window.copy(), symbol='BTC-USDT', timeframe='1h')
+        full = pipeline.compute(window.copy(), incremental=False)
+        np.testing.assert_allclose(incremental[columns].to_numpy(), full[columns].to_numpy(),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=f"window ending at {end}")
+
+
+def test_open_candle_is_reapplied():
+    candles = _candles(200)
+    pipeline = FeaturePipeline(indicator_engine=IndicatorEngine())
+    pipeline.compute(candles.copy(), symbol='BTC-USDT', timeframe='1h')
+
+    candles.loc[len(candles) - 1, 'close'] *= 1.02  # the open candle moved
+    incremental = pipeline.compute(candles.copy(), symbol='BTC-USDT', timeframe='1h')
+    full = pipeline.compute(candles.copy(), incremental=False)
+    assert incremental['rsi'].iloc[-1] == pytest.approx(full['rsi'].iloc[-1], rel=1e-9)
+    assert incremental['volatility'].iloc[-1] == pytest.approx(full['volatility'].iloc[-1], rel=1e-9)
+
+
+def test_frames_longer_than_the_history_use_the_pandas_path():
+    candles = _candles(2000)
+    pipeline = FeaturePipeline(indicator_engine=IndicatorEngine(history=500))
+    columns = [definition.name for definition in pipeline.definitions]
+
+    incremental = pipeline.compute(candles.copy(), symbol='BTC-USDT', timeframe='1h')
+    full = pipeline.compute(candles.copy(), incremental=False)
+    assert incremental['rsi'].isna().sum() == full['rsi'].isna().sum() == 13
+    np.testing.assert_allclose(incremental[columns].to_numpy(), full[columns].to_numpy(),
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_only_new_candles_update_the_state(monkeypatch):
+    candles = _candles(200)
+    engine = IndicatorEngine()
+    timestamps = pd.DatetimeIndex(candles['timestamp']).as_unit('ms').asi8
+    engine.apply('BTC-USDT', '1h', timestamps[:168], candles['close'].values[:168])
+
+    updates = []
+    original = IndicatorState.update
+    monkeypatch.setattr(IndicatorState, 'update', lambda state, close: updates.append(close) or original(state, close))
+    engine.apply('BTC-USDT', '1h', timestamps[2:170], candles['close'].values[2:170])
+
+    # The last processed candle may have been open, it is re-applied with the two new ones
+    assert len(updates) == 3
+
+
+def test_single_candle_updates_match_pandas_on_the_whole_series():
+    candles = _candles(300)
+    engine = IndicatorEngine()
+    timestamps = pd.DatetimeIndex(candles['timestamp']).as_unit('ms').asi8
+    values = [engine.update('BTC-USDT', '1h', int(timestamp), close)
+              for timestamp, close in zip(timestamps, candles['close'])]
+
+    full = FeaturePipeline().compute(candles.copy(), incremental=False)
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose([row[column] for row in values], full[column].to_numpy(),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
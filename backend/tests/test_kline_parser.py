@@ -0,0 +1,73 @@
+# test_kline_parser.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from kline_parser import KLINE_DTYPE, OHLCV_COLUMNS, klines_to_frame, parse_klines, parse_klines_structured
+
+KLINE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume',
+                 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore']
+
+
+def _klines(n=50):
+    """Rows shaped like the Binance klines payload: int times, price strings, int trade count"""
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(n):
+        open_time = 1_700_000_000_000 + i * 3_600_000
+        prices = 36000 + rng.normal(0, 150, 4)
+        rows.append([open_time, *(f"{price:.8f}" for price in prices), f"{rng.uniform(10, 900):.8f}",
+                     open_time + 3_599_999, f"{rng.uniform(1e5, 1e7):.8f}", int(rng.integers(100, 5000)),
+                     f"{rng.uniform(5, 400):.8f}", f"{rng.uniform(1e5, 1e6):.8f}", '0'])
+    return rows
+
+
+def _pandas_frame(klines):
+    """The former conversion in DataCollector.get_market_data"""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df[OHLCV_COLUMNS] = df[OHLCV_COLUMNS].astype(float)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df[['timestamp'] + OHLCV_COLUMNS + ['close_time']]
+
+
+def test_frame_matches_the_pandas_conversion():
+    klines = _klines()
+
+    pd.testing.assert_frame_equal(klines_to_frame(klines), _pandas_frame(klines))
+    assert klines_to_frame(klines)['close_time'].dtype == np.int64
+    assert (klines_to_frame(klines)[OHLCV_COLUMNS].dtypes == np.float64).all()
+
+
+def test_float32_frame_rounds_the_pandas_values():
+    klines = _klines()
+    df = klines_to_frame(klines, float_dtype=np.float32)
+
+    assert (df[OHLCV_COLUMNS].dtypes == np.float32).all()
+    np.testing.assert_array_equal(df[OHLCV_COLUMNS].to_numpy(),
+                                  _pandas_frame(klines)[OHLCV_COLUMNS].to_numpy().astype(np.float32))
+    pd.testing.assert_series_equal(df['timestamp'], _pandas_frame(klines)['timestamp'])
+
+
+def test_columns_and_structured_array_match_the_frame():
+    klines = _klines()
+    expected = _pandas_frame(klines)
+    columns = parse_klines(klines)
+    structured = parse_klines_structured(klines)
+
+    np.testing.assert_array_equal(columns['ohlcv'], expected[OHLCV_COLUMNS].to_numpy())
+    np.testing.assert_array_equal(columns['timestamp'], pd.DatetimeIndex(expected['timestamp']).as_unit('ms').asi8)
+    assert structured.dtype == KLINE_DTYPE
+    for column in OHLCV_COLUMNS + ['close_time']:
+        np.testing.assert_array_equal(structured[column], expected[column].to_numpy())
+    np.testing.assert_array_equal(structured['timestamp'], columns['timestamp'])
+
+
+@pytest.mark.parametrize('float_dtype', [np.float64, np.float32])
+def test_empty_payload_gives_an_empty_frame(float_dtype):
+    df = klines_to_frame([], float_dtype=float_dtype)
+
+    assert df.empty
+    assert df.columns.tolist() == ['timestamp'] + OHLCV_COLUMNS + ['close_time']
+    assert (df[OHLCV_COLUMNS].dtypes == float_dtype).all()
+    assert parse_klines([])['ohlcv'].shape == (0, 5)
+    assert len(parse_klines_structured([])) == 0
@@ -0,0 +1,114 @@
+# test_kline_stream.py
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from kline_stream import KlineRingBuffer, KlineStream
+
+HOUR_MS = 3_600_000
+
+
+def _kline_event(symbol, open_time, close, interval='1h'):
+    return json.dumps({'stream': f"{symbol.lower()}@kline_{interval}", 'data': {
+        'e': 'kline', 's': symbol,
+        'k': {'t': open_time, 'T': open_time + HOUR_MS - 1, 'i': interval,
+              'o': str(close - 1), 'h': str(close + 1), 'l': str(close - 2), 'c': str(close), 'v': '10'}
+    }})
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class _Server:
+    """Websocket server in its own thread, every connection gets the next batch of messages and is closed"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.connections = 0
+        self.paths = []
+        self.port = None
+        self._ready = threading.Event()
+        self._stop = None
+        self._loop = None
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _handler(self, ws):
+        self.connections += 1
+        self.paths.append(ws.request.path)
+        messages = self.batches.pop(0) if self.batches else []
+        for message in messages:
+            await ws.send(message)
+        if self.batches:
+            await ws.close()
+        else:
+            await self._stop.wait()  # last batch: keep the connection open
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        async with websockets.serve(self._handler, '127.0.0.1', 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+
+
+def test_ring_buffer_updates_in_place_and_wraps():
+    buffer = KlineRingBuffer(capacity=3)
+    for i, close in enumerate([10.0, 11.0, 12.0]):
+        buffer.update(i * HOUR_MS, close, close, close, close, 1.0, (i + 1) * HOUR_MS - 1)
+
+    buffer.update(2 * HOUR_MS, 12.0, 13.0, 12.0, 12.5, 2.0, 3 * HOUR_MS - 1)  # newest candle changes
+    buffer.update(HOUR_MS, 0.0, 0.0, 0.0, 0.0, 0.0, 2 * HOUR_MS - 1)  # out of order, ignored
+    buffer.update(3 * HOUR_MS, 13.0, 13.0, 13.0, 13.0, 1.0, 4 * HOUR_MS - 1)  # overwrites the oldest
+
+    df = buffer.to_frame()
+    assert len(buffer) == 3
+    assert df['timestamp'].astype('datetime64[ms]').astype('int64').tolist() == [HOUR_MS, 2 * HOUR_MS, 3 * HOUR_MS]
+    assert df['close'].tolist() == [11.0, 12.5, 13.0]
+    assert df['volume'].tolist() == [1.0, 2.0, 1.0]
+    assert df['close_time'].tolist() == [2 * HOUR_MS - 1, 3 * HOUR_MS - 1, 4 * HOUR_MS - 1]
+    assert buffer.to_frame(limit=2)['close'].tolist() == [12.5, 13.0]
+    assert buffer.last_price() == 13.0
+
+
+def test_stream_reconnects_and_keeps_buffering():
+    batches = [
+        [_kline_event('BTCUSDT', 0, 100.0), _kline_event('BTCUSDT', HOUR_MS, 101.0)],
+        [_kline_event('BTCUSDT', HOUR_MS, 102.0), _kline_event('BTCUSDT', 2 * HOUR_MS, 103.0),
+         _kline_event('ETHUSDT', 0, 5.0)]  # not subscribed
+    ]
+    with _Server(batches) as server:
+        stream = KlineStream([('BTCUSDT', '1h')], buffer_size=10, url=f"ws://127.0.0.1:{server.port}/stream")
+        stream.start()
+        try:
+            buffer = stream.get_buffer('BTCUSDT', '1h')
+            # The first connection is closed by the server, the stream reconnects after its backoff
+            assert _wait_for(lambda: server.connections == 2 and len(buffer) == 3)
+            assert _wait_for(stream.connected.is_set)
+
+            df = buffer.to_frame()
+            assert df['close'].tolist() == [100.0, 102.0, 103.0]
+            assert server.paths[0] == '/stream?streams=btcusdt@kline_1h'
+            assert stream.get_buffer('ETHUSDT', '1h') is None
+        finally:
+            stream.stop()
+
+    assert not stream.connected.is_set()
@@ -0,0 +1,119 @@
+# test_model.py
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from features import FeaturePipeline
+from model import PredictionModel, window_features
+from simulator import MarketSimulator
+from tree_compiler import compile_ensemble
+
+
+def _frame(seed=1, n=300):
+    candles = MarketSimulator(seed=seed).generate('BTC-USDT', n, '1h')['BTC-USDT']
+    return FeaturePipeline().compute(candles, sentiment=0.0, incremental=False).dropna().reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def fitted_model():
+    model = PredictionModel()
+    model.config['lookback_window'] = 4
+    model.config['model_params']['random_forest']['n_estimators'] = 8
+    model.install(model.fit(_frame()), save=False)
+    return model
+
+
+def _without_timestamp(result):
+    return {key: value for key, value in result.items() if key != 'timestamp'}
+
+
+def test_forest_confidences_match_the_per_tree_loop():
+    rng = np.random.default_rng(5)
+    X = rng.normal(size=(60, 3))
+    y = 100 + X[:, 0] + rng.normal(0, 0.1, 60)
+    model = PredictionModel()
+    model.model = RandomForestRegressor(n_estimators=6, max_depth=None, min_samples_leaf=3,
+                                        random_state=0).fit(X, y)
+    # Trees of different depths and sizes leave zero padding in the leaf value matrix
+    assert len({tree.tree_.max_depth for tree in model.model.estimators_}) > 1
+    assert len({tree.tree_.node_count for tree in model.model.estimators_}) > 1
+
+    X_test = rng.normal(size=(40, 3))
+    predictions = np.array([tree.predict(X_test) for tree in model.model.estimators_])
+    expected = 1.0 - predictions.std(axis=0) / predictions.mean(axis=0)
+    np.testing.assert_allclose(model._get_prediction_confidences(X_test), expected, rtol=1e-12)
+
+    # The compiled walk used for small batches gives the same values
+    model._compiled = (model.model, compile_ensemble(model.model))
+    np.testing.assert_allclose(model._predict_with_confidence(X_test)[1], expected, rtol=1e-12)
+
+
+def test_predict_many_equals_predict_per_symbol(fitted_model):
+    frames = {f"SYM{seed}-USDT": _frame(seed, 120) for seed in range(2, 6)}
+
+    batched = fitted_model.predict_many(frames)
+
+    assert list(batched) == list(frames)
+    for symbol, df in frames.items():
+        assert _without_timestamp(batched[symbol]) == pytest.approx(
+            _without_timestamp(fitted_model.predict(df.copy())), rel=1e-12)
+
+
+def test_predict_many_reports_missing_and_short_frames_per_symbol(fitted_model):
+    frames = {'BTC-USDT': _frame(2, 120), 'MISSING-USDT': None, 'SHORT-USDT': _frame(3, 120).iloc[:2],
+              'ETH-USDT': _frame(4, 120)}
+
+    results = fitted_model.predict_many(frames)
+
+    assert set(results) == set(frames)
+    assert 'error' in results['MISSING-USDT'] and 'error' in results['SHORT-USDT']
+    for symbol in ('BTC-USDT', 'ETH-USDT'):
+        assert _without_timestamp(results[symbol]) == pytest.approx(
+            _without_timestamp(fitted_model.predict(frames[symbol].copy())), rel=1e-12)
+
+
+def _window_loop(X, lookback):
+    """Reference: one input row per time step, the lookback rows flattened oldest first"""
+    return np.array([X[t - lookback + 1:t + 1].reshape(-1) for t in range(lookback - 1, len(X))])
+
+
+@pytest.mark.parametrize('lookback', [2, 4, 24])
+def test_window_features_match_the_loop(lookback):
+    X = np.random.default_rng(0).normal(size=(50, 3))
+
+    windows = window_features(X, lookback)
+
+    assert windows.shape == (50 - lookback + 1, lookback * 3)
+    np.testing.assert_array_equal(windows, _window_loop(X, lookback))
+    # Column order: feature f of step k (0 = oldest) is column k * features + f
+    np.testing.assert_array_equal(windows[:, -3:], X[lookback - 1:])
+    np.testing.assert_array_equal(windows[:, :3], X[:len(X) - lookback + 1])
+
+
+def test_window_features_edge_cases():
+    X = np.arange(12.0).reshape(4, 3)
+
+    assert window_features(X, 1) is X
+    with pytest.raises(ValueError):
+        window_features(X, 5)
+
+
+def test_predict_reuses_the_fitted_scaler(fitted_model, monkeypatch):
+    def refit(*args, **kwargs):
+        raise AssertionError("the scaler was refitted")
+
+    for method in ('fit', 'partial_fit', 'fit_transform'):
+        monkeypatch.setattr(StandardScaler, method, refit)
+    mean = fitted_model.scaler.mean_.copy()
+    df = _frame(7, 120)
+
+    result = fitted_model.predict(df.copy())
+
+    assert 'error' not in result
+    np.testing.assert_array_equal(fitted_model.scaler.mean_, mean)
+    features = fitted_model.fitted['features']
+    X = window_features(fitted_model.scaler.transform(df[features].iloc[-4:].to_numpy()), 4)
+    assert result['prediction'] == pytest.approx(fitted_model.model.predict(X)[0], rel=1e-12)
+    np.testing.assert_allclose(fitted_model._scale(df[features].to_numpy()),
+                               fitted_model.scaler.transform(df[features].to_numpy()), rtol=1e-15)
@@ -0,0 +1,103 @@
+# test_model_registry.py
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import ARTIFACT_SUFFIXES, ModelRegistry
+from tree_compiler import compile_ensemble
+
+
+def _fitted():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(200, 4)), rng.normal(size=200)
+    return RandomForestRegressor(n_estimators=3, max_depth=4, random_state=0).fit(X, y), StandardScaler().fit(X)
+
+
+def _register(registry, symbol=None, timeframe='1h', model_type='random_forest', compiled=True):
+    model, scaler = _fitted()
+    return registry.register(model, scaler, {'model_type': model_type},
+                             compiled=compile_ensemble(model) if compiled else None,
+                             symbol=symbol, timeframe=timeframe)
+
+
+def test_index_is_rebuilt_from_a_directory_without_one(tmp_path):
+    model, scaler = _fitted()
+    joblib.dump(model, tmp_path / 'random_forest_20240101_000000.joblib')
+    joblib.dump(scaler, tmp_path / 'random_forest_20240101_000000_scaler.joblib')
+    joblib.dump(compile_ensemble(model).to_arrays(), tmp_path / 'random_forest_20240101_000000_compiled.joblib')
+    (tmp_path / 'random_forest_20240101_000000_config.json').write_text(json.dumps({'model_type': 'random_forest'}))
+
+    registry = ModelRegistry(str(tmp_path))
+
+    [entry] = registry.entries()
+    assert entry['name'] == 'random_forest_20240101_000000'
+    assert entry['model_type'] == 'random_forest'
+    assert set(entry['files']) == {'model', 'scaler', 'compiled', 'config'}
+    assert os.path.exists(registry.index_path)
+    assert registry.load(entry['name'])['model'].n_estimators == 3
+
+
+def test_only_the_newest_models_per_group_are_kept(tmp_path):
+    registry = ModelRegistry(str(tmp_path), keep=2)
+    names = [_register(registry, symbol='BTC-USDT') for _ in range(4)]
+    other = _register(registry, symbol='ETH-USDT')
+
+    assert [entry['name'] for entry in registry.entries(symbol='BTC-USDT')] == names[2:]
+    assert registry.get(other) is not None
+    # Only the artifacts of the three retained models are left
+    kept = {filename for entry in registry.entries() for filename in entry['files'].values()}
+    assert len(kept) == 3 * len(ARTIFACT_SUFFIXES)
+    assert set(os.listdir(tmp_path)) == kept | {'index.json'}
+
+
+def test_latest_separates_generic_and_symbol_models(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    generic = _register(registry)
+    btc = _register(registry, symbol='BTC-USDT')
+
+    assert registry.latest()['name'] == btc
+    assert registry.latest(generic_only=True)['name'] == generic
+    assert registry.latest(symbol='BTC-USDT')['name'] == btc
+    assert registry.latest(symbol='ETH-USDT') is None
+    assert registry.latest(timeframe='4h') is None
+
+
+def test_compact_removes_orphaned_artifacts_of_every_kind(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    name = _register(registry)
+    for suffix in ('.joblib', '_scaler.joblib', '_compiled.joblib', '_config.json'):
+        (tmp_path / f"orphan{suffix}").write_bytes(b'')
+
+    assert registry.compact() == 0
+    assert sorted(os.listdir(tmp_path)) == sorted(list(registry.get(name)['files'].values()) + ['index.json'])
+
+
+def test_registries_on_one_directory_keep_each_others_models(tmp_path):
+    first = ModelRegistry(str(tmp_path))
+    second = ModelRegistry(str(tmp_path))
+    name = _register(first, symbol='BTC-USDT')
+    other = _register(second, symbol='ETH-USDT')
+
+    # second read the index before `name` existed, its writes must not drop it
+    first.compact()
+    assert {entry['name'] for entry in first.entries()} == {name, other}
+    assert {entry['name'] for entry in ModelRegistry(str(tmp_path)).entries()} == {name, other}
+    for registry_name in (name, other):
+        for filename in first.get(registry_name)['files'].values():
+            assert os.path.exists(tmp_path / filename)
+
+
+def test_artifacts_are_loaded_memory_mapped(tmp_path):
+    name = _register(ModelRegistry(str(tmp_path)))
+
+    mapped = ModelRegistry(str(tmp_path)).load(name)
+    assert isinstance(mapped['compiled']['threshold'], np.memmap)
+    assert isinstance(mapped['model'].estimators_[0].tree_.threshold, np.ndarray)
+
+    in_memory = ModelRegistry(str(tmp_path), mmap_mode=None).load(name)
+    assert not isinstance(in_memory['compiled']['threshold'], np.memmap)
+    np.testing.assert_array_equal(mapped['compiled']['threshold'], in_memory['compiled']['threshold'])
@@ -0,0 +1,57 @@
+# test_model_router.py
+import pytest
+
+from model import PredictionModel
+from model_registry import ModelRegistry
+from model_router import ModelRouter
+from simulator import MarketSimulator
+from features import FeaturePipeline
+
+
+def _frame():
+    candles = MarketSimulator(seed=1).generate('BTC-USDT', 400, '1h')['BTC-USDT']
+    return FeaturePipeline().compute(candles, sentiment=0.0, incremental=False).dropna()
+
+
+def test_default_model_does_not_load_models_of_other_symbols(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    default_model = PredictionModel(registry=registry)
+    default_model.config['lookback_window'] = 4
+    default_model.config['model_params']['random_forest']['n_estimators'] = 5
+    router = ModelRouter(default_model)
+    df = _frame()
+
+    btc_model = router.install('BTC-USDT', '1h', default_model.fit(df))
+
+    # A fresh app: ETH has no model of its own and is served by the default model
+    fresh_default = PredictionModel(config=dict(default_model.config), registry=registry)
+    fresh_router = ModelRouter(fresh_default)
+    assert fresh_router.get('BTC-USDT', '1h').model_name == btc_model.model_name
+    assert fresh_router.get('ETH-USDT', '1h') is fresh_default
+
+    assert 'error' not in fresh_router.predict('ETH-USDT', df)
+    assert fresh_default.model_name != btc_model.model_name
+
+
+def test_batched_predictions_equal_predictions_per_symbol(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    default_model = PredictionModel(registry=registry)
+    default_model.config['lookback_window'] = 4
+    default_model.config['model_params']['random_forest']['n_estimators'] = 5
+    router = ModelRouter(default_model)
+    df = _frame()
+    router.install('BTC-USDT', '1h', default_model.fit(df))
+    default_model.install(default_model.fit(df.iloc[:200]), save=False)
+
+    frames = {'BTC-USDT': df.iloc[-60:], 'ETH-USDT': df.iloc[-80:-20], 'XRP-USDT': None,
+              'SOL-USDT': df.iloc[-2:]}
+    results = router.predict_many(frames)
+
+    assert set(results) == set(frames)
+    assert 'error' in results['XRP-USDT'] and 'error' in results['SOL-USDT']
+    for symbol in ('BTC-USDT', 'ETH-USDT'):
+        expected = router.predict(symbol, frames[symbol].copy())
+        for key in ('prediction', 'current', 'confidence'):
+            assert results[symbol][key] == pytest.approx(expected[key], rel=1e-12)
+    # Two batches: the BTC model and the default model
+    assert router.get('BTC-USDT', '1h') is not default_model and router.get('ETH-USDT', '1h') is default_model
@@ -0,0 +1,83 @@
+# test_model_update.py
+import copy
+
+import numpy as np
+import pytest
+
+from model import PredictionModel
+from simulator import MarketSimulator
+from features import FeaturePipeline
+
+TRAIN_ROWS = 1500
+UPDATE_ROWS = 300
+TEST_ROWS = 300
+
+
+@pytest.fixture(scope='module')
+def frame():
+    # Trees cannot predict beyond the prices they were fitted on, so a series that drifts out of
+    # its range favours whichever model saw the newest candles. This one stays in its range.
+    candles = MarketSimulator(seed=4, volatility=0.005).generate(
+        'BTC-USDT', TRAIN_ROWS + UPDATE_ROWS + TEST_ROWS + 100, '1h')['BTC-USDT']
+    df = FeaturePipeline().compute(candles, sentiment=0.0, incremental=False)
+    return df.dropna().reset_index(drop=True)
+
+
+def _timestamps_ms(df):
+    return df['timestamp'].astype('datetime64[ms]').astype('int64').to_numpy()
+
+
+def _config(model_type):
+    config = copy.deepcopy(PredictionModel().config)
+    config['model_type'] = model_type
+    config['lookback_window'] = 4
+    config['model_params']['random_forest'].update(n_estimators=30, max_depth=8)
+    config['model_params']['gradient_boosting']['n_estimators'] = 30
+    config['incremental'].update(trees_per_update=5, max_estimators=60, refit_every=5)
+    return config
+
+
+def _test_mae(model, df):
+    start = TRAIN_ROWS + UPDATE_ROWS
+    predictions = model.predict_frame(df.iloc[start - model.fitted['lookback'] + 1:start + TEST_ROWS])
+    actual = df['close'].to_numpy()[start + 1:start + TEST_ROWS + 1]
+    return float(np.mean(np.abs(predictions['prediction'].to_numpy() - actual)))
+
+
+@pytest.mark.parametrize('model_type', ['random_forest', 'gradient_boosting', 'sgd'])
+def test_per_candle_updates_stay_close_to_full_refit(frame, model_type):
+    model = PredictionModel(config=_config(model_type))
+    model.install(model.fit(frame.iloc[:TRAIN_ROWS]), save=False)
+
+    # One new candle per update, the frame always ends at the newest candle
+    for end in range(TRAIN_ROWS + 1, TRAIN_ROWS + UPDATE_ROWS + 1):
+        model.update(frame.iloc[max(end - TRAIN_ROWS, 0):end], save=False)
+
+    # Tree ensembles may still be collecting the last min_rows_per_update candles
+    pending_ms = model.config['incremental']['min_rows_per_update'] * 3600 * 1000
+    last_ms = _timestamps_ms(frame)[TRAIN_ROWS + UPDATE_ROWS - 2]
+    assert last_ms - pending_ms < model.fitted['until'] <= last_ms
+
+    # Full refit on the same candles the updated model has seen
+    seen = int(np.searchsorted(_timestamps_ms(frame), model.fitted['until'], side='right')) + 1
+    refit = PredictionModel(config=_config(model_type))
+    refit.install(refit.fit(frame.iloc[seen - TRAIN_ROWS:seen]), save=False)
+
+    if model_type == 'random_forest':
+        assert len(model.model.estimators_) <= 60
+        assert min(tree.tree_.node_count for tree in model.model.estimators_) > 1
+    if model_type == 'gradient_boosting':
+        assert model.model.n_estimators <= 60
+    assert _test_mae(model, frame) <= 1.25 * _test_mae(refit, frame)
+
+
+def test_update_waits_for_enough_new_rows(frame):
+    model = PredictionModel(config=_config('random_forest'))
+    model.install(model.fit(frame.iloc[:TRAIN_ROWS]), save=False)
+    trees = len(model.model.estimators_)
+
+    model.update(frame.iloc[:TRAIN_ROWS + 5], save=False)
+    assert len(model.model.estimators_) == trees
+
+    model.update(frame.iloc[:TRAIN_ROWS + 30], save=False)
+    assert len(model.model.estimators_) == trees + 5
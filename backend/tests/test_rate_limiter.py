@@ -0,0 +1,78 @@
+# test_rate_limiter.py
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from rate_limiter import RequestScheduler
+
+
+class _Client:
+    """Stand-in for a python-binance client: one session, client.response shared by all threads"""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.response = None
+
+    def request(self, used_weight, status_code=200, before_return=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers['x-mbx-used-weight-1m'] = str(used_weight)
+        if status_code == 429:
+            response.headers['Retry-After'] = '30'
+        for hook in self.session.hooks['response']:
+            hook(response)
+        self.response = response
+        if before_return is not None:
+            before_return()
+        return used_weight
+
+
+def test_each_call_records_its_own_response():
+    scheduler = RequestScheduler()
+    client = _Client()
+    second_done = threading.Event()
+    recorded = []
+    record_response = scheduler.record_response
+
+    def spy(headers=None, status_code=None):
+        recorded.append(int(headers['x-mbx-used-weight-1m']))
+        record_response(headers, status_code)
+
+    scheduler.record_response = spy
+
+    def first_call():
+        # Another thread's request finishes before this call returns and overwrites client.response
+        def overwrite():
+            thread = threading.Thread(target=lambda: scheduler.call(client, client.request, 100))
+            thread.start()
+            thread.join()
+            second_done.set()
+        scheduler.call(client, client.request, 3000, before_return=overwrite)
+
+    first_call()
+    assert second_done.is_set()
+    assert recorded == [3000, 100]  # not the overwritten client.response twice
+    assert client.session.hooks['response'].count(scheduler._record_hook) == 1  # hooked once
+
+
+def test_rate_limit_response_pauses_the_scheduler():
+    scheduler = RequestScheduler()
+    client = _Client()
+    scheduler.call(client, client.request, 10, status_code=429)
+    assert scheduler.stats()['banned_for'] > 25
+
+
+def test_clients_without_session_record_failed_calls():
+    scheduler = RequestScheduler()
+    error = RuntimeError('banned')
+    error.status_code = 418
+    error.response = SimpleNamespace(headers={'Retry-After': '60', 'x-mbx-used-weight-1m': '5'})
+
+    def failing():
+        raise error
+
+    with pytest.raises(RuntimeError):
+        scheduler.call(object(), failing)
+    assert scheduler.stats()['banned_for'] > 55
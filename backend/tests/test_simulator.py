@@ -0,0 +1,79 @@
+# test_simulator.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from candle_store import INTERVAL_MS
+from simulator import MarketSimulator
+
+END = pd.Timestamp('2024-06-01 12:00')
+
+
+def test_same_seed_gives_identical_frames():
+    first = MarketSimulator(seed=11, model='regime').generate(['BTC-USDT', 'ETH-USDT'], 500, end=END)
+    second = MarketSimulator(seed=11, model='regime').generate(['BTC-USDT', 'ETH-USDT'], 500, end=END)
+    other = MarketSimulator(seed=12, model='regime').generate(['BTC-USDT', 'ETH-USDT'], 500, end=END)
+
+    for symbol in first:
+        pd.testing.assert_frame_equal(first[symbol], second[symbol])
+        assert not np.allclose(first[symbol]['close'], other[symbol]['close'])
+
+
+@pytest.mark.parametrize('model', ['gbm', 'regime'])
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_candles_are_consistent(model, dtype):
+    simulator = MarketSimulator(seed=3, model=model, volatility=0.03)
+    df = simulator.generate('BTC-USDT', 5000, end=END, dtype=dtype)['BTC-USDT']
+
+    assert (df['low'] <= df[['open', 'close']].min(axis=1)).all()
+    assert (df['high'] >= df[['open', 'close']].max(axis=1)).all()
+    assert (df['volume'] > 0).all()
+    assert (df[['open', 'high', 'low', 'close', 'volume']].dtypes == dtype).all()
+    # Every candle opens at the previous close, the first one at the base price
+    np.testing.assert_array_equal(df['open'].to_numpy()[1:], df['close'].to_numpy()[:-1])
+    assert df['open'].iloc[0] == dtype(MarketSimulator.BASE_PRICES['BTC'])
+
+
+def test_gbm_log_returns_have_the_configured_drift_and_volatility():
+    df = MarketSimulator(seed=5, volatility=0.02, drift=0.001).generate('X', 200_000, end=END)['X']
+    returns = np.diff(np.log(df['close'].to_numpy()))
+
+    assert returns.std() == pytest.approx(0.02, rel=0.01)
+    assert returns.mean() == pytest.approx(0.001 - 0.5 * 0.02 ** 2, abs=1e-4)
+
+
+def test_regime_model_switches_between_the_regime_volatilities():
+    regimes = {'calm': {'drift': 0.0, 'volatility': 0.002}, 'wild': {'drift': 0.0, 'volatility': 0.05}}
+
+    # Without switches every path stays in its start regime
+    for seed in range(4):
+        simulator = MarketSimulator(seed=seed, model='regime', regimes=regimes, switch_probability=0.0)
+        returns = np.diff(np.log(simulator.generate('X', 5000, end=END)['X']['close'].to_numpy()))
+        assert min(abs(returns.std() - 0.002) / 0.002, abs(returns.std() - 0.05) / 0.05) < 0.05
+
+    simulator = MarketSimulator(seed=1, model='regime', regimes=regimes, switch_probability=0.01)
+    returns = np.diff(np.log(simulator.generate('X', 20_000, end=END)['X']['close'].to_numpy()))
+    window_std = pd.Series(returns).rolling(50).std().dropna()
+    assert (window_std < 0.004).mean() > 0.2 and (window_std > 0.03).mean() > 0.2
+
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        MarketSimulator(model='jump')
+
+
+@pytest.mark.parametrize('timeframe', ['1m', '15m', '1h', '4h', '1d', '1w'])
+def test_timestamps_are_spaced_by_the_timeframe(timeframe):
+    df = MarketSimulator(seed=0).generate('BTC-USDT', 100, timeframe=timeframe, end=END)['BTC-USDT']
+    open_times = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+
+    assert df['timestamp'].iloc[-1] == END
+    assert (np.diff(open_times) == INTERVAL_MS[timeframe]).all()
+    np.testing.assert_array_equal(df['close_time'].to_numpy(), open_times + INTERVAL_MS[timeframe] - 1)
+
+
+def test_default_end_is_the_current_candle():
+    df = MarketSimulator(seed=0).generate('BTC-USDT', 10, timeframe='1h')['BTC-USDT']
+    now_ms = pd.Timestamp.now().value // 1_000_000
+
+    assert pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8[-1] == now_ms - now_ms % INTERVAL_MS['1h']
@@ -0,0 +1,48 @@
+# test_source_chain.py
+import threading
+import time
+
+import pytest
+
+from source_chain import DataSource, SourceChain, SourceChainError
+
+
+def test_deadline_starts_when_the_call_runs():
+    # One worker: the second call waits for the first before its deadline starts
+    chain = SourceChain([DataSource('slow', lambda: time.sleep(0.3) or 'value', deadline=0.5)],
+                        overall_deadline=5.0, max_workers=1)
+    try:
+        blocker = chain.executor.submit(time.sleep, 0.4)
+        assert chain.run() == ('value', 'slow')
+        assert blocker.done()
+    finally:
+        chain.shutdown()
+
+
+def test_overall_deadline_bounds_queued_calls():
+    chain = SourceChain([DataSource('queued', lambda: 'value', deadline=1.0)], overall_deadline=0.2, max_workers=1)
+    release = threading.Event()
+    try:
+        chain.executor.submit(release.wait, 5)
+        start = time.monotonic()
+        with pytest.raises(SourceChainError, match='deadline exceeded'):
+            chain.run()
+        assert time.monotonic() - start < 1.0
+    finally:
+        release.set()
+        chain.shutdown()
+
+
+def test_hedged_call_does_not_queue_behind_the_slow_one():
+    release = threading.Event()
+    primary = DataSource('primary', lambda: release.wait(5) and 'late', deadline=5.0)
+    primary.latencies.extend([0.01] * 10)
+    backup = DataSource('backup', lambda: 'value', deadline=5.0)
+    chain = SourceChain([primary, backup], overall_deadline=5.0, hedge=True, max_workers=1, hedge_workers=1)
+    try:
+        start = time.monotonic()
+        assert chain.run() == ('value', 'backup')
+        assert time.monotonic() - start < 1.0
+    finally:
+        release.set()
+        chain.shutdown()
@@ -0,0 +1,84 @@
+# test_training_jobs.py
+import threading
+from types import SimpleNamespace
+
+from features import FeaturePipeline
+from simulator import MarketSimulator
+from training_jobs import TrainingJobManager, STATUS_CANCELLED, STATUS_COMPLETED
+
+
+class _Collector:
+    """Serves simulated candles, optionally blocking until released"""
+
+    def __init__(self, block=False):
+        self.feature_pipeline = FeaturePipeline()
+        self.release = threading.Event()
+        self.fetching = threading.Event()
+        self.calls = 0
+        if not block:
+            self.release.set()
+
+    def get_market_data(self, symbol, timeframe='1h', limit=100):
+        self.calls += 1
+        self.fetching.set()
+        self.release.wait(5)
+        return MarketSimulator(seed=1).generate(symbol, limit, timeframe)[symbol]
+
+
+class _Router:
+    """Router of a symbol that has a model of its own, update() blocks until released"""
+
+    def __init__(self):
+        self.default_model = SimpleNamespace(config={'training_mode': 'incremental'})
+        self.release = threading.Event()
+        self.updating = threading.Event()
+        self.updates = 0
+
+    def get(self, symbol, timeframe):
+        return object()
+
+    def update(self, symbol, timeframe, df):
+        self.updating.set()
+        self.release.wait(5)
+        self.updates += 1
+        return SimpleNamespace(model_name='updated')
+
+
+def _finish(manager):
+    """Waits for all job threads"""
+    manager.executor.shutdown(wait=True)
+
+
+def test_cancelled_job_does_not_install_its_model():
+    collector, router = _Collector(block=True), _Router()
+    manager = TrainingJobManager(router, collector, max_concurrent=1)
+    first = manager.submit('BTC-USDT', data_points=200)
+    queued = manager.submit('ETH-USDT', data_points=200)
+    assert collector.fetching.wait(5)
+
+    assert manager.cancel(queued)
+    assert manager.get(queued)['status'] == STATUS_CANCELLED  # reported at once, not when the thread notices
+    assert manager.cancel(first)
+    collector.release.set()
+    router.release.set()
+
+    _finish(manager)
+    assert manager.get(first)['status'] == STATUS_CANCELLED
+    assert manager.get(queued)['status'] == STATUS_CANCELLED
+    assert router.updates == 0
+    assert collector.calls == 1
+
+
+def test_job_cannot_be_cancelled_while_installing():
+    collector, router = _Collector(), _Router()
+    manager = TrainingJobManager(router, collector, max_concurrent=1)
+    job_id = manager.submit('BTC-USDT', data_points=200)
+    assert router.updating.wait(5)
+
+    assert not manager.cancel(job_id)
+    router.release.set()
+
+    _finish(manager)
+    job = manager.get(job_id)
+    assert job['status'] == STATUS_COMPLETED
+    assert job['model_name'] == 'updated'
@@ -0,0 +1,57 @@
+# test_tree_compiler.py
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from tree_compiler import CompiledEnsemble, compile_ensemble
+
+
+def _data(rows=400, features=12, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features))
+    y = X[:, 0] * 3 + np.sin(X[:, 1] * 2) + rng.normal(scale=0.1, size=rows)
+    return X, y
+
+
+def _forest(X, y):
+    return RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+
+def _forest_with_dropped_trees(X, y):
+    # As after PredictionModel.update: warm-start trees added, the oldest ones dropped
+    model = _forest(X, y)
+    model.set_params(warm_start=True, n_estimators=35)
+    model.fit(X[-200:], y[-200:])
+    model.estimators_ = model.estimators_[-30:]
+    model.set_params(n_estimators=30)
+    return model
+
+
+def _boosting(X, y):
+    return GradientBoostingRegressor(n_estimators=40, learning_rate=0.1, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize('build', [_forest, _forest_with_dropped_trees, _boosting])
+def test_compiled_predictions_equal_sklearn(build):
+    X, y = _data()
+    model = build(X, y)
+    compiled = compile_ensemble(model)
+    X_test, _ = _data(rows=300, seed=1)
+
+    np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
+    # One row, as 2-D and 1-D input
+    np.testing.assert_array_equal(compiled.predict(X_test[:1]), model.predict(X_test[:1]))
+    np.testing.assert_array_equal(compiled.predict(X_test[0]), model.predict(X_test[:1]))
+    # Round trip through the saved arrays
+    restored = CompiledEnsemble.from_arrays(compiled.to_arrays())
+    np.testing.assert_array_equal(restored.predict(X_test), model.predict(X_test))
+
+
+def test_forest_tree_outputs_equal_the_estimators():
+    X, y = _data()
+    model = _forest(X, y)
+    X_test, _ = _data(rows=50, seed=2)
+
+    outputs = compile_ensemble(model).tree_outputs(X_test)
+    expected = np.stack([tree.predict(X_test.astype(np.float32)) for tree in model.estimators_], axis=1)
+    np.testing.assert_array_equal(outputs, expected)
@@ -11,7 +11,7 @@ from datetime import datetime, timedelta
 
 
 class Trader:
-    def __init__(self, config=None):
+    def __init__(self, config=None, client_pool=None):
         self.config = config or {
             'trading_enabled': False,  # Disabled by default (Paper-Trading)
             'exchanges': {
@@ -36,6 +36,7 @@ class Trader:
         }
 
         self.logger = logging.getLogger('Trader')
+        self.client_pool = client_pool  # Shared Binance clients (see DataCollector.client_pool)
         self.open_trades = []
         self.trade_history = []
         self.daily_stats = {
@@ -224,9 +225,8 @@ class Trader:
                     self.logger.info(f"Real trade: {action.upper()} {symbol} at {prediction.get('current')}")
 
                     # In a real implementation, the Binance API would be called here
-                    # Example:
-                    # from binance.client import Client
-                    # client = Client(api_key, api_secret)
+                    # Example (reusing the pooled client and its open connection):
+                    # client = self.client_pool.get(api_key, api_secret)
                     # if action == 'buy':
                     #     order = client.order_market_buy(symbol=symbol.replace('-', ''), quantity=quantity)
                     # else:
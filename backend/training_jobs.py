@@ -0,0 +1,297 @@
+# training_jobs.py
+import copy
+import uuid
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from model import PredictionModel
+
+# Job states
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+FINAL_STATES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+# Training modes (model config 'training_mode')
+MODE_FULL = 'full'
+MODE_INCREMENTAL = 'incremental'
+
+
+class JobCancelled(Exception):
+    """Raised inside a job thread when the job was cancelled"""
+
+
+def _fit_worker(config: Dict[str, Any], df: pd.DataFrame, conn) -> None:
+    """Entry point of the training process: fits a model and sends the result back"""
+    try:
+        fitted = PredictionModel(config=config).fit(df)
+        conn.send(('ok', fitted))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+
+class TrainingJobManager:
+    """
+    Runs model training as tracked background jobs
+
+    Every job fetches its market data and features in a thread of this process and
+    fits the model in a separate worker process, so the API event loop and the
+    prediction path are never blocked by a fit. Up to `max_concurrent` symbols are
+    trained at the same time. A cancelled job terminates its worker process. The
+    fitted model is handed to the ModelRouter, which saves it and swaps it in
+    only after the fit has completed. Once a job has started to install or update
+    its model it can no longer be cancelled.
+
+    In the 'incremental' mode a symbol that already has a model of its own is
+    updated with the new candles (ModelRouter.update) in the job thread instead,
+    which costs a fraction of a fit; symbols without a model get a full fit.
+    """
+
+    def __init__(self, model_router, data_collector, max_concurrent: int = 2, n_jobs: Optional[int] = None,
+                 max_history: int = 100):
+        """
+        Initializes the manager
+
+        Args:
+            model_router: ModelRouter that receives the fitted models
+            data_collector: DataCollector for the training data
+            max_concurrent: Number of jobs that train at the same time
+            n_jobs: Default number of threads per forest fit (None for one)
+            max_history: Number of finished jobs kept for status queries
+        """
+        self.model_router = model_router
+        self.data_collector = data_collector
+        self.n_jobs = n_jobs
+        self.max_history = max_history
+        self.logger = logging.getLogger('TrainingJobManager')
+
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='training-job')
+        # spawn: the API process runs threads (scheduler, streams), which must not be forked
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._processes: Dict[str, Any] = {}
+        self._committing = set()  # jobs that are installing or updating their model
+        self._lock = threading.Lock()
+
+    def submit(self, symbol: str, data_points: int = 2000, timeframe: str = '1h',
+               n_jobs: Optional[int] = None, mode: Optional[str] = None) -> str:
+        """
+        Queues a training job
+
+        Args:
+            symbol: Trading symbol
+            data_points: Number of candles to train on
+            timeframe: Candle timeframe
+            n_jobs: Threads for the forest fit, defaults to the manager setting
+            mode: 'full' or 'incremental', defaults to the 'training_mode' of the model config
+
+        Returns:
+            Job id
+        """
+        mode = mode or self.model_router.default_model.config.get('training_mode', MODE_FULL)
+        if mode not in (MODE_FULL, MODE_INCREMENTAL):
+            raise ValueError(f"Unknown training mode: {mode}")
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'job_id': job_id,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'data_points': data_points,
+            'n_jobs': n_jobs if n_jobs is not None else self.n_jobs,
+            'mode': mode,
+            'status': STATUS_QUEUED,
+            'phase': 'queued',
+            'progress': 0.0,
+            'created': pd.Timestamp.now().isoformat(),
+            'started': None,
+            'finished': None,
+            'error': None,
+            'model_name': None,
+            'rows': None
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._cancel_events[job_id] = threading.Event()
+            self._prune()
+
+        self.executor.submit(self._run, job_id)
+        self.logger.info(f"Training job {job_id} for {symbol} queued")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the job status, None for unknown ids"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def is_active(self, symbol: str, timeframe: str = '1h') -> bool:
+        """True if a job for the symbol and timeframe is queued or running"""
+        with self._lock:
+            return any(job['symbol'] == symbol and job['timeframe'] == timeframe and job['status'] not in FINAL_STATES
+                       for job in self._jobs.values())
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Returns the status of all known jobs, newest first"""
+        with self._lock:
+            return [dict(job) for job in reversed(list(self._jobs.values()))]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a queued or running job
+
+        Returns:
+            False if the job is unknown, already finished or installing its model
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINAL_STATES or job_id in self._committing:
+                return False
+            self._cancel_events[job_id].set()
+            job.update(status=STATUS_CANCELLED, phase='cancelled', finished=pd.Timestamp.now().isoformat())
+            process = self._processes.get(job_id)
+
+        if process is not None and process.is_alive():
+            process.terminate()
+        self.logger.info(f"Training job {job_id} cancelled")
+        return True
+
+    def shutdown(self) -> None:
+        """Cancels all unfinished jobs"""
+        for job in self.list_jobs():
+            if job['status'] not in FINAL_STATES:
+                self.cancel(job['job_id'])
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _update(self, job_id: str, **fields) -> None:
+        """Updates the status fields of a job, finished jobs (e.g. cancelled ones) are not changed"""
+        with self._lock:
+            job = self._jobs[job_id]
+            if job['status'] not in FINAL_STATES:
+                job.update(fields)
+
+    def _check_cancelled(self, job_id: str) -> None:
+        if self._cancel_events[job_id].is_set():
+            raise JobCancelled()
+
+    def _begin_commit(self, job_id: str, **fields) -> None:
+        """Checks the cancel flag and marks the job as no longer cancellable in one step"""
+        with self._lock:
+            if self._cancel_events[job_id].is_set():
+                raise JobCancelled()
+            self._committing.add(job_id)
+            self._jobs[job_id].update(fields)
+
+    def _prune(self) -> None:
+        """Forgets the oldest finished jobs beyond max_history (caller holds the lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINAL_STATES]
+        for job_id in finished[:max(len(finished) - self.max_history, 0)]:
+            del self._jobs[job_id]
+            self._cancel_events.pop(job_id, None)
+
+    def _run(self, job_id: str) -> None:
+        """Executes a job in a thread of the executor"""
+        job = self.get(job_id)
+        try:
+            self._check_cancelled(job_id)
+            self._update(job_id, status=STATUS_RUNNING, phase='fetching data', progress=0.1,
+                         started=pd.Timestamp.now().isoformat())
+            df = self._training_frame(job['symbol'], job['timeframe'], job['data_points'])
+
+            self._check_cancelled(job_id)
+            has_model = self.model_router.get(job['symbol'], job['timeframe']) is not self.model_router.default_model
+            if job['mode'] == MODE_INCREMENTAL and has_model:
+                self._begin_commit(job_id, phase='updating', progress=0.3, rows=len(df))
+                model = self.model_router.update(job['symbol'], job['timeframe'], df)
+                self._update(job_id, status=STATUS_COMPLETED, phase='completed', progress=1.0,
+                             model_name=model.model_name, finished=pd.Timestamp.now().isoformat())
+                self.logger.info(f"Training job {job_id} updated the model for {job['symbol']}: {model.model_name}")
+                return
+
+            self._update(job_id, phase='training', progress=0.3, rows=len(df))
+            config = copy.deepcopy(self.model_router.default_model.config)
+            if job['n_jobs'] is not None:
+                config.setdefault('model_params', {}).setdefault('random_forest', {})['n_jobs'] = job['n_jobs']
+            fitted = self._fit_in_process(job_id, config, df)
+
+            self._begin_commit(job_id, phase='saving', progress=0.9)
+            model = self.model_router.install(job['symbol'], job['timeframe'], fitted, config=config)
+
+            self._update(job_id, status=STATUS_COMPLETED, phase='completed', progress=1.0,
+                         model_name=model.model_name, finished=pd.Timestamp.now().isoformat())
+            self.logger.info(f"Training job {job_id} for {job['symbol']} completed: {model.model_name}")
+        except JobCancelled:
+            self._update(job_id, status=STATUS_CANCELLED, phase='cancelled', finished=pd.Timestamp.now().isoformat())
+            self.logger.info(f"Training job {job_id} for {job['symbol']} stopped after cancellation")
+        except Exception as e:
+            self.logger.error(f"Training job {job_id} for {job['symbol']} failed: {str(e)}")
+            self._update(job_id, status=STATUS_FAILED, phase='failed', error=str(e),
+                         finished=pd.Timestamp.now().isoformat())
+        finally:
+            with self._lock:
+                self._processes.pop(job_id, None)
+                self._committing.discard(job_id)
+
+    def _training_frame(self, symbol: str, timeframe: str, data_points: int) -> pd.DataFrame:
+        """Fetches the candles of a symbol and adds the feature columns"""
+        df = self.data_collector.get_market_data(symbol, timeframe, limit=data_points)
+        if df is None or df.empty:
+            raise ValueError(f"No training data available for {symbol}")
+
+        if 'close' not in df.columns and 'Close' in df.columns:
+            df['close'] = df['Close']
+        if 'close' not in df.columns:
+            raise ValueError(f"Column 'close' missing in the data. Available columns: {df.columns.tolist()}")
+
+        # Same feature definitions as for prediction, without incremental state
+        df = self.data_collector.feature_pipeline.compute(
+            df, sentiment=np.random.uniform(-0.5, 0.5, size=len(df)), incremental=False)
+
+        df = df.dropna()
+        if df.empty:
+            raise ValueError("No data left after removing null values")
+        return df
+
+    def _fit_in_process(self, job_id: str, config: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+        """Fits the model in a worker process, returns the output of PredictionModel.fit()"""
+        receiver, sender = self._mp_context.Pipe(duplex=False)
+        # Not a daemon: sklearn only runs n_jobs > 1 in processes that may have children
+        process = self._mp_context.Process(target=_fit_worker, args=(config, df, sender), daemon=False)
+        with self._lock:
+            self._processes[job_id] = process
+        process.start()
+        sender.close()
+
+        try:
+            # Poll, so a cancellation is noticed while the worker is busy
+            while not receiver.poll(0.5):
+                self._check_cancelled(job_id)
+                if not process.is_alive() and not receiver.poll(0):
+                    raise RuntimeError(f"Training process exited with code {process.exitcode}")
+
+            status, result = receiver.recv()
+        except EOFError:
+            self._check_cancelled(job_id)
+            raise RuntimeError("Training process exited without a result")
+        finally:
+            receiver.close()
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=5)
+
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result